@@ -0,0 +1,60 @@
+"""
+Per-keystroke latency of the type-to-search filter.
+
+Types a query character by character, deletes it again with backspace and
+reports the latency percentiles of each keystroke for the substring filter
+and the ranked fuzzy search. Run from the repository
+root:
+
+    python benchmarks/bench_filter.py [num_names ...]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rosgraph_tui import search
+import synthetic
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100.0))]
+
+
+def keystrokes(query):
+    for end in range(1, len(query) + 1):
+        yield query[:end]
+    for end in range(len(query) - 1, -1, -1):
+        yield query[:end]
+
+
+def measure(filter_function, queries):
+    samples = []
+    for query in queries:
+        for filter_string in keystrokes(query):
+            samples.append(min(timeit.repeat(lambda: filter_function(filter_string), number=1, repeat=1)))
+    return samples
+
+
+def report(label, samples):
+    print('  %-12s p50 %8.3f ms   p99 %8.3f ms' % (label, percentile(samples, 50) * 1e3, percentile(samples, 99) * 1e3))
+
+
+def main(sizes):
+    queries = ['/camera_1/image', 'lidar_4', 'planner_12/odom']
+    for num_names in sizes:
+        names = synthetic.generate_names(num_names, namespace_depth=3)
+        print('%d names' % num_names)
+        report('scan', measure(lambda s: [n for n in names if s in n], queries))
+        cache = search.FilterCache(names)
+        report('incremental', measure(cache.filter, queries))
+        build_time = min(timeit.repeat(lambda: search.FuzzyIndex(names), number=1, repeat=1))
+        print('  %-12s build %6.3f s' % ('fuzzy', build_time))
+        index = search.FuzzyIndex(names)
+        report('fuzzy', measure(index.search, queries + ['camra_1/imgae', 'plnner_odom']))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 50000, 100000])
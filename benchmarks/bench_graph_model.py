@@ -0,0 +1,75 @@
+"""
+Microbenchmark of the GraphModel lookups on a synthetic graph.
+
+Compares the indexed GraphModel against the former linear scans over the
+system state. Run from the repository root:
+
+    python benchmarks/bench_graph_model.py [num_nodes] [num_topics]
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rosgraph_tui import model
+import synthetic
+
+
+class LinearGraphModel:
+    """The lookups as they were before the snapshot got indexed."""
+
+    def __init__(self, state):
+        self.all_nodes, self.all_topics, self.all_pubs, self.all_subs = state
+
+    def get_publishers(self, topic_name):
+        matches = [l for t, l in self.all_pubs if topic_name == t]
+        return sorted(*matches) if matches else []
+
+    def get_subscribers(self, topic_name):
+        matches = [l for t, l in self.all_subs if topic_name == t]
+        return sorted(*matches) if matches else []
+
+    def get_publications(self, node_name):
+        return sorted([t for t, l in self.all_pubs if node_name in l])
+
+    def get_subscriptions(self, node_name):
+        return sorted([t for t, l in self.all_subs if node_name in l])
+
+    def topic_type(self, t):
+        matches = [t_type for t_name, t_type in self.all_topics if t_name == t]
+        return matches[0] if matches else 'unknown type'
+
+
+def measure(graph, nodes, topics, repeat):
+    def lookups():
+        for n in nodes:
+            graph.get_publications(n)
+            graph.get_subscriptions(n)
+        for t in topics:
+            graph.get_publishers(t)
+            graph.get_subscribers(t)
+            graph.topic_type(t)
+    return min(timeit.repeat(lookups, number=1, repeat=repeat)) / (len(nodes) + len(topics))
+
+
+def main(num_nodes=2000, num_topics=9000):
+    state = synthetic.generate_state(num_nodes, num_topics)
+    rng = random.Random(1)
+    nodes = rng.sample(state[0], 20)
+    topics = rng.sample([t for t, t_type in state[1]], 20)
+
+    build_time = min(timeit.repeat(lambda: model.GraphModel(state), number=1, repeat=3))
+    linear = measure(LinearGraphModel(state), nodes, topics, repeat=3)
+    indexed = measure(model.GraphModel(state), nodes, topics, repeat=3)
+
+    print('graph: %d nodes, %d topics' % (num_nodes, num_topics))
+    print('index build:      %10.3f ms' % (build_time * 1e3))
+    print('linear lookup:    %10.3f us' % (linear * 1e6))
+    print('indexed lookup:   %10.3f us' % (indexed * 1e6))
+    print('speedup:          %10.1fx' % (linear / indexed))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
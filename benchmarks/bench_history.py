@@ -0,0 +1,63 @@
+"""
+Benchmark of going back and forward through the navigation history.
+
+Explores a synthetic graph hop by hop, from the full list over a node to
+its topics and their nodes, then goes all the way back and forward again,
+once restoring the cached views and once recomputing every view from its
+mode, choice and filter as without a cache. The slowest step is the one
+back to the full list. Run from the repository root:
+
+    python benchmarks/bench_history.py [num_nodes] [num_topics] [num_hops]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rosgraph_tui import history
+from rosgraph_tui.__main__ import Controller
+import synthetic
+
+
+def explore(controller, first_node, num_hops):
+    """Choose first_node in the full list, then always the first entry of the right column."""
+    controller.handle_choice(None, None, 'N ' + first_node, controller.view.Columns.MIDDLE)
+    for _ in range(num_hops):
+        choices = controller.view.get_choices(controller.view.Columns.RIGHT)
+        if not choices:
+            break
+        controller.handle_choice(None, None, choices[0][1], controller.view.Columns.RIGHT)
+
+
+def measure(controller, repeat=5):
+    """The mean and the slowest time of a step back or forward, each the best of repeat walks."""
+    steps = len(controller.history.steps)
+    keys = ['meta left'] * steps + ['meta right'] * steps
+    best = [float('inf')] * len(keys)
+    for _ in range(repeat):
+        for i, key in enumerate(keys):
+            start = timeit.default_timer()
+            controller.handle_input(key)
+            best[i] = min(best[i], timeit.default_timer() - start)
+    return sum(best) / len(best), max(best)
+
+
+def main(num_nodes=4000, num_topics=16000, num_hops=8):
+    state = synthetic.generate_state(num_nodes, num_topics)
+    first_node = sorted(state[0])[len(state[0]) // 2]
+    results = []
+    for max_views in (0, history.DEFAULT_MAX_VIEWS):
+        controller = Controller(state, synchronous=True)
+        controller.history = history.History(max_views=max_views)
+        explore(controller, first_node, num_hops)
+        results.append(measure(controller))
+
+    print('graph: %d nodes, %d topics, %d steps back and forward' % (
+        num_nodes, num_topics, len(controller.history.steps)))
+    print('step, recomputed:          %10.3f ms mean %10.3f ms slowest' % (results[0][0] * 1e3, results[0][1] * 1e3))
+    print('step, cached view:         %10.3f ms mean %10.3f ms slowest' % (results[1][0] * 1e3, results[1][1] * 1e3))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
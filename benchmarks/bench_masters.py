@@ -0,0 +1,74 @@
+"""
+Benchmark of fetching and merging the graphs of several ROS masters.
+
+Serves one synthetic graph per robot from stand-in masters, each answering
+after a delay like a remote master, and fetches them one after the other
+and in parallel. A slow master beyond the timeout and a dead one show that
+the graph of the others still arrives in time. Also times filtering the
+merged graph by master. Run from the repository root:
+
+    python benchmarks/bench_masters.py [num_masters] [num_nodes] [num_topics] [delay_ms]
+"""
+import os
+import socket
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rosgraph_tui import masters, model, snapshot
+import synthetic
+
+
+TIMEOUT = 1.0
+
+
+def unused_uri():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    uri = 'http://127.0.0.1:%d/' % sock.getsockname()[1]
+    sock.close()
+    return uri
+
+
+def fetch_one_by_one(group):
+    return masters.merge_states([masters.tag_state(snapshot.fetch_state(m.uri, TIMEOUT), m.prefix)
+                                 for m in group.masters])
+
+
+def main(num_masters=4, num_nodes=500, num_topics=2000, delay_ms=50):
+    state = synthetic.generate_state(num_nodes, num_topics)
+    stand_ins = [synthetic.StandInMaster(state, delay=delay_ms / 1e3) for _ in range(num_masters)]
+    slow = synthetic.StandInMaster(state, delay=TIMEOUT * 3)
+    try:
+        specs = ['robot%d=%s' % (i, m.uri) for i, m in enumerate(stand_ins)]
+        group = masters.MasterGroup(masters.parse_masters(specs))
+        serial = min(timeit.repeat(lambda: fetch_one_by_one(group), number=1, repeat=3))
+        parallel = min(timeit.repeat(lambda: group.fetch_state(TIMEOUT), number=1, repeat=3))
+
+        degraded_group = masters.MasterGroup(masters.parse_masters(
+            specs + ['slow=' + slow.uri, 'dead=' + unused_uri()]))
+        degraded = timeit.timeit(lambda: degraded_group.fetch_state(TIMEOUT), number=1)
+        merged = degraded_group.fetch_state(TIMEOUT)
+    finally:
+        for m in stand_ins + [slow]:
+            m.shutdown()
+
+    graph = model.GraphModel(merged)
+    by_prefix = min(timeit.repeat(lambda: graph.get_topics('@robot1 image'), number=20, repeat=3)) / 20
+    by_scan = min(timeit.repeat(lambda: [t for t in graph.get_topics('image') if t.startswith('/robot1/')],
+                                number=20, repeat=3)) / 20
+
+    print('%d masters with %d nodes and %d topics each, %d ms per call' % (
+        num_masters, num_nodes, num_topics, delay_ms))
+    print('one by one:                %10.1f ms' % (serial * 1e3))
+    print('in parallel:               %10.1f ms' % (parallel * 1e3))
+    print('with a slow and a dead one:%10.1f ms (timeout %.0f ms), %s' % (
+        degraded * 1e3, TIMEOUT * 1e3, degraded_group.status()))
+    print('merged graph:              %10d nodes, %d topics' % (len(graph.sorted_nodes), len(graph.sorted_topics)))
+    print('@robot1 image, by range:   %10.3f ms' % (by_prefix * 1e3))
+    print('image, then by scan:       %10.3f ms' % (by_scan * 1e3))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,61 @@
+"""
+Memory footprint of the GraphModel on a large synthetic graph.
+
+Reports the deep size of everything the GraphModel keeps alive, the entity
+models the main lists create, and the growth of the resident set size.
+Run from the repository root:
+
+    python benchmarks/bench_memory.py [num_nodes] [num_topics]
+"""
+import gc
+import os
+import resource
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rosgraph_tui import model, snapshot
+import synthetic
+
+
+def deep_size(root, exclude=()):
+    seen = set(id(obj) for obj in exclude)
+    stack = [root]
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, type):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return size
+
+
+def max_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def main(num_nodes=50000, num_topics=200000):
+    path = os.path.join(tempfile.gettempdir(), 'bench_memory_%d_%d.rgts' % (num_nodes, num_topics))
+    if not os.path.exists(path):
+        snapshot.save_state(path, synthetic.generate_state(num_nodes, num_topics))
+
+    gc.collect()
+    rss_before = max_rss()
+    graph_model = model.Model(snapshot.load_state(path))
+    gc.collect()
+    rss_after = max_rss()
+
+    edges = sum(len(graph_model.graph.get_publishers(t)) + len(graph_model.graph.get_subscribers(t))
+                for t in graph_model.graph.get_topics())
+    print('graph: %d nodes, %d topics, %d edges' % (num_nodes, num_topics, edges))
+    print('graph model:   %8.1f MiB' % (deep_size(graph_model.graph, exclude=[model]) / 2.0 ** 20))
+    entries = graph_model.main_node_list + graph_model.main_topic_list
+    print('list entries:  %8.1f MiB' % (deep_size(entries, exclude=[graph_model.graph]) / 2.0 ** 20))
+    print('rss growth:    %8.1f MiB' % ((rss_after - rss_before) / 2.0 ** 20))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
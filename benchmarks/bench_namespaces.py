@@ -0,0 +1,97 @@
+"""
+Benchmark of the namespace tree against the flat NODES_AND_TOPICS lists.
+
+Builds the trie of a synthetic graph and compares the rows of the collapsed
+tree, pruned by the filter results, with the flat filtered lists and their
+rows. Then times patching the trie with a refresh that changes one topic
+against building it again, and typing a filter in tree and flat mode.
+Run from the repository root:
+
+    python benchmarks/bench_namespaces.py [num_nodes] [num_topics]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rosgraph_tui import model, namespaces
+from rosgraph_tui.__main__ import Controller
+import synthetic
+
+
+QUERIES = ['', 'camera', 'camera_1/image', 'zzz']
+
+
+def best_of(function, repeat=3):
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def clear_filters(graph):
+    graph.node_filter.results.clear()
+    graph.topic_filter.results.clear()
+
+
+def flat_rows(graph, filter_string):
+    return ['N ' + n for n in graph.get_nodes(filter_string)] + ['T ' + t for t in graph.get_topics(filter_string)]
+
+
+def tree_rows(graph, filter_string):
+    if not filter_string:
+        return graph.namespace_tree.rows(set())
+    return graph.namespace_tree.rows(set(), graph.get_nodes(filter_string), graph.get_topics(filter_string))
+
+
+def one_topic_diffs(state):
+    """A diff that adds a subscriber to a topic, and one that takes it away again."""
+    all_nodes, all_topics, all_pubs, all_subs = state
+    topic, nodes = all_subs[0]
+    added = [[topic, nodes + ['/benchmark_listener']]] + all_subs[1:]
+    changed = (all_nodes + ['/benchmark_listener'], all_topics, all_pubs, added)
+    return model.GraphDiff.between(state, changed), model.GraphDiff.between(changed, state)
+
+
+def measure_keystrokes(state, tree):
+    controller = Controller(state, synchronous=True)
+    if tree:
+        controller.handle_input('ctrl t')
+    keys = list('camera') + ['backspace'] * len('camera')
+
+    def type_query():
+        for key in keys:
+            controller.handle_input(key)
+    return best_of(type_query) / len(keys)
+
+
+def main(num_nodes=20000, num_topics=80000):
+    state = synthetic.generate_state(num_nodes, num_topics)
+    graph = model.GraphModel(state)
+    build = best_of(lambda: namespaces.NamespaceTree(graph))
+    tree = graph.build_namespace_tree()
+
+    print('graph: %d nodes, %d topics, %d top level namespaces' % (num_nodes, num_topics, len(tree.root.children)))
+    print('trie build:                  %10.1f ms' % (build * 1e3))
+    for query in QUERIES:
+        def tree_rows_uncached():
+            clear_filters(graph)
+            return tree_rows(graph, query)
+
+        def flat():
+            clear_filters(graph)
+            return flat_rows(graph, query)
+        print('%-16r tree: %6d rows %8.2f ms   flat: %6d rows %8.2f ms' % (
+            query, len(tree_rows_uncached()), best_of(tree_rows_uncached) * 1e3, len(flat()), best_of(flat) * 1e3))
+
+    add, remove = one_topic_diffs(state)
+
+    def refresh():
+        graph.apply_diff(add)
+        graph.apply_diff(remove)
+    print('refresh of one topic, patch: %10.2f ms' % (best_of(refresh) / 2 * 1e3))
+    print('refresh of one topic, build: %10.1f ms' % (build * 1e3))
+    print('keystroke, tree:             %10.2f ms' % (measure_keystrokes(state, True) * 1e3))
+    print('keystroke, flat:             %10.2f ms' % (measure_keystrokes(state, False) * 1e3))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
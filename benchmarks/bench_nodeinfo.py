@@ -0,0 +1,71 @@
+"""
+Benchmark of probing node bus info against stand-in node servers.
+
+Every tenth node hangs longer than the probe timeout and another one
+answers garbage. Compares asking the nodes one after another against the
+bounded thread pool of NodeInfoCache, which must get an answer for each.
+Run from the repository root:
+
+    python benchmarks/bench_nodeinfo.py [num_nodes] [timeout]
+"""
+import os
+import sys
+import threading
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rosgraph_tui import nodeinfo
+import synthetic
+
+
+def probe_serially(master, names, timeout):
+    return [nodeinfo.probe(master.uri, name, timeout) for name in names]
+
+
+def probe_pooled(master, names, timeout):
+    done = threading.Event()
+    answered = []
+
+    def notify(name, restyle):
+        answered.append(name)
+        if len(answered) == len(names):
+            done.set()
+
+    cache = nodeinfo.NodeInfoCache(notify, master.uri, timeout)
+    cache.request(names)
+    done.wait()
+    infos = [cache.get(name) for name in names]
+    cache.close()
+    return infos
+
+
+def main(num_nodes=64, timeout=0.5):
+    state = synthetic.generate_state(num_nodes, num_nodes * 4)
+    master = synthetic.StandInMaster(state)
+    nodes = [synthetic.StandInNode(master, name, delay=timeout * 2 if index % 10 == 9 else 0,
+                                   garbage=index % 10 == 4)
+             for index, name in enumerate(state[0])]
+    try:
+        start = timeit.default_timer()
+        serial = probe_serially(master, state[0], timeout)
+        serial_time = timeit.default_timer() - start
+
+        start = timeit.default_timer()
+        pooled = probe_pooled(master, state[0], timeout)
+        pooled_time = timeit.default_timer() - start
+    finally:
+        for node in nodes:
+            node.shutdown()
+        master.shutdown()
+
+    print('nodes: %d, unresponsive: %d/%d, timeout %.1f s' % (
+        num_nodes, sum(not info.is_responsive() for info in serial),
+        sum(not info.is_responsive() for info in pooled), timeout))
+    print('serial probing:   %10.1f ms' % (serial_time * 1e3))
+    print('pooled probing:   %10.1f ms' % (pooled_time * 1e3))
+    print('speedup:          %10.1fx' % (serial_time / pooled_time))
+
+
+if __name__ == '__main__':
+    main(*[float(arg) if index else int(arg) for index, arg in enumerate(sys.argv[1:])])
@@ -0,0 +1,53 @@
+"""
+Benchmark of what the latency instrumentation costs with profiling off and on.
+
+Types a filter and deletes it again on a synthetic graph, once with the
+null profiler and once with a recording one. Run from the repository root:
+
+    python benchmarks/bench_profiling.py [num_nodes] [num_topics]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rosgraph_tui import profiling
+from rosgraph_tui.__main__ import Controller
+import synthetic
+
+
+QUERY = 'camera_1/image'
+
+
+def measure_keystrokes(state, profiler):
+    controller = Controller(state, synchronous=True, profiler=profiler)
+    keys = list(QUERY) + ['backspace'] * len(QUERY)
+
+    def type_query():
+        for key in keys:
+            controller.handle_input(key)
+    return min(timeit.repeat(type_query, number=1, repeat=5)) / len(keys)
+
+
+def measure_span(profiler, number=100000):
+    def span():
+        with profiler.span('stage'):
+            pass
+    return min(timeit.repeat(span, number=number, repeat=3)) / number
+
+
+def main(num_nodes=4000, num_topics=16000):
+    state = synthetic.generate_state(num_nodes, num_topics)
+    off = measure_keystrokes(state, profiling.NULL_PROFILER)
+    on = measure_keystrokes(state, profiling.Profiler())
+
+    print('graph: %d nodes, %d topics' % (num_nodes, num_topics))
+    print('span, profiling off:      %10.3f us' % (measure_span(profiling.NULL_PROFILER) * 1e6))
+    print('span, profiling on:       %10.3f us' % (measure_span(profiling.Profiler()) * 1e6))
+    print('keystroke, profiling off: %10.3f ms' % (off * 1e3))
+    print('keystroke, profiling on:  %10.3f ms' % (on * 1e3))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,63 @@
+"""
+Benchmark of headless queries, one master round trip each against one batch.
+
+Serves a synthetic graph from a stand-in master and answers the same
+queries once by fetching and indexing the graph for every query, like
+separate invocations do, and once from a single fetch like --batch does.
+Run from the repository root:
+
+    python benchmarks/bench_query.py [num_nodes] [num_topics] [num_queries]
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rosgraph_tui import model, query, snapshot
+import synthetic
+
+
+def generate_queries(state, count, seed=1):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        command = rng.choice(['publishers', 'subscribers', 'publications', 'subscriptions', 'topics', 'type'])
+        if command in ('publishers', 'subscribers'):
+            argument = rng.choice(state[1])[0]
+        elif command in ('publications', 'subscriptions'):
+            argument = rng.choice(state[0])
+        elif command == 'topics':
+            argument = rng.choice(state[1])[0].split('/')[-1]
+        else:
+            argument = rng.choice(synthetic.TYPES)
+        queries.append(command + ' ' + argument)
+    return queries
+
+
+def consume(graph, queries):
+    return sum(1 for q in queries for result in query.answer(graph, q))
+
+
+def main(num_nodes=2000, num_topics=8000, num_queries=50):
+    state = synthetic.generate_state(num_nodes, num_topics)
+    master = synthetic.StandInMaster(state)
+    queries = generate_queries(state, num_queries)
+    try:
+        separate = min(timeit.repeat(lambda: [consume(model.GraphModel(snapshot.fetch_state(master.uri)), [q])
+                                              for q in queries], number=1, repeat=3))
+        batch = min(timeit.repeat(lambda: consume(model.GraphModel(snapshot.fetch_state(master.uri)), queries),
+                                  number=1, repeat=3))
+    finally:
+        master.shutdown()
+
+    print('graph: %d nodes, %d topics, %d queries, %d results' % (
+        num_nodes, num_topics, num_queries, consume(model.GraphModel(state), queries)))
+    print('one fetch per query:  %10.1f ms' % (separate * 1e3))
+    print('batch:                %10.1f ms' % (batch * 1e3))
+    print('speedup:              %10.1fx' % (separate / batch))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,90 @@
+"""
+Benchmark of recording graph changes as deltas with keyframes, and of seeking in the recording.
+
+Records a synthetic graph in which a few nodes come and go and topics
+lose and gain subscribers at every change. Compares the size with a
+keyframe for every change and with a single one, and times opening the recording, seeking to
+random changes from the nearest keyframe against applying all deltas
+from the start, and stepping change by change. Run from the repository root:
+
+    python benchmarks/bench_recording.py [num_nodes] [num_topics] [num_changes] [keyframe_interval]
+"""
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rosgraph_tui import recording
+import synthetic
+
+
+def evolve(state, count, seed=1):
+    """Yield count states, each a few changes away from the previous one."""
+    rng = random.Random(seed)
+    graph_state = recording.GraphState.from_state(state)
+    for i in range(count):
+        graph_state = graph_state.copy()
+        node = rng.choice(sorted(graph_state.nodes))
+        graph_state.nodes.discard(node)
+        graph_state.pubs = set(edge for edge in graph_state.pubs if edge[1] != node)
+        graph_state.subs = set(edge for edge in graph_state.subs if edge[1] != node)
+        name = '/respawned_%d' % i
+        graph_state.nodes.add(name)
+        for t in rng.sample(sorted(graph_state.topics), 3):
+            graph_state.subs.add((t, name))
+        yield graph_state.to_state()
+
+
+def record(path, states, keyframe_interval):
+    recorder = recording.Recorder(path, keyframe_interval)
+    for i, state in enumerate(states()):
+        recorder.record(state, float(i))
+    recorder.close()
+    return os.path.getsize(path)
+
+
+def main(num_nodes=2000, num_topics=8000, num_changes=500, keyframe_interval=recording.DEFAULT_KEYFRAME_INTERVAL):
+    state = synthetic.generate_state(num_nodes, num_topics)
+    states = lambda: evolve(state, num_changes)
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'deltas.rgtl')
+    keyframes_only = record(os.path.join(directory, 'keyframes.rgtl'), states, 1)
+    with_deltas = record(path, states, keyframe_interval)
+
+    deltas_only_path = os.path.join(directory, 'deltas_only.rgtl')
+    deltas_only = record(deltas_only_path, states, num_changes + 1)
+
+    opened = min(timeit.repeat(lambda: recording.RecordingReader(path).close(), number=1, repeat=5))
+    reader = recording.RecordingReader(path)
+    rng = random.Random(2)
+    targets = [rng.randrange(len(reader)) for _ in range(20)]
+
+    def measure_seek(reader):
+        def seek():
+            for i in targets:
+                reader.index = None
+                reader.state_at(i)
+        return min(timeit.repeat(seek, number=1, repeat=3)) / len(targets)
+    from_start = measure_seek(recording.RecordingReader(deltas_only_path))
+    from_keyframe = measure_seek(reader)
+    reader.state_at(0)
+    steps = range(1, min(101, len(reader)))
+    step = min(timeit.repeat(lambda: [reader.state_at(i) for i in steps], number=1, repeat=1)) / max(len(steps), 1)
+
+    print('graph: %d nodes, %d topics, %d changes, a keyframe every %d' % (
+        num_nodes, num_topics, len(reader), keyframe_interval))
+    print('size, keyframes only:      %10.1f KiB' % (keyframes_only / 1024.0))
+    print('size, deltas only:         %10.1f KiB' % (deltas_only / 1024.0))
+    print('size, deltas and keyframes:%10.1f KiB' % (with_deltas / 1024.0))
+    print('open:                      %10.3f ms' % (opened * 1e3))
+    print('seek, deltas only:         %10.3f ms' % (from_start * 1e3))
+    print('seek, from keyframe:       %10.3f ms' % (from_keyframe * 1e3))
+    print('step to the next change:   %10.3f ms' % (step * 1e3))
+    reader.close()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,39 @@
+"""
+Startup time from a snapshot file against the live XML-RPC path.
+
+Serves a synthetic graph from a local XML-RPC master, then compares fetching
+it and building the GraphModel with loading a saved snapshot instead. Run
+from the repository root:
+
+    python benchmarks/bench_snapshot.py [num_nodes] [num_topics]
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rosgraph_tui import model, snapshot
+import synthetic
+
+
+def main(num_nodes=2000, num_topics=9000):
+    state = synthetic.generate_state(num_nodes, num_topics)
+    master_uri = synthetic.StandInMaster(state).uri
+    path = os.path.join(tempfile.mkdtemp(), 'graph.rgts')
+    snapshot.save_state(path, state)
+
+    live = min(timeit.repeat(lambda: model.GraphModel(snapshot.fetch_state(master_uri)), number=1, repeat=3))
+    load = min(timeit.repeat(lambda: snapshot.load_state(path), number=1, repeat=3))
+    from_file = min(timeit.repeat(lambda: model.GraphModel(snapshot.load_state(path)), number=1, repeat=3))
+
+    print('graph: %d nodes, %d topics, snapshot file %.1f KiB' % (num_nodes, num_topics,
+                                                                  os.path.getsize(path) / 1024.0))
+    print('live master + index:   %8.1f ms' % (live * 1e3))
+    print('snapshot load:         %8.1f ms' % (load * 1e3))
+    print('snapshot load + index: %8.1f ms' % (from_file * 1e3))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,109 @@
+"""
+Benchmark of the topic monitor against fake publishers.
+
+Publishes on more topics than the monitor may subscribe at once and
+reports how long the rotation takes to measure every topic, the peak
+number of subscriptions and how far the measured rates and bandwidths
+are off. Topics slower than the monitor can measure with the given dwell
+are counted instead, and the rotation is given up after timeout seconds. Then monitors a synthetic graph shown by the UI and times how
+long the UI takes for each update, in name and in rate order.
+Run from the repository root:
+
+    python benchmarks/bench_topicmonitor.py [num_topics] [max_subscriptions] [dwell] [num_nodes] [graph_topics] [timeout]
+"""
+import os
+import Queue
+import random
+import sys
+import threading
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rosgraph_tui import topicmonitor
+from rosgraph_tui.__main__ import Controller
+import synthetic
+
+
+def measure_updates(num_nodes, num_topics, max_subscriptions, dwell, timeout, num_updates=5):
+    """
+    The mean time the UI takes for an update of the monitor, per topic order, while the monitor is measuring.
+
+    An order without any update within timeout seconds gets None.
+    """
+    state = synthetic.generate_state(num_nodes, num_topics)
+    rng = random.Random(0)
+    topics = [t for t, t_type in state[1]]
+    publishers = synthetic.FakePublishers(dict((t, rng.uniform(10, 100)) for t in topics),
+                                          dict((t, 1000) for t in topics))
+    controller = Controller(state, synchronous=True)
+    updates = Queue.Queue()
+    monitor = topicmonitor.TopicMonitor(updates.put, publishers.subscribe, max_subscriptions, dwell)
+    controller.topic_monitor = monitor
+    controller.model.set_topic_monitor(monitor)
+    monitor.set_topics(topics)
+    results = []
+    try:
+        for order in (controller.model.TopicOrders.NAME, controller.model.TopicOrders.RATE):
+            controller.model.set_topic_order(order)
+            controller.model.sort_topic_lists()
+            controller.update_view()
+            samples = []
+            deadline = timeit.default_timer() + timeout
+            while len(samples) < num_updates and timeit.default_timer() < deadline:
+                try:
+                    measured = updates.get(timeout=max(0, deadline - timeit.default_timer()))
+                except Queue.Empty:
+                    break
+                if measured:
+                    samples.append(timeit.timeit(lambda: controller.apply_topic_stats([measured]), number=1))
+            results.append(sum(samples) / len(samples) if samples else None)
+    finally:
+        monitor.close()
+    return results
+
+
+def main(num_topics=64, max_subscriptions=16, dwell=0.5, num_nodes=20000, graph_topics=80000, timeout=60.0):
+    rng = random.Random(0)
+    topics = synthetic.generate_names(num_topics)
+    rates = dict((t, rng.uniform(10, 100)) for t in topics)
+    sizes = dict((t, rng.randint(100, 10000)) for t in topics)
+    publishers = synthetic.FakePublishers(rates, sizes)
+
+    ticked = threading.Event()
+    monitor = topicmonitor.TopicMonitor(lambda topics: ticked.set(), publishers.subscribe, max_subscriptions, dwell)
+    start = timeit.default_timer()
+    monitor.set_topics(topics)
+    monitor.watch(topics[:4])
+    deadline = start + timeout
+    while (any(monitor.rate(t) is None and not monitor.is_slow(t) for t in topics) and
+           timeit.default_timer() < deadline):
+        ticked.wait(max(0, deadline - timeit.default_timer()))
+        ticked.clear()
+    coverage_time = timeit.default_timer() - start
+    monitor.close()
+
+    measured = [t for t in topics if monitor.rate(t) is not None]
+    slow = [t for t in topics if monitor.is_slow(t)]
+    rate_errors = [abs(monitor.rate(t) - rates[t]) / rates[t] for t in measured] or [0]
+    bandwidth_errors = [abs(monitor.bandwidth(t) - rates[t] * sizes[t]) / (rates[t] * sizes[t])
+                        for t in measured] or [0]
+    print('topics: %d, max subscriptions: %d, dwell: %g s' % (num_topics, max_subscriptions, dwell))
+    print('%s after: %8.1f s' % ('all measured' if len(measured) + len(slow) == num_topics else 'gave up',
+                                 coverage_time))
+    print('measured:           %8d' % len(measured))
+    print('below %6.1f Hz:     %8d' % (monitor.min_rate(), len(slow)))
+    print('peak subscriptions: %8d' % publishers.peak)
+    print('rate error:         %8.1f %% mean, %.1f %% max' % (100 * sum(rate_errors) / len(rate_errors),
+                                                             100 * max(rate_errors)))
+    print('bandwidth error:    %8.1f %% mean, %.1f %% max' % (100 * sum(bandwidth_errors) / len(bandwidth_errors),
+                                                             100 * max(bandwidth_errors)))
+
+    print('graph: %d nodes, %d topics' % (num_nodes, graph_topics))
+    for order, update in zip(('name', 'rate'), measure_updates(num_nodes, graph_topics, max_subscriptions, dwell,
+                                                               timeout)):
+        print('update, %s order: %8s' % (order, 'no update' if update is None else '%.2f ms' % (update * 1e3)))
+
+
+if __name__ == '__main__':
+    main(*[float(arg) if index in (2, 5) else int(arg) for index, arg in enumerate(sys.argv[1:])])
@@ -0,0 +1,82 @@
+"""
+Benchmark of the multi-hop traversal queries on a synthetic graph.
+
+Compares a breadth-first search over the name lookups of GraphModel with the
+one of Traversal over the integer adjacency, and with the cached answers.
+Run from the repository root:
+
+    python benchmarks/bench_traversal.py [num_nodes] [num_topics]
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rosgraph_tui import model, traversal
+import synthetic
+
+
+def name_neighborhood(graph, entity, direction):
+    """The downstream or upstream hops of entity, searched through the sorted name lookups."""
+    kind, name = entity
+    seen = set([entity])
+    levels = []
+    frontier = [name]
+    while frontier:
+        if kind == traversal.NODE:
+            lookup = graph.get_publications if direction == traversal.DOWNSTREAM else graph.get_subscriptions
+        else:
+            lookup = graph.get_subscribers if direction == traversal.DOWNSTREAM else graph.get_publishers
+        kind = traversal.TOPIC if kind == traversal.NODE else traversal.NODE
+        next_frontier = []
+        for name in frontier:
+            for neighbor in lookup(name):
+                if (kind, neighbor) not in seen:
+                    seen.add((kind, neighbor))
+                    next_frontier.append(neighbor)
+        if next_frontier:
+            levels.append((kind, sorted(next_frontier)))
+        frontier = next_frontier
+    return levels
+
+
+def measure(query, entities, repeat):
+    def queries():
+        for entity in entities:
+            query(entity)
+    return min(timeit.repeat(queries, number=1, repeat=repeat)) / len(entities)
+
+
+def main(num_nodes=5000, num_topics=20000):
+    state = synthetic.generate_state(num_nodes, num_topics)
+    graph = model.GraphModel(state)
+    rng = random.Random(1)
+    entities = [(traversal.NODE, n) for n in rng.sample(state[0], 10)] + \
+               [(traversal.TOPIC, t) for t, t_type in rng.sample(state[1], 10)]
+    pairs = [(entities[i], entities[-1 - i]) for i in range(10)]
+    edges = sum(len(l) for t, l in state[2]) + sum(len(l) for t, l in state[3])
+
+    def cold(query):
+        def run(entity):
+            graph.version += 1
+            return query(entity)
+        return run
+
+    print('graph: %d nodes, %d topics, %d edges' % (num_nodes, num_topics, edges))
+    for direction in (traversal.DOWNSTREAM, traversal.UPSTREAM):
+        by_name = measure(lambda e: name_neighborhood(graph, e, direction), entities, repeat=3)
+        by_id = measure(cold(lambda e: graph.traversal.neighborhood(e, direction)), entities, repeat=3)
+        cached = measure(lambda e: graph.traversal.neighborhood(e, direction), entities, repeat=3)
+        print('%-10s by name:  %10.3f ms' % (direction, by_name * 1e3))
+        print('%-10s by id:    %10.3f ms' % (direction, by_id * 1e3))
+        print('%-10s cached:   %10.3f us' % (direction, cached * 1e6))
+    path = measure(cold(lambda pair: graph.traversal.shortest_path(*pair)), pairs, repeat=3)
+    cached = measure(lambda pair: graph.traversal.shortest_path(*pair), pairs, repeat=3)
+    print('path       by id:    %10.3f ms' % (path * 1e3))
+    print('path       cached:   %10.3f us' % (cached * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
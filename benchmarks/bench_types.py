@@ -0,0 +1,63 @@
+"""
+Benchmark of finding topics by message type and of the message definition cache.
+
+Compares a scan over all topics, as get_topics_of_type() did before, with
+the type->topics index, times the ':type' filter and the per-type counts,
+and shows what the LRU saves when definitions take a while to load.
+Run from the repository root:
+
+    python benchmarks/bench_types.py [num_nodes] [num_topics] [load_ms]
+"""
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rosgraph_tui import model, msgdefs
+import synthetic
+
+
+def scan_topics_of_type(graph, topic_type):
+    type_id = graph.type_ids.get(topic_type)
+    return [t for t in graph.sorted_topics if graph.topic_type_ids[graph.topic_ids[t]] == type_id]
+
+
+def measure(function, number=20):
+    return min(timeit.repeat(function, number=number, repeat=3)) / number
+
+
+def main(num_nodes=20000, num_topics=80000, load_ms=20):
+    graph = model.GraphModel(synthetic.generate_state(num_nodes, num_topics))
+    topic_type = 'sensor_msgs/PointCloud2'
+    assert scan_topics_of_type(graph, topic_type) == graph.get_topics_of_type(topic_type)
+
+    scan = measure(lambda: scan_topics_of_type(graph, topic_type))
+    index = measure(lambda: graph.get_topics_of_type(topic_type))
+    type_filter = measure(lambda: graph.get_topics(':PointCloud2 camera'))
+    all_counts = measure(lambda: graph.type_counts())
+    filtered_counts = measure(lambda: graph.type_counts(graph.get_topics('camera')))
+
+    def load(t):
+        time.sleep(load_ms / 1e3)
+        return t
+    # browsing back and forth between topics of a few types
+    browsed = [synthetic.TYPES[i % 4] for i in range(40)]
+    uncached = measure(lambda: [load(t) for t in browsed], number=1)
+    definitions = msgdefs.DefinitionCache(load=load)
+    cached = measure(lambda: [definitions.get(t) for t in browsed], number=1)
+
+    print('graph: %d nodes, %d topics, %d of type %s' % (
+        num_nodes, num_topics, len(graph.get_topics_of_type(topic_type)), topic_type))
+    print('topics of type, scan:      %10.3f ms' % (scan * 1e3))
+    print('topics of type, index:     %10.3f ms' % (index * 1e3))
+    print(':PointCloud2 camera:       %10.3f ms' % (type_filter * 1e3))
+    print('counts per type, all:      %10.3f ms' % (all_counts * 1e3))
+    print('counts per type, filtered: %10.3f ms' % (filtered_counts * 1e3))
+    print('%d definitions, no cache:  %10.1f ms' % (len(browsed), uncached * 1e3))
+    print('%d definitions, LRU:       %10.1f ms' % (len(browsed), cached * 1e3))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,198 @@
+"""
+Benchmark suite for the whole rosgraph_tui pipeline on synthetic graphs.
+
+Measures each stage at several graph sizes against a stand-in ROS master,
+writes the results as JSON and compares them against a baseline file.
+Run from the repository root:
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --baseline results.json
+
+Keystrokes go through the main loop and its widgets like real input, and
+a filter typed that way must arrive in the controller unchanged. With a
+baseline, the exit status is 1 if any stage got slower than the
+tolerance allows. Stages below --min-time are too noisy to count.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+
+import urwid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rosgraph_tui import model, snapshot
+from rosgraph_tui.__main__ import Controller
+import synthetic
+
+
+SIZES = [100, 1000, 10000, 100000]
+QUERY = 'camera_1/image'
+# a space and keys after it, which the focused list must leave to the filter
+TYPED_FILTER = 'cam :I'
+RENDER_SIZE = (160, 50)
+
+
+def best_of(function, repeat=3):
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100.0))]
+
+
+def press(controller, key):
+    """Feed key to the main loop, which passes it through the focused widgets before the controller."""
+    controller.loop.screen_size = RENDER_SIZE
+    controller.loop.process_input([key])
+
+
+def check_typed_filter(controller):
+    for key in TYPED_FILTER:
+        press(controller, key)
+    if controller.filter_string != TYPED_FILTER or controller.main_mode != controller.Modes.NODES_AND_TOPICS:
+        raise AssertionError('typing %r left the filter at %r in mode %s' % (
+            TYPED_FILTER, controller.filter_string, controller.main_mode))
+    for _ in TYPED_FILTER:
+        press(controller, 'backspace')
+
+
+def measure_keystrokes(controller):
+    samples = []
+    keys = list(QUERY) + ['backspace'] * len(QUERY)
+    for key in keys:
+        samples.append(best_of(lambda: press(controller, key), repeat=1))
+    return percentile(samples, 50), percentile(samples, 99)
+
+
+def measure_choice(controller, choice):
+    def choose():
+        controller.handle_choice(None, None, choice, controller.view.Columns.MIDDLE)
+
+    def reset():
+        while controller.main_mode != controller.Modes.NODES_AND_TOPICS:
+            controller.handle_input('esc')
+
+    samples = []
+    for _ in range(3):
+        reset()
+        samples.append(best_of(choose, repeat=1))
+    reset()
+    return min(samples)
+
+
+def measure_refresh(controller, state):
+    """A refresh that adds a subscriber to one topic and one that takes it away again, on the full lists."""
+    all_nodes, all_topics, all_pubs, all_subs = state
+    topic, nodes = all_subs[len(all_subs) // 2]
+    changed = (all_nodes + ['/benchmark_listener'], all_topics, all_pubs,
+               [[topic, nodes + ['/benchmark_listener']]] + all_subs)
+    diffs = model.GraphDiff.between(state, changed), model.GraphDiff.between(changed, state)
+
+    def refresh():
+        for diff in diffs:
+            controller.apply_refresh((diff, controller.status))
+    return best_of(refresh) / len(diffs)
+
+
+def wait_until_loaded(controller):
+    def check(loop=None, user_data=None):
+        if not controller.loading:
+            raise urwid.ExitMainLoop()
+        controller.loop.set_alarm_in(0.01, check)
+    check()
+    controller.loop.event_loop.run()
+
+
+def measure_first_frame(master):
+    """Time from starting the UI until its first frame, while the graph still loads in the background."""
+    samples = []
+    for _ in range(3):
+        start = timeit.default_timer()
+        controller = Controller()
+        controller.load(snapshot.fetch_state, master.uri)
+        controller.view.main_widget_with_attr.render(RENDER_SIZE, focus=True)
+        samples.append(timeit.default_timer() - start)
+        wait_until_loaded(controller)
+    return min(samples)
+
+
+def run_stages(entities):
+    num_nodes = max(1, entities // 5)
+    state = synthetic.generate_state(num_nodes, entities - num_nodes)
+    master = synthetic.StandInMaster(state)
+    try:
+        results = {}
+        results['time_to_first_frame'] = measure_first_frame(master)
+        results['fetch_and_index'] = best_of(lambda: model.GraphModel(snapshot.fetch_state(master.uri)))
+
+        graph_model = model.Model(state)
+        results['set_main_lists'] = best_of(lambda: (graph_model.set_main_node_list(graph_model.graph.get_nodes()),
+                                                     graph_model.set_main_topic_list(graph_model.graph.get_topics())))
+
+        controller = Controller(snapshot.fetch_state(master.uri), synchronous=True)
+        check_typed_filter(controller)
+        results['keystroke_p50'], results['keystroke_p99'] = measure_keystrokes(controller)
+        results['node_choice'] = measure_choice(controller, 'N ' + state[0][len(state[0]) // 2])
+        results['topic_choice'] = measure_choice(controller, 'T ' + state[1][len(state[1]) // 2][0])
+        results['refresh_one_topic'] = measure_refresh(controller, state)
+        results['update_view'] = best_of(controller.update_view)
+        results['restyle_all'] = best_of(lambda: (setattr(controller, 'style_version', controller.style_version + 1),
+                                                  controller.update_view()))
+        results['render'] = best_of(lambda: controller.view.main_widget_with_attr.render(RENDER_SIZE, focus=True))
+        return results
+    finally:
+        master.shutdown()
+
+
+def compare(results, baseline, tolerance, min_time):
+    regressions = []
+    print('%-10s %-16s %12s %12s %8s' % ('entities', 'stage', 'baseline', 'current', 'ratio'))
+    for entities, stages in sorted(results.items(), key=lambda item: int(item[0])):
+        for stage, seconds in sorted(stages.items()):
+            before = baseline.get(entities, {}).get(stage)
+            if not before:
+                continue
+            ratio = seconds / before
+            marker = ' <-- regression' if ratio > tolerance and seconds > min_time else ''
+            print('%-10s %-16s %10.3fms %10.3fms %7.2fx%s' % (entities, stage, before * 1e3, seconds * 1e3, ratio,
+                                                              marker))
+            if marker:
+                regressions.append((entities, stage))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the rosgraph_tui pipeline on synthetic graphs.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='graph sizes in nodes plus topics')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='compare against the results in this JSON file')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='slowdown factor against the baseline that counts as regression (default: %(default)s)')
+    parser.add_argument('--min-time', type=float, default=0.002,
+                        help='never count stages faster than this many seconds as regression (default: %(default)s)')
+    options = parser.parse_args()
+
+    results = {}
+    for entities in options.sizes:
+        results[str(entities)] = run_stages(entities)
+        print('%d entities: %s' % (entities, ', '.join('%s %.3fms' % (stage, seconds * 1e3)
+                                                       for stage, seconds in sorted(results[str(entities)].items()))))
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump({'python': platform.python_version(), 'results': results}, f, indent=2, sort_keys=True)
+
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, options.tolerance, options.min_time):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
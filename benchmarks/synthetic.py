@@ -0,0 +1,274 @@
+"""
+Synthetic ROS graphs and a stand-in ROS master for benchmarks and manual testing.
+
+Run it to serve a synthetic graph and point rosgraph_tui at it:
+
+    python benchmarks/synthetic.py --nodes 2000 --topics 9000 &
+    ROS_MASTER_URI=http://127.0.0.1:11311/ python -m rosgraph_tui
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from SimpleXMLRPCServer import SimpleXMLRPCRequestHandler, SimpleXMLRPCServer
+from SocketServer import ThreadingMixIn
+
+
+WORDS = ['camera', 'lidar', 'imu', 'gps', 'planner', 'control', 'odom', 'map', 'tf', 'points', 'image', 'raw',
+         'driver', 'fusion', 'tracker', 'radar', 'diagnostics', 'state', 'cmd', 'status']
+
+TYPES = ['std_msgs/String', 'std_msgs/Header', 'sensor_msgs/Image', 'sensor_msgs/PointCloud2', 'sensor_msgs/Imu',
+         'nav_msgs/Odometry', 'geometry_msgs/Twist', 'tf2_msgs/TFMessage', 'diagnostic_msgs/DiagnosticArray']
+
+
+def generate_names(count, namespace_depth=2, seed=0):
+    """Return count unique, sorted ROS names below namespaces up to namespace_depth levels deep."""
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        depth = rng.randint(0, namespace_depth)
+        parts = [rng.choice(WORDS) + '_%d' % rng.randint(0, 99) for _ in range(depth + 1)]
+        names.add('/' + '/'.join(parts))
+    return sorted(names)
+
+
+def generate_state(num_nodes, num_topics, fan_in=3, fan_out=4, namespace_depth=2, seed=0):
+    """
+    Generate a graph state (all_nodes, all_topics, all_pubs, all_subs) like the master reports it.
+
+    Every topic gets 1 to fan_in publishers and 0 to fan_out subscribers.
+    Every node publishes at least one topic, so no node drops out of the system state.
+    """
+    rng = random.Random(seed)
+    nodes = generate_names(num_nodes, namespace_depth, seed)
+    topics = generate_names(num_topics, namespace_depth, seed + 1)
+
+    all_pubs = []
+    all_subs = []
+    for index, t in enumerate(topics):
+        publishers = set(rng.sample(nodes, rng.randint(1, min(fan_in, len(nodes)))))
+        all_pubs.append([t, publishers])
+        subscribers = rng.sample(nodes, rng.randint(0, min(fan_out, len(nodes))))
+        if subscribers:
+            all_subs.append([t, subscribers])
+    for index, n in enumerate(nodes):
+        all_pubs[index % len(all_pubs)][1].add(n)
+    all_pubs = [[t, sorted(l)] for t, l in all_pubs]
+
+    all_topics = [[t, rng.choice(TYPES)] for t in topics]
+    return nodes, all_topics, all_pubs, all_subs
+
+
+class ThreadingXMLRPCServer(ThreadingMixIn, SimpleXMLRPCServer):
+    daemon_threads = True
+
+
+class MasterApi:
+    """The part of the ROS master API rosgraph_tui talks to."""
+
+    def __init__(self, master):
+        self.master = master
+
+    def getSystemState(self, caller_id):
+        all_nodes, all_topics, all_pubs, all_subs = self.master.respond()
+        return 1, 'current system state', [all_pubs, all_subs, []]
+
+    def getPublishedTopics(self, caller_id, subgraph):
+        all_nodes, all_topics, all_pubs, all_subs = self.master.respond()
+        return 1, 'current topics', [[t, t_type] for t, t_type in all_topics if t.startswith(subgraph)]
+
+    def lookupNode(self, caller_id, node_name):
+        uri = self.master.node_uris.get(node_name)
+        if uri is None:
+            return -1, 'unknown node [%s]' % node_name, ''
+        return 1, 'node api', uri
+
+
+class StandInMaster:
+    """
+    A local XML-RPC server standing in for the ROS master.
+
+    It serves a graph state that can be replaced at any time with set_state(),
+    optionally delays every call to mimic a remote master, and can refuse
+    system.multicall like masters without multicall support.
+    """
+
+    def __init__(self, state, port=0, delay=0, multicall=True):
+        self.state = state
+        self.delay = delay
+        self.node_uris = {}
+        self.server = ThreadingXMLRPCServer(('127.0.0.1', port), logRequests=False, allow_none=True)
+        self.server.register_instance(MasterApi(self))
+        if multicall:
+            self.server.register_multicall_functions()
+        self.uri = 'http://127.0.0.1:%d/' % self.server.server_address[1]
+
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def respond(self):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.state
+
+    def set_state(self, state):
+        self.state = state
+
+    def register_node(self, name, uri):
+        self.node_uris[name] = uri
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class NodeApi:
+    """The part of the ROS slave API rosgraph_tui talks to."""
+
+    def __init__(self, node):
+        self.node = node
+
+    def getPid(self, caller_id):
+        self.node.respond()
+        return 1, 'pid', self.node.pid
+
+    def getBusInfo(self, caller_id):
+        self.node.respond()
+        return 1, 'bus info', self.node.bus_info()
+
+
+class GarbageRequestHandler(SimpleXMLRPCRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers['content-length']))
+        body = '<methodResponse><params><param>garbage'
+        self.send_response(200)
+        self.send_header('Content-type', 'text/xml')
+        self.send_header('Content-length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandInNode:
+    """
+    A local XML-RPC server standing in for the slave API of one node.
+
+    It registers itself at the stand-in master and reports a TCPROS
+    connection for every peer on its topics in the master's state. A delay
+    longer than the probe timeout makes it look hung, garbage=True makes it
+    answer every call with a body that is no XML-RPC response.
+    """
+
+    def __init__(self, master, name, pid=None, delay=0, garbage=False):
+        self.master = master
+        self.name = name
+        self.pid = os.getpid() if pid is None else pid
+        self.delay = delay
+        self.server = ThreadingXMLRPCServer(('127.0.0.1', 0), logRequests=False, allow_none=True,
+                                            requestHandler=GarbageRequestHandler if garbage else
+                                            SimpleXMLRPCRequestHandler)
+        self.server.register_instance(NodeApi(self))
+        self.uri = 'http://127.0.0.1:%d/' % self.server.server_address[1]
+        master.register_node(name, self.uri)
+
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def respond(self):
+        if self.delay:
+            time.sleep(self.delay)
+
+    def bus_info(self):
+        all_nodes, all_topics, all_pubs, all_subs = self.master.state
+        connections = []
+        for own, peers, direction in ((all_pubs, all_subs, 'o'), (all_subs, all_pubs, 'i')):
+            peers_by_topic = dict((t, l) for t, l in peers)
+            for t, l in own:
+                if self.name in l:
+                    for peer in peers_by_topic.get(t, []):
+                        connections.append([len(connections), peer, direction, 'TCPROS', t, True, ''])
+        return connections
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeSubscription:
+    def __init__(self, publishers, callback, rate, size):
+        self.publishers = publishers
+        self.callback = callback
+        self.rate = rate
+        self.size = size
+        self.stopped = threading.Event()
+
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        interval = 1.0 / self.rate
+        deadline = time.time()
+        while not self.stopped.wait(max(0, deadline - time.time())):
+            self.callback(self.size)
+            deadline += interval
+
+    def unregister(self):
+        self.stopped.set()
+        self.thread.join()
+        self.publishers.active.discard(self)
+
+
+class FakePublishers:
+    """
+    Stands in for rospy subscriptions in the topic monitor.
+
+    Every subscription receives messages of a fixed size at a fixed rate
+    per topic on a thread of its own. peak is the most subscriptions that
+    were ever active at once.
+    """
+
+    def __init__(self, rates, sizes):
+        self.rates = rates
+        self.sizes = sizes
+        self.active = set()
+        self.peak = 0
+
+    def subscribe(self, topic, callback):
+        subscription = FakeSubscription(self, callback, self.rates[topic], self.sizes[topic])
+        self.active.add(subscription)
+        self.peak = max(self.peak, len(self.active))
+        return subscription
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a synthetic ROS graph from a stand-in ROS master.')
+    parser.add_argument('--nodes', type=int, default=1000)
+    parser.add_argument('--topics', type=int, default=4000)
+    parser.add_argument('--fan-in', type=int, default=3, help='maximum publishers per topic')
+    parser.add_argument('--fan-out', type=int, default=4, help='maximum subscribers per topic')
+    parser.add_argument('--namespace-depth', type=int, default=2)
+    parser.add_argument('--delay', type=float, default=0, help='seconds to delay every master call')
+    parser.add_argument('--port', type=int, default=11311)
+    parser.add_argument('--node-servers', type=int, default=0, metavar='COUNT',
+                        help='serve the slave API of the first COUNT nodes, every tenth of them hung')
+    options = parser.parse_args()
+
+    state = generate_state(options.nodes, options.topics, options.fan_in, options.fan_out, options.namespace_depth)
+    master = StandInMaster(state, options.port, options.delay)
+    nodes = [StandInNode(master, name, delay=3600 if index % 10 == 9 else 0)
+             for index, name in enumerate(state[0][:options.node_servers])]
+    print('ROS_MASTER_URI=%s' % master.uri)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for node in nodes:
+            node.shutdown()
+        master.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,29 +1,119 @@
 from enum import Enum
+import argparse
+import os
 import sys
 import signal
+import time
 
 import urwid
 
+import background
+import history
+import masters
 import model
+import msgdefs
+import namespaces
+import nodeinfo
+import profiling
+import query
+import recording
+import snapshot
+import topicmonitor
+import traversal
 import view
 
 
 class Controller:
-    Modes = Enum('NODES_AND_TOPICS', 'NODES', 'TOPICS')
-    InputLabels = {'NODES_AND_TOPICS': 'Input', 'NODES': 'Subscriptions', 'TOPICS': 'Publishers'}
-    OutputLabels = {'NODES_AND_TOPICS': 'Output', 'NODES': 'Publications', 'TOPICS': 'Subscribers'}
+    FILTER_DEBOUNCE = 0.03
+    MAX_TYPE_COUNTS = 40
+    REPLAY_JUMP = 60.0
 
-    def __init__(self):
+    Modes = Enum('NODES_AND_TOPICS', 'NODES', 'TOPICS', 'TRAVERSAL')
+    InputLabels = {'NODES_AND_TOPICS': 'Input', 'NODES': 'Subscriptions', 'TOPICS': 'Publishers', 'TRAVERSAL': 'Input'}
+    OutputLabels = {'NODES_AND_TOPICS': 'Output', 'NODES': 'Publications', 'TOPICS': 'Subscribers',
+                    'TRAVERSAL': 'Output'}
+
+    def __init__(self, state=None, fuzzy=False, refresh_interval=0, timeout=snapshot.DEFAULT_TIMEOUT,
+                 synchronous=False, master_uri=None, master_group=None, probe_nodes=False, monitor_topics=0,
+                 subscribe=topicmonitor.rospy_subscribe, profiler=profiling.NULL_PROFILER, replay=None):
+        """
+        Without a state, the graph starts out empty until load() fills it in.
+        With probe_nodes=True, the nodes in view are asked for their pid and
+        connections, and unresponsive ones are marked. With monitor_topics,
+        up to that many topics at once are subscribed through subscribe to
+        measure their rate and bandwidth.
+
+        A masters.MasterGroup as master_group is refreshed and probed
+        instead of the single master at master_uri.
+
+        With synchronous=True, loading, filtering and refreshing run right
+        away on the calling thread instead of on background workers, which
+        is what benchmarks need.
+
+        A profiling.Profiler as profiler times the stages of every input
+        and background update, ctrl+p shows the breakdown of the last one.
+
+        A recording.RecordingReader as replay is stepped through with
+        '[', ']', '{' and '}', after load(self.replay_state, 0).
+
+        Every choice, traversal and esc leaves a step in a history.History,
+        which alt+left and alt+right go back and forward through.
+        """
         self.main_mode = self.Modes.NODES_AND_TOPICS
+        self.fuzzy = fuzzy
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self.master_uri = master_uri
+        self.master_group = master_group
+        self.status = ''
+        self.loading = False
+        self.load_error = None
+        self.profiler = profiler
 
-        self.model = model.Model()
+        self.model = model.Model(model.EMPTY_STATE if state is None else state)
+        self.model.profiler = profiler
+        # the graph model only keeps interned names, so refreshing diffs against the last raw state
+        self.state = None
+        if state is not None:
+            self.state = state if refresh_interval > 0 else None
+            if self.fuzzy:
+                self.model.graph.build_fuzzy_index()
 
         self.view = view.MainView([], [], [])
+        self.view.profiler = profiler
         self.view.set_focus(self.view.Columns.MIDDLE)
 
         self.filter_string = ''
+        self.filter_alarm = None
+        self.filter_worker = None
+        self.graph_worker = None
+        self.node_info = None
+        self.topic_monitor = None
+        self.definitions = msgdefs.DefinitionCache()
+        # the first and last position in view, by column
+        self.visible = {}
         self.choice = ''
         self.choice_type = self.model.ListEntryTypes.NODE
+        # the TRAVERSAL mode lists (hop, kind, name) entries, the query and the mode it was entered from
+        self.traversal_entries = model.EntryList()
+        self.traversal_query = None
+        self.traversal_title = ''
+        self.traversal_origin = None
+        self.path_anchor = None
+        # the NODES_AND_TOPICS mode shows a namespace tree instead of flat lists while show_tree is set
+        self.show_tree = False
+        self.expanded = set()
+        self.tree_rows = model.EntryList()
+        # the graph, its version, the filter and the expanded namespaces of the tree rows
+        self.tree_rows_key = None
+        # the choice the columns were styled for, and a counter of changes to the styles of all entries
+        self.shown_choice = self.choice
+        self.style_version = 0
+        # the index of the replayed change asked for and the recording.GraphState shown
+        self.replay = replay
+        self.replay_index = 0
+        self.replay_shown = None
+        self.history = history.History()
 
         self.update_view()
 
@@ -33,14 +123,131 @@ class Controller:
                              self.view.Columns.MIDDLE)
         urwid.connect_signal(self.view.main_widget.column_right.list, 'choice', self.handle_choice,
                              self.view.Columns.RIGHT)
+        urwid.connect_signal(self.view.main_widget.column_left.list, 'visible', self.handle_visible,
+                             self.view.Columns.LEFT)
+        urwid.connect_signal(self.view.main_widget.column_middle.list, 'visible', self.handle_visible,
+                             self.view.Columns.MIDDLE)
+        urwid.connect_signal(self.view.main_widget.column_right.list, 'visible', self.handle_visible,
+                             self.view.Columns.RIGHT)
+        # focus changes in the middle column pick the topic whose message definition is shown
+        urwid.connect_signal(self.view.main_widget.column_middle.list.body, 'modified', self.update_definition)
 
-        self.loop = urwid.MainLoop(self.view.main_widget_with_attr, self.view.palette, unhandled_input=self.handle_input)
+        if profiler.enabled:
+            self.loop = profiling.ProfiledMainLoop(profiler, self.view.main_widget_with_attr, self.view.palette,
+                                                   unhandled_input=self.handle_input)
+            self.loop.on_frame = self.update_profile
+        else:
+            self.loop = urwid.MainLoop(self.view.main_widget_with_attr, self.view.palette,
+                                       unhandled_input=self.handle_input)
+        if not synchronous:
+            self.filter_worker = background.Worker(self.loop)
+            # loads the graph first and refreshes it afterwards
+            self.graph_worker = background.Worker(self.loop)
+            if probe_nodes:
+                mailbox = background.Mailbox(self.loop, self.apply_node_info)
+                self.node_info = nodeinfo.NodeInfoCache(lambda name, restyle: mailbox.post((name, restyle)),
+                                                        master_uri, timeout,
+                                                        resolve=master_group and master_group.resolve)
+                self.model.set_node_info(self.node_info)
+                self.schedule_probe()
+            mailbox = background.Mailbox(self.loop, lambda types: self.update_definition())
+            self.definitions = msgdefs.DefinitionCache(mailbox.post)
+            if monitor_topics:
+                mailbox = background.Mailbox(self.loop, self.apply_topic_stats)
+                self.topic_monitor = topicmonitor.TopicMonitor(mailbox.post, subscribe, monitor_topics)
+                self.topic_monitor.set_topics(list(self.model.graph.sorted_topics))
+                self.model.set_topic_monitor(self.topic_monitor)
+        if state is not None:
+            self.schedule_refresh()
 
     def run(self):
-        self.loop.run()
+        try:
+            self.loop.run()
+        finally:
+            self.close()
+
+    def close(self):
+        """End the topic subscriptions and the threads that probe nodes and load message definitions."""
+        if self.topic_monitor:
+            self.topic_monitor.close()
+        if self.node_info:
+            self.node_info.close()
+        self.definitions.close()
+
+    def load(self, fetch, *args):
+        """
+        Fill in the graph returned by fetch(*args) without blocking the UI.
+
+        The state is fetched and then indexed on the graph worker, and the
+        footer shows which of the two is going on. Keys typed meanwhile
+        only change the filter, which is applied once the graph is there.
+        """
+        self.loading = True
+        self.status = u'loading graph\u2026'
+        self.update_footer()
+        fetch_state = self.profiler.wrap('fetch', self.fetch_state)
+        if self.graph_worker is None:
+            self.apply_state(fetch_state(fetch, args))
+        else:
+            self.graph_worker.submit(fetch_state, self.apply_state, fetch, args)
+
+    @staticmethod
+    def fetch_state(fetch, args):
+        """Runs on the graph worker."""
+        try:
+            return fetch(*args), None
+        except (snapshot.MasterError, snapshot.SnapshotFileError) as error:
+            return None, str(error)
+
+    def apply_state(self, result):
+        state, error = result
+        if error is not None:
+            self.load_error = error
+            raise urwid.ExitMainLoop()
+        self.status = u'indexing %d nodes and %d topics\u2026' % snapshot.state_size(state)
+        self.update_footer()
+        index_state = self.profiler.wrap('index', self.index_state)
+        if self.graph_worker is None:
+            self.apply_graph(index_state(state, self.fuzzy, self.show_tree))
+        else:
+            self.graph_worker.submit(index_state, self.apply_graph, state, self.fuzzy, self.show_tree)
+
+    @staticmethod
+    def index_state(state, fuzzy, tree):
+        """Runs on the graph worker, the UI keeps using the empty graph until this one is done."""
+        graph = model.GraphModel(state)
+        if fuzzy:
+            graph.build_fuzzy_index()
+        if tree:
+            graph.build_namespace_tree()
+        return state, graph
+
+    def apply_graph(self, result):
+        state, graph = result
+        self.loading = False
+        self.status = self.master_group.status() if self.master_group else ''
+        if self.replay:
+            self.status = self.replay_status(self.replay_index, None)
+        self.state = state if self.refresh_interval > 0 else None
+        self.model.set_graph(graph)
+        # the cached views hold entries of the old graph, which would stay in memory
+        self.history.views.clear()
+        if self.topic_monitor:
+            self.topic_monitor.set_topics(list(graph.sorted_topics))
+        if self.filter_string:
+            self.schedule_filter()
+        self.update_view()
+        self.schedule_refresh()
 
     def show_all_or_exit_on_esc(self, key):
         if key == 'esc':
+            self.remember()
+        if key == 'esc' and self.main_mode == self.Modes.TRAVERSAL:
+            self.cancel_filter()
+            self.filter_string = ''
+            self.leave_traversal()
+        elif key == 'esc':
+            self.cancel_filter()
             is_node_selected = len(self.model.main_node_list) == 1
             is_topic_selected = len(self.model.main_topic_list) == 1
             is_node_filter_active = len(self.model.main_node_list) != len(self.model.graph.get_nodes())
@@ -76,7 +283,7 @@ class Controller:
                 self.handle_choice(None, None, selection, self.view.Columns.RIGHT)
 
     def update_filter(self, key):
-        if isinstance(key, str) and key in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_/':
+        if isinstance(key, str) and key in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_/@: ':
             self.filter_string = self.filter_string + key
             return True
         elif key == 'backspace':
@@ -84,16 +291,597 @@ class Controller:
             return True
         return False
 
+    def toggle_fuzzy(self, key):
+        if key == 'ctrl f':
+            self.fuzzy = not self.fuzzy
+            return True
+        return False
+
+    def cycle_topic_order(self, key):
+        if key == 'ctrl r':
+            orders = list(self.model.TopicOrders)
+            self.model.set_topic_order(orders[(orders.index(self.model.topic_order) + 1) % len(orders)])
+            self.refresh_lists()
+
+    def traverse(self, key):
+        """
+        '>' and '<' list everything downstream or upstream of the chosen node or topic, grouped by hops.
+        '*' marks the chosen one as anchor and '=' lists a shortest path between the anchor and the chosen one.
+        """
+        if key not in ('<', '>', '*', '='):
+            return
+        entity = self.chosen_entity()
+        if entity is None:
+            return
+        if key == '*':
+            self.path_anchor = entity
+            self.update_footer()
+            return
+        if key == '=' and self.path_anchor is None:
+            return
+        self.remember()
+        self.traversal_query = (key, entity, self.path_anchor)
+        if self.main_mode != self.Modes.TRAVERSAL:
+            self.traversal_origin = (self.main_mode, self.choice)
+        self.main_mode = self.Modes.TRAVERSAL
+        self.model.set_input_list([])
+        self.model.set_output_list([])
+        self.run_traversal()
+        self.update_view()
+        self.view.set_focus(self.view.Columns.MIDDLE)
+
+    def chosen_entity(self):
+        """The node or topic focused in the middle column, else the chosen one, as (kind, name) or None."""
+        selection = self.view.get_selection()
+        if not selection or self.view.get_selected_column() != self.view.Columns.MIDDLE.index:
+            selection = None
+        if self.main_mode == self.Modes.NODES:
+            return traversal.NODE, selection or self.choice
+        elif self.main_mode == self.Modes.TOPICS:
+            return traversal.TOPIC, selection or self.choice
+        elif self.main_mode == self.Modes.TRAVERSAL:
+            if selection is None:
+                return self.traversal_query[1]
+            hop, kind, name = selection.split(' ', 2)
+            return kind, name
+        elif selection is not None and selection.lstrip(' ')[:2] in ('N ', 'T '):
+            name, entry_type = self.get_list_entry(selection)
+            return traversal.NODE if entry_type == self.model.ListEntryTypes.NODE else traversal.TOPIC, name
+        return None
+
+    def run_traversal(self):
+        with self.profiler.span('traversal'):
+            self.query_traversal()
+
+    def query_traversal(self):
+        key, entity, anchor = self.traversal_query
+        graph_traversal = self.model.graph.traversal
+        if key == '=':
+            path = graph_traversal.shortest_path(anchor, entity)
+            source, target = anchor, entity
+            if path is None:
+                path = graph_traversal.shortest_path(entity, anchor)
+                source, target = entity, anchor
+            self.traversal_entries.replace((hop, kind, name) for hop, (kind, name) in enumerate(path or []))
+            self.traversal_title = 'Path %s to %s' % (source[1], target[1]) if path else \
+                'No path between %s and %s' % (anchor[1], entity[1])
+        else:
+            direction = traversal.DOWNSTREAM if key == '>' else traversal.UPSTREAM
+            levels = graph_traversal.neighborhood(entity, direction)
+            self.traversal_entries.replace((hop, kind, name) for hop, (kind, names) in enumerate(levels, 1)
+                                           for name in names)
+            self.traversal_title = '%s of %s' % (direction.capitalize(), entity[1])
+
+    def leave_traversal(self):
+        self.main_mode, self.choice = self.traversal_origin
+        self.compute_lists()
+        self.update_view()
+        self.view.set_focus(self.view.Columns.MIDDLE)
+
+    def compute_lists(self):
+        """Fill the lists of the mode from the graph, the choice and the filter."""
+        if self.main_mode == self.Modes.NODES:
+            self.handle_node_choice(self.choice)
+        elif self.main_mode == self.Modes.TOPICS:
+            self.handle_topic_choice(self.choice)
+        elif self.main_mode == self.Modes.TRAVERSAL:
+            self.model.set_input_list([])
+            self.model.set_output_list([])
+            self.run_traversal()
+        else:
+            self.model.set_main_node_list(self.model.graph.get_nodes(self.filter_string, self.fuzzy))
+            self.model.set_main_topic_list(self.model.graph.get_topics(self.filter_string, self.fuzzy))
+            self.model.set_input_list([])
+            self.model.set_output_list([])
+
+    def remember(self):
+        """Leave the current view as a step of the history, for a new one."""
+        self.history.visit(self.current_step(), self.current_view())
+
+    def current_step(self):
+        return history.Step(self.main_mode, self.choice, self.filter_string, self.fuzzy, self.show_tree,
+                            frozenset(self.expanded),
+                            (self.traversal_query, self.traversal_title, self.traversal_origin),
+                            self.view.get_focus_positions())
+
+    def current_view(self):
+        """The contents of the lists and columns as a history.CachedView, or None while they lag behind the filter."""
+        if self.loading or self.is_filtering():
+            return None
+        with self.profiler.span('cache_view'):
+            return history.CachedView(self.view_validity(), [list(entries) for entries in self.history_lists()],
+                                      self.tree_rows_key,
+                                      [list(self.view.get_choices(column)) for column in self.view.Columns],
+                                      self.style_version)
+
+    def view_validity(self):
+        """What the entries of a cached view depend on besides the step."""
+        return self.model.graph, self.model.graph.version, self.model.topic_order
+
+    def history_lists(self):
+        return (self.model.input_list, self.model.main_node_list, self.model.main_topic_list, self.model.output_list,
+                self.traversal_entries, self.tree_rows)
+
+    def go_back_or_forward(self, key):
+        """
+        alt+left goes back to the step before, alt+right forward again.
+
+        A step whose cached view is still valid is shown without asking the
+        graph, and its columns without building their choices again.
+        Otherwise its lists are computed from its mode, choice and filter.
+        """
+        if self.loading:
+            return
+        if key == 'meta left' and self.history.can_go_back():
+            step = self.history.back(self.current_step(), self.current_view())
+        elif key == 'meta right' and self.history.can_go_forward():
+            step = self.history.forward(self.current_step(), self.current_view())
+        else:
+            return
+        with self.profiler.span('restore'):
+            self.restore(step)
+
+    def restore(self, step):
+        self.cancel_filter()
+        self.main_mode, self.choice, self.filter_string = step.mode, step.choice, step.filter_string
+        self.fuzzy, self.show_tree, self.expanded = step.fuzzy, step.show_tree, set(step.expanded)
+        self.traversal_query, self.traversal_title, self.traversal_origin = step.traversal
+        cached = self.history.view(step)
+        if cached is not None and cached.validity == self.view_validity():
+            for entries, items in zip(self.history_lists(), cached.lists):
+                entries.replace(items)
+            self.tree_rows_key = cached.tree_rows_key
+            if cached.style_version == self.style_version:
+                self.shown_choice = self.choice
+                for (column, layout, segments), choices in zip(self.column_lists(), cached.choices):
+                    self.view.set_list(self.list_key(layout, segments), list(choices), column,
+                                       step.focus[1][column.index])
+        else:
+            if self.fuzzy:
+                self.model.graph.build_fuzzy_index()
+            self.compute_lists()
+        self.update_view()
+        self.view.set_focus_positions(step.focus)
+
+    def traversal_text(self, hop, kind, name):
+        key = self.traversal_query[0]
+        return '%s%d %s %s' % ('' if key == '=' else '-' if key == '<' else '+', hop, kind, name)
+
     def handle_input(self, key):
-        self.show_all_or_exit_on_esc(key)
-        self.choose_on_arrow_out_of_view(key)
-        if self.update_filter(key):
-            if self.main_mode == self.Modes.NODES or self.main_mode == self.Modes.NODES_AND_TOPICS:
-                self.model.set_main_node_list(self.model.graph.get_nodes(self.filter_string))
-            if self.main_mode == self.Modes.TOPICS or self.main_mode == self.Modes.NODES_AND_TOPICS:
-                self.model.set_main_topic_list(self.model.graph.get_topics(self.filter_string))
-            self.view.main_widget.set_focus_column(self.view.Columns.MIDDLE.index)
+        with self.profiler.span('handle_input'):
+            self.show_all_or_exit_on_esc(key)
+            self.go_back_or_forward(key)
+            self.choose_on_arrow_out_of_view(key)
+            self.cycle_topic_order(key)
+            self.toggle_tree(key)
+            self.toggle_profile(key)
+            self.toggle_definition(key)
+            self.step_replay(key)
+            self.traverse(key)
+            if self.main_mode == self.Modes.TRAVERSAL:
+                return
+            if self.update_filter(key) or self.toggle_fuzzy(key):
+                self.view.main_widget.set_focus_column(self.view.Columns.MIDDLE.index)
+                if self.loading:
+                    self.update_footer()
+                else:
+                    self.schedule_filter()
+
+    def toggle_tree(self, key):
+        """ctrl+t switches between flat lists and the namespace tree, in NODES_AND_TOPICS mode."""
+        if key == 'ctrl t' and self.main_mode == self.Modes.NODES_AND_TOPICS:
+            self.show_tree = not self.show_tree
+            if self.show_tree:
+                with self.profiler.span('namespace_tree'):
+                    self.model.graph.build_namespace_tree()
+            self.update_view()
+
+    def is_tree_shown(self):
+        return self.show_tree and self.main_mode == self.Modes.NODES_AND_TOPICS
+
+    def update_tree_rows(self):
+        """
+        Compute the tree rows again if the graph, the filter or the expanded namespaces changed.
+
+        While the filter worker is busy, the rows stay as they are until it
+        delivers the rows of the new filter, just like the flat lists.
+        """
+        graph = self.model.graph
+        if (graph, graph.version, self.filter_string, frozenset(self.expanded)) == self.tree_rows_key or \
+                self.is_filtering():
+            return
+        with self.profiler.span('tree_rows'):
+            self.tree_rows_key, rows = self.compute_tree_rows(self.filter_string, frozenset(self.expanded))
+        self.tree_rows.replace(rows)
+
+    def compute_tree_rows(self, filter_string, expanded, nodes=None, topics=None):
+        """
+        Runs on the filter worker too, returns the key and the rows of the tree.
+
+        The rows are pruned by the sorted names filter_string matches, nodes
+        and topics if they are given, or else by the cached filter results.
+        """
+        graph = self.model.graph
+        with graph.lock:
+            key = (graph, graph.version, filter_string, expanded)
+            tree = graph.build_namespace_tree()
+            if filter_string and nodes is None:
+                nodes, topics = graph.get_nodes(filter_string), graph.get_topics(filter_string)
+            return key, tree.rows(expanded, nodes, topics)
+
+    def tree_text(self, depth, kind, name):
+        if kind == namespaces.NAMESPACE:
+            return '  ' * depth + ('- ' if name in self.expanded else '+ ') + name + '/'
+        return '  ' * depth + kind + ' ' + name
+
+    def generate_traversal_style(self, hop, kind, name):
+        text = self.traversal_text(hop, kind, name)
+        if kind == traversal.NODE:
+            return self.generate_node_style(text, name)
+        return self.generate_topic_style(text, self.model.graph.topic_models([name])[0])
+
+    def generate_tree_style(self, depth, kind, name, counts):
+        text = self.tree_text(depth, kind, name)
+        if kind == namespaces.NODE:
+            return self.generate_node_style(text, name)
+        elif kind == namespaces.TOPIC:
+            return self.generate_topic_style(text, self.model.graph.topic_models([name])[0])
+        return 'namespace', text, 'N:%d T:%d pub:%d sub:%d' % counts
+
+    def toggle_namespace(self, choice):
+        """Expand or collapse the namespace of a tree row, returns False if choice is no namespace row."""
+        row = choice.lstrip(' ')
+        if not self.show_tree or self.main_mode != self.Modes.NODES_AND_TOPICS or row[:2] not in ('+ ', '- '):
+            return False
+        path = row[2:-1]
+        if path in self.expanded:
+            self.expanded.discard(path)
+        else:
+            self.expanded.add(path)
+        self.update_view()
+        return True
+
+    def toggle_profile(self, key):
+        """ctrl+p shows or hides the stage breakdown of the last frame, if profiling."""
+        if key == 'ctrl p' and self.profiler.enabled:
+            if self.loop.widget is self.view.profile_overlay:
+                self.loop.widget = self.view.main_widget_with_attr
+            else:
+                self.view.set_profile(self.profiler.frame_summary())
+                self.loop.widget = self.view.profile_overlay
+
+    def update_profile(self):
+        """Runs after every profiled frame and draws the overlay again with this frame's breakdown."""
+        if self.loop.widget is self.view.profile_overlay:
+            self.view.set_profile(self.profiler.frame_summary())
+            self.loop.draw_screen()
+
+    def toggle_definition(self, key):
+        """ctrl+d shows or hides the message definition of the focused or chosen topic, or else the topics per type."""
+        if key == 'ctrl d':
+            if self.loop.widget is self.view.definition_overlay:
+                self.loop.widget = self.view.main_widget_with_attr
+            else:
+                self.loop.widget = self.view.definition_overlay
+                self.update_definition()
+
+    def update_definition(self):
+        if self.loop.widget is not self.view.definition_overlay:
+            return
+        graph = self.model.graph
+        entity = self.chosen_entity()
+        if entity and entity[0] == traversal.TOPIC and entity[1] in graph.topic_ids:
+            topic_type = graph.topic_type(entity[1])
+            definition = self.definitions.get(topic_type)
+            self.view.set_definition(topic_type, u'loading\u2026' if definition is None else definition.rstrip('\n'))
+            return
+        topics = self.model.main_topic_list
+        if len(topics) == len(graph.sorted_topics):
+            counts = graph.type_counts()
+        else:
+            counts = graph.type_counts([t.name for t in topics])
+        lines = ['%6d  %s' % (count, topic_type) for topic_type, count in counts[:self.MAX_TYPE_COUNTS]]
+        if len(counts) > self.MAX_TYPE_COUNTS:
+            lines.append(u'%6s  \u2026 %d more types' % ('', len(counts) - self.MAX_TYPE_COUNTS))
+        self.view.set_definition(u'topics per type', '\n'.join(lines) or 'no topics')
+
+    def schedule_filter(self):
+        """Filter the main lists on the worker once no further key arrived within the debounce window."""
+        if self.filter_worker is None:
+            self.apply_filter(self.filter_lists(self.filter_query()))
+            return
+        if self.filter_alarm:
+            self.loop.remove_alarm(self.filter_alarm)
+        self.filter_alarm = self.loop.set_alarm_in(self.FILTER_DEBOUNCE, self.start_filter)
+        self.update_footer()
+
+    def start_filter(self, loop=None, user_data=None):
+        self.filter_alarm = None
+        self.filter_worker.submit(self.filter_lists, self.apply_filter, self.filter_query())
+
+    def cancel_filter(self):
+        if self.filter_alarm:
+            self.loop.remove_alarm(self.filter_alarm)
+            self.filter_alarm = None
+        if self.filter_worker:
+            self.filter_worker.cancel()
+
+    def is_filtering(self):
+        return self.filter_alarm is not None or (self.filter_worker is not None and self.filter_worker.is_busy())
+
+    def filter_query(self):
+        """The filter, the mode, fuzzy search and, with the tree shown, the expanded namespaces."""
+        return self.filter_string, self.main_mode, self.fuzzy, \
+            frozenset(self.expanded) if self.is_tree_shown() else None
+
+    def filter_lists(self, query):
+        """
+        Runs on the filter worker, so it must only read from the graph.
+
+        With the tree shown, its rows are pruned by the same results, which
+        are sorted unless they are ranked by fuzzy search.
+        """
+        filter_string, mode, fuzzy, expanded = query
+        nodes = topics = tree_rows = None
+        with self.model.graph.lock:
+            with self.profiler.span('filter'):
+                if mode == self.Modes.NODES or mode == self.Modes.NODES_AND_TOPICS:
+                    nodes = self.model.graph.get_nodes(filter_string, fuzzy)
+                if mode == self.Modes.TOPICS or mode == self.Modes.NODES_AND_TOPICS:
+                    topics = self.model.graph.get_topics(filter_string, fuzzy)
+            if expanded is not None:
+                with self.profiler.span('tree_rows'):
+                    tree_rows = self.compute_tree_rows(filter_string, expanded, *(None, None) if fuzzy else
+                                                       (nodes, topics))
+        return query, nodes, topics, tree_rows
+
+    def apply_filter(self, result):
+        query, nodes, topics, tree_rows = result
+        if query[:3] != (self.filter_string, self.main_mode, self.fuzzy):
+            self.update_footer()
+            return
+
+        if nodes is not None:
+            self.model.set_main_node_list(nodes)
+        if topics is not None:
+            self.model.set_main_topic_list(topics)
+        if tree_rows is not None:
+            self.tree_rows_key, rows = tree_rows
+            self.tree_rows.replace(rows)
+        self.update_view()
+
+    def step_replay(self, key):
+        """
+        ']' and '[' step to the next or previous change of the replay, '}' and '{' jump a minute forward or back.
+
+        A jump moves by at least one change. The graph is patched with the
+        difference to the state shown, which the graph worker works out.
+        """
+        if self.replay is None or self.loading or key not in (']', '[', '}', '{'):
+            return
+        index = self.replay_index
+        if key == ']':
+            index += 1
+        elif key == '[':
+            index -= 1
+        elif key == '}':
+            index = max(index + 1, self.replay.index_at(self.replay.times[index] + self.REPLAY_JUMP))
+        else:
+            index = min(index - 1, self.replay.index_at(self.replay.times[index] - self.REPLAY_JUMP))
+        index = max(0, min(len(self.replay) - 1, index))
+        if index == self.replay_index:
+            return
+        self.replay_index = index
+        if self.graph_worker is None:
+            self.apply_replay(self.replay_diff(index))
+        else:
+            self.graph_worker.submit(self.replay_diff, self.apply_replay, index)
+
+    def replay_state(self, index):
+        """Runs on the graph worker for the first load, the state after the index-th change as GraphModel takes it."""
+        self.replay_shown = self.replay.state_at(index).copy()
+        return self.replay_shown.to_state()
+
+    def replay_diff(self, index):
+        """Runs on the graph worker, so seeking through a long recording does not block the UI."""
+        with self.profiler.span('seek'):
+            target = self.replay.state_at(index).copy()
+        with self.profiler.span('diff'):
+            return index, target, self.replay_shown.diff(target)
+
+    def apply_replay(self, result):
+        index, target, diff = result
+        # a superseded step never gets here, so the shown state always matches the graph
+        self.replay_shown = target
+        self.status = self.replay_status(index, diff)
+        if diff is None:
+            self.update_footer()
+            return
+        with self.profiler.span('apply_diff'):
+            self.model.graph.apply_diff(diff)
+        self.refresh_lists()
+
+    def replay_status(self, index, diff):
+        times = self.replay.times
+        status = 'replay %d/%d %s +%.1fs' % (index + 1, len(times),
+                                             time.strftime('%H:%M:%S', time.localtime(times[index])),
+                                             times[index] - times[0])
+        if diff is not None:
+            status += '  ' + recording.summarize(diff)
+        return status
+
+    def schedule_refresh(self):
+        if self.refresh_interval > 0:
+            self.loop.set_alarm_in(self.refresh_interval, self.start_refresh)
+
+    def start_refresh(self, loop=None, user_data=None):
+        if self.graph_worker is None:
+            self.apply_refresh(self.fetch_diff())
+        else:
+            self.graph_worker.submit(self.fetch_diff, self.apply_refresh)
+
+    def fetch_diff(self):
+        """Runs on the graph worker, so an unchanged graph costs nothing on the main loop."""
+        try:
+            with self.profiler.span('fetch'):
+                if self.master_group:
+                    state = self.master_group.fetch_state(self.timeout)
+                else:
+                    state = snapshot.fetch_state(self.master_uri, self.timeout)
+        except snapshot.MasterError as error:
+            return None, str(error)
+        with self.profiler.span('diff'):
+            return model.GraphDiff.between(self.state, state), \
+                self.master_group.status() if self.master_group else ''
+
+    def apply_refresh(self, result):
+        diff, status = result
+        if status != self.status:
+            self.status = status
+            self.update_footer()
+        if diff is not None:
+            self.state = diff.state
+            with self.profiler.span('apply_diff'):
+                self.model.graph.apply_diff(diff)
+            if self.topic_monitor:
+                self.topic_monitor.set_topics(list(self.model.graph.sorted_topics))
+            self.refresh_lists()
+        self.schedule_refresh()
+
+    def handle_visible(self, list, first, last, column):
+        self.visible[column] = (first, last)
+        nodes, topics = self.visible_names()
+        if self.node_info:
+            self.node_info.request(nodes)
+        if self.topic_monitor:
+            self.topic_monitor.watch(topics)
+
+    def visible_names(self):
+        """
+        The nodes and topics in view.
+
+        The middle column lists nodes before topics, except in TOPICS mode
+        where it holds the chosen topic. The side columns list topics in
+        NODES mode and nodes in TOPICS mode. In TRAVERSAL mode the middle
+        column holds both.
+        """
+        nodes, topics = [], []
+        for column, (first, last) in self.visible.items():
+            if column == self.view.Columns.MIDDLE and self.main_mode == self.Modes.TRAVERSAL:
+                for hop, kind, name in self.traversal_entries[first:max(0, last + 1)]:
+                    (nodes if kind == traversal.NODE else topics).append(name)
+                continue
+            elif column == self.view.Columns.MIDDLE and self.is_tree_shown():
+                for depth, kind, name, counts in self.tree_rows[first:max(0, last + 1)]:
+                    if kind != namespaces.NAMESPACE:
+                        (nodes if kind == namespaces.NODE else topics).append(name)
+                continue
+            elif column == self.view.Columns.MIDDLE:
+                lists = [(topics if self.main_mode == self.Modes.TOPICS else nodes, self.model.main_node_list),
+                         (topics, self.model.main_topic_list)]
+            else:
+                entries = self.model.input_list if column == self.view.Columns.LEFT else self.model.output_list
+                lists = [(topics if self.main_mode == self.Modes.NODES else nodes, entries)]
+            for names, entries in lists:
+                names.extend(entry.name for entry in entries[first:max(0, last + 1)])
+                first, last = max(0, first - len(entries)), last - len(entries)
+        return nodes, topics
+
+    def schedule_probe(self, loop=None, user_data=None):
+        """Probe the nodes in view again whenever their answers expire."""
+        self.node_info.request(self.visible_names()[0])
+        self.loop.set_alarm_in(self.node_info.ttl, self.schedule_probe)
+
+    def apply_node_info(self, items):
+        if any(restyle for name, restyle in items):
+            self.style_version += 1
             self.update_view()
+        else:
+            self.update_footer()
+
+    def apply_topic_stats(self, items):
+        """
+        Show the measurements of the topics that got messages, items are sets of their names.
+
+        Only the rows of these topics are restyled, and only these topics
+        move in an order other than by name.
+        """
+        graph = self.model.graph
+        topics = graph.topic_models(sorted(t for t in set().union(*items) if t in graph.topic_ids))
+        if not topics:
+            return
+        if self.model.topic_order != self.model.TopicOrders.NAME:
+            self.model.sort_topic_lists(topics)
+        self.update_view()
+        for column, layout, segments in self.column_lists():
+            self.view.restyle_rows(self.topic_positions(segments, topics), self.restyle_topic_stats, column)
+
+    def topic_positions(self, segments, topics):
+        """The positions of the rows of topics, TopicModels, in a column showing segments."""
+        positions = []
+        offset = 0
+        names = set(topic.name for topic in topics)
+        for entries, style in segments:
+            if entries is self.traversal_entries:
+                positions.extend(offset + i for i, (hop, kind, name) in enumerate(entries)
+                                 if kind == traversal.TOPIC and name in names)
+            else:
+                if entries is self.tree_rows:
+                    rows = [(t.count('/') - 1, namespaces.TOPIC, t, None) for t in sorted(names)]
+                elif entries and isinstance(entries[0], model.TopicModel):
+                    rows = topics
+                else:
+                    rows = []
+                positions.extend(offset + i for i in (entries.position(row) for row in rows) if i is not None)
+            offset += len(entries)
+        return positions
+
+    def restyle_topic_stats(self, choice):
+        """The choice of a topic row annotated with the current measurements of the topic, which ends its text."""
+        if choice[0] not in ('topic', 'chosen_topic'):
+            return choice
+        annotation = self.model.graph.topic_models([choice[1].rsplit(' ', 1)[-1]])[0].annotation()
+        return choice[:2] + (annotation,) if annotation else choice[:2]
+
+    def refresh_lists(self):
+        """Recompute the visible lists from the patched graph, keeping mode, filter, choice and focus."""
+        graph = self.model.graph
+        if self.main_mode == self.Modes.NODES_AND_TOPICS:
+            self.model.set_main_node_list(graph.get_nodes(self.filter_string, self.fuzzy))
+            self.model.set_main_topic_list(graph.get_topics(self.filter_string, self.fuzzy))
+        elif self.main_mode == self.Modes.NODES:
+            if [node.name for node in self.model.main_node_list] != [self.choice]:
+                self.model.set_main_node_list(graph.get_nodes(self.filter_string, self.fuzzy))
+            self.model.set_input_list(graph.get_subscriptions(self.choice), self.model.ListEntryTypes.TOPIC)
+            self.model.set_output_list(graph.get_publications(self.choice), self.model.ListEntryTypes.TOPIC)
+        elif self.main_mode == self.Modes.TOPICS:
+            if self.model.main_topic_list:
+                self.model.set_main_topic_list(graph.get_topics(self.filter_string, self.fuzzy))
+            self.model.set_input_list(graph.get_publishers(self.choice), self.model.ListEntryTypes.NODE)
+            self.model.set_output_list(graph.get_subscribers(self.choice), self.model.ListEntryTypes.NODE)
+        elif self.main_mode == self.Modes.TRAVERSAL:
+            self.run_traversal()
+        self.update_view()
 
     def handle_node_choice(self, node):
         self.model.set_main_node_list([node])
@@ -120,6 +908,14 @@ class Controller:
             self.handle_node_choice(choice)
         elif self.main_mode == self.Modes.TOPICS:
             self.handle_topic_choice(choice)
+        elif self.main_mode == self.Modes.TRAVERSAL:
+            hop, kind, self.choice = choice.split(' ', 2)
+            if kind == traversal.NODE:
+                self.main_mode = self.Modes.NODES
+                self.handle_node_choice(self.choice)
+            else:
+                self.main_mode = self.Modes.TOPICS
+                self.handle_topic_choice(self.choice)
         else:
             choice_name, choice_type = self.get_list_entry(choice)
             self.choice = choice_name
@@ -133,6 +929,14 @@ class Controller:
                 raise TypeError("choice is neither node nor topic: " + choice)
 
     def handle_choice(self, list, button, choice, column):
+        with self.profiler.span('handle_choice'):
+            self.choose(choice, column)
+
+    def choose(self, choice, column):
+        if column == self.view.Columns.MIDDLE and self.toggle_namespace(choice):
+            return
+        self.remember()
+        self.cancel_filter()
         self.choice = choice
         if column == self.view.Columns.LEFT or column == self.view.Columns.RIGHT:
             self.handle_input_output_choice(choice)
@@ -156,6 +960,8 @@ class Controller:
 
     def get_list_entry(self, list_entry):
         if self.main_mode == self.Modes.NODES_AND_TOPICS:
+            # rows of the namespace tree are indented
+            list_entry = list_entry.lstrip(' ')
             if "N " in list_entry:
                 return list_entry[2:], self.model.ListEntryTypes.NODE
             elif "T " in list_entry:
@@ -165,57 +971,261 @@ class Controller:
         else:
             raise RuntimeError("get_list_entry() should only be called in NODES_AND_TOPICS mode, but mode is: " + str(self.main_mode))
 
-    def generate_node_style(self, name):
-        if name == self.choice:
-            return 'chosen_node', name
-        else:
-            return 'node', name
+    def generate_node_style(self, text, name=None):
+        """Style the entry text of node name, which defaults to the text itself."""
+        style = 'chosen_node' if text == self.choice else 'node'
+        if self.node_info is not None and self.is_unresponsive(text if name is None else name):
+            style = style.replace('node', 'unresponsive_node')
+        return style, text
 
-    def generate_topic_style(self, name):
-        if name == self.choice:
-            return 'chosen_topic', name
-        else:
-            return 'topic', name
+    def is_unresponsive(self, name):
+        info = self.node_info.get(name)
+        return info is not None and not info.is_responsive()
+
+    def generate_topic_style(self, text, topic=None):
+        """Style the entry text of topic, which is annotated with its rate and bandwidth if measured."""
+        style = 'chosen_topic' if text == self.choice else 'topic'
+        if self.topic_monitor is not None and topic is not None:
+            annotation = topic.annotation()
+            if annotation:
+                return style, text, annotation
+        return style, text
 
     def update_view(self):
-        if self.main_mode == self.Modes.NODES_AND_TOPICS:
-            nodes = ["N " + node.name for node in self.model.main_node_list]
-            topics = ["T " + node.name for node in self.model.main_topic_list]
+        """
+        Bring the columns up to date with the model.
+
+        A column is only rebuilt if its layout or the styles changed since it
+        was last shown. If its lists changed by one replace each, only the
+        rows between their unchanged head and tail are built again. Unless it
+        was rebuilt, a new choice restyles the entries of the old and the new
+        choice in place.
+        """
+        previous_choice, self.shown_choice = self.shown_choice, self.choice
+        for column, layout, segments in self.column_lists():
+            if not self.update_column(column, layout, segments) and previous_choice != self.choice:
+                self.view.restyle_list([previous_choice, self.choice], self.restyle_choice, column)
+        self.view.set_title(self.InputLabels[str(self.main_mode)] + ':', self.view.Columns.LEFT)
+        if self.main_mode == self.Modes.TRAVERSAL:
+            self.view.set_title(self.traversal_title + ':', self.view.Columns.MIDDLE)
+        elif self.is_tree_shown():
+            self.view.set_title('Namespaces:', self.view.Columns.MIDDLE)
         else:
-            nodes = [node.name for node in self.model.main_node_list]
-            topics = [node.name for node in self.model.main_topic_list]
+            self.view.set_title(str(self.main_mode).replace('_', ' ').title() + ':', self.view.Columns.MIDDLE)
+        self.view.set_title(self.OutputLabels[str(self.main_mode)] + ':', self.view.Columns.RIGHT)
+        self.update_footer()
+
+    def update_column(self, column, layout, segments):
+        """Returns whether all choices of column were built again."""
+        key = self.list_key(layout, segments)
+        patches = self.list_patches(self.view.get_list_key(column), key, segments)
+        if patches is None:
+            return self.view.update_list(key, lambda: [style(entry) for entries, style in segments for entry in entries],
+                                         column)
+        if patches:
+            with self.profiler.span('build_rows'):
+                patches = [(start, stop, [style(entry) for entry in entries]) for start, stop, entries, style in patches]
+            self.view.patch_list(key, patches, column)
+        return False
+
+    def list_patches(self, shown, key, segments):
+        """
+        The patches from the choices shown for key shown to those for key, as (start, stop, entries, style).
 
-        nodes = [self.generate_node_style(name) for name in nodes]
-        topics = [self.generate_topic_style(name) for name in topics]
+        Each replaces the choices from start to stop by those of entries, in
+        order. None if the layout or the styles changed or a list changed
+        more than once since, so the choices must all be built again.
+        """
+        if shown is None or shown[:2] != key[:2] or len(shown) != len(key):
+            return None
+        changes = []
+        offset = 0
+        for (entries, style), (list_id, version), (shown_id, shown_version) in zip(segments, key[2:], shown[2:]):
+            if list_id != shown_id:
+                return None
+            edits = ()
+            length = len(entries)
+            if version != shown_version:
+                if entries.change is None or entries.change[0] != shown_version:
+                    return None
+                edits = entries.change[1]
+                length -= sum(len(items) - (stop - start) for start, stop, items in edits)
+            changes.append((offset, edits, style))
+            offset += length
+        # lists further down first, so the offsets of those before still hold
+        return [(offset + start, offset + stop, items, style) for offset, edits, style in reversed(changes)
+                for start, stop, items in edits]
+
+    def column_lists(self):
+        """
+        Per column, its layout and segments: the lists it shows, each with a function that builds the choice of an entry.
+
+        The layout is what the choices depend on besides the lists and the styles.
+        """
+        if self.main_mode == self.Modes.TRAVERSAL:
+            # the text of an entry shows the direction of the traversal
+            middle = ('traversal', self.traversal_query[0]), [
+                (self.traversal_entries, lambda entry: self.generate_traversal_style(*entry))]
+        elif self.is_tree_shown():
+            self.update_tree_rows()
+            # namespace rows show whether they are expanded
+            middle = ('tree', frozenset(self.expanded)), [(self.tree_rows, lambda row: self.generate_tree_style(*row))]
+        elif self.main_mode == self.Modes.NODES_AND_TOPICS:
+            middle = 'prefixed', [
+                (self.model.main_node_list, lambda node: self.generate_node_style("N " + node.name, node.name)),
+                (self.model.main_topic_list, lambda topic: self.generate_topic_style("T " + topic.name, topic))]
+        else:
+            middle = 'plain', [(self.model.main_node_list, lambda node: self.generate_node_style(node.name)),
+                               (self.model.main_topic_list, lambda topic: self.generate_topic_style(topic.name, topic))]
 
         if self.main_mode == self.Modes.NODES:
-            input = [self.generate_topic_style(item.name) for item in self.model.input_list]
-            output = [self.generate_topic_style(item.name) for item in self.model.output_list]
+            side, style = 'topics', lambda item: self.generate_topic_style(item.name, item)
         else:
-            input = [self.generate_node_style(item.name) for item in self.model.input_list]
-            output = [self.generate_node_style(item.name) for item in self.model.output_list]
+            side, style = 'nodes', lambda item: self.generate_node_style(item.name)
 
-        self.view.reset_list(input, self.view.Columns.LEFT)
-        self.view.reset_list(nodes + topics, self.view.Columns.MIDDLE)
-        self.view.reset_list(output, self.view.Columns.RIGHT)
-        self.view.set_title(self.InputLabels[str(self.main_mode)] + ':', self.view.Columns.LEFT)
-        self.view.set_title(str(self.main_mode).replace('_', ' ').title() + ':', self.view.Columns.MIDDLE)
-        self.view.set_title(self.OutputLabels[str(self.main_mode)] + ':', self.view.Columns.RIGHT)
-        self.view.set_footer(self.filter_string, self.view.Columns.MIDDLE)
+        return [(self.view.Columns.LEFT, side, [(self.model.input_list, style)]),
+                (self.view.Columns.MIDDLE,) + middle,
+                (self.view.Columns.RIGHT, side, [(self.model.output_list, style)])]
+
+    def list_key(self, layout, segments):
+        """The key a column showing segments in layout was built for, see view.update_list()."""
+        return (layout, self.style_version) + tuple((id(entries), entries.version) for entries, style in segments)
+
+    def restyle_choice(self, choice):
+        style = choice[0].replace('chosen_', '')
+        return (('chosen_' + style if choice[1] == self.choice else style),) + choice[1:]
+
+    def update_footer(self):
+        footer = ('fuzzy: ' if self.fuzzy else '') + self.filter_string
+        if self.model.topic_order != self.model.TopicOrders.NAME:
+            footer += '  by ' + str(self.model.topic_order).lower()
+        if self.main_mode == self.Modes.TRAVERSAL:
+            footer += '  %d found' % len(self.traversal_entries)
+        if self.path_anchor:
+            footer += '  anchor: ' + self.path_anchor[1]
+        if self.is_filtering():
+            footer += u'  searching\u2026'
+        if self.status:
+            footer += '  ' + self.status
+        self.view.set_footer(footer, self.view.Columns.MIDDLE)
+
+        info = ''
+        if self.main_mode == self.Modes.NODES:
+            info = self.model.graph.node_models([self.choice])[0].info_string()
+        elif self.main_mode == self.Modes.TOPICS:
+            info = self.model.graph.topic_models([self.choice])[0].info_string()
+        self.view.set_footer(info, self.view.Columns.LEFT)
 
 
 def sigint_handler(sig, frame):
     raise urwid.ExitMainLoop()
 
 
+def parse_args(args):
+    parser = argparse.ArgumentParser(prog='rosgraph_tui',
+                                     description='Explore and debug your ROS graph interactively.',
+                                     epilog="To query the graph from scripts, see 'rosgraph_tui query --help'. "
+                                            "To record how the graph changes, see 'rosgraph_tui record --help'.")
+    parser.add_argument('--fuzzy', action='store_true',
+                        help='start with ranked fuzzy search instead of substring search (toggle with ctrl+f)')
+    parser.add_argument('--refresh', type=float, default=0, metavar='SECONDS',
+                        help='poll the ROS master for graph changes every SECONDS (default: off)')
+    parser.add_argument('--timeout', type=float, default=snapshot.DEFAULT_TIMEOUT, metavar='SECONDS',
+                        help='give up on the ROS master after SECONDS (default: %(default)s)')
+    parser.add_argument('--master', action='append', default=[], metavar='[TAG=]URI',
+                        help='ask the ROS master at URI instead of ROS_MASTER_URI; given several times, the '
+                             'graphs of all masters are fetched in parallel and merged, with the names of '
+                             'each master in the namespace /TAG (default TAG: the host of URI), filter '
+                             'with @TAG')
+    parser.add_argument('--snapshot', metavar='FILE',
+                        help='explore the graph saved in FILE instead of asking the ROS master')
+    parser.add_argument('--save-snapshot', metavar='FILE',
+                        help='save the graph of the ROS master to FILE and exit')
+    parser.add_argument('--replay', metavar='FILE',
+                        help="step through the graph changes recorded to FILE by 'rosgraph_tui record', with "
+                             "']' and '[' by change and '}' and '{' by minute")
+    parser.add_argument('--monitor', type=int, nargs='?', const=topicmonitor.DEFAULT_MAX_SUBSCRIPTIONS, default=0,
+                        metavar='COUNT',
+                        help='measure topic rates and bandwidths through up to COUNT subscriptions at once '
+                             '(default COUNT: %(const)s, sort with ctrl+r)')
+    parser.add_argument('--profile', nargs='?', const=profiling.DEFAULT_TRACE_FILE, metavar='TRACE_FILE',
+                        help='time every stage of every input, show the last breakdown with ctrl+p, and on exit '
+                             'print latency percentiles and write a Chrome trace to TRACE_FILE '
+                             '(default TRACE_FILE: %(const)s)')
+
+    options = parser.parse_args(args)
+    if options.snapshot and (options.refresh or options.save_snapshot or options.monitor):
+        parser.error('--snapshot cannot be combined with --refresh, --save-snapshot or --monitor')
+    if options.snapshot and options.master:
+        parser.error('--snapshot cannot be combined with --master')
+    if options.replay and (options.snapshot or options.refresh or options.save_snapshot or options.monitor or
+                           options.master):
+        parser.error('--replay cannot be combined with --snapshot, --refresh, --save-snapshot, --monitor or --master')
+    try:
+        options.master_group = masters.group_of(options.master)
+    except ValueError as error:
+        parser.error(str(error))
+    if options.master_group and options.monitor:
+        parser.error('--monitor subscribes through a single master and cannot be combined with several')
+    if options.monitor:
+        try:
+            import rospy
+        except ImportError as error:
+            parser.error('--monitor subscribes to topics with rospy, which cannot be imported: %s' % error)
+    return options
+
+
 def main(args=None):
     """The main routine."""
+    if args is None:
+        args = sys.argv[1:]
+    if args[:1] == ['query']:
+        sys.exit(query.main(args[1:]))
+    if args[:1] == ['record']:
+        sys.exit(recording.main(args[1:]))
+    options = parse_args(args)
+
     signal.signal(signal.SIGINT, sigint_handler)
-    c = Controller()
-    c.run()
+    master_uri = options.master[0] if options.master and not options.master_group else None
+    if master_uri:
+        # the topic monitor subscribes through the master rospy finds in the environment
+        os.environ['ROS_MASTER_URI'] = master_uri
+    if options.master_group:
+        fetch, fetch_args = options.master_group.fetch_state, (options.timeout,)
+    else:
+        fetch, fetch_args = snapshot.fetch_state, (master_uri, options.timeout)
+    if options.save_snapshot:
+        try:
+            snapshot.save_state(options.save_snapshot, fetch(*fetch_args))
+        except snapshot.MasterError as error:
+            sys.exit(str(error))
+        return
 
-    # if args is None:
-    #     args = sys.argv[1:]
+    replay = None
+    if options.replay:
+        try:
+            replay = recording.RecordingReader(options.replay)
+        except snapshot.SnapshotFileError as error:
+            sys.exit(str(error))
+
+    profiler = profiling.Profiler() if options.profile else profiling.NULL_PROFILER
+    c = Controller(fuzzy=options.fuzzy, refresh_interval=options.refresh, timeout=options.timeout,
+                   master_uri=master_uri, master_group=options.master_group,
+                   probe_nodes=not options.snapshot and not replay, monitor_topics=options.monitor,
+                   profiler=profiler, replay=replay)
+    if options.snapshot:
+        c.load(snapshot.load_state, options.snapshot)
+    elif replay:
+        c.load(c.replay_state, 0)
+    else:
+        c.load(fetch, *fetch_args)
+    c.run()
+    if options.profile:
+        profiler.write_trace(options.profile)
+        print(profiler.summary())
+        print('trace written to ' + options.profile)
+    if c.load_error:
+        sys.exit(c.load_error)
 
 
 if __name__ == "__main__":
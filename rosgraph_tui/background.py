@@ -0,0 +1,93 @@
+from collections import deque
+import os
+import threading
+
+
+class Worker:
+    """
+    Runs jobs on a background thread and hands their results to the urwid main loop.
+
+    Only the newest job counts: a pending job is replaced when a newer one
+    is submitted, and the results of superseded or cancelled jobs are dropped.
+    Callbacks always run on the main loop.
+    """
+
+    def __init__(self, loop):
+        self.condition = threading.Condition()
+        self.pending = None
+        self.latest = None
+        self.results = deque()
+        self.pipe = loop.watch_pipe(self.deliver)
+
+        thread = threading.Thread(target=self.run)
+        thread.daemon = True
+        thread.start()
+
+    def submit(self, function, callback, *args):
+        job = (function, args, callback)
+        with self.condition:
+            self.pending = job
+            self.latest = job
+            self.condition.notify()
+
+    def cancel(self):
+        with self.condition:
+            self.pending = None
+            self.latest = None
+
+    def is_busy(self):
+        return self.latest is not None
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                job = self.pending
+                self.pending = None
+
+            function, args, callback = job
+            try:
+                self.results.append((job, function(*args), None))
+            except Exception as error:
+                self.results.append((job, None, error))
+            os.write(self.pipe, b'.')
+
+    def deliver(self, data):
+        while self.results:
+            job, result, error = self.results.popleft()
+            if job is not self.latest:
+                continue
+            self.latest = None
+            if error is not None:
+                raise error
+            job[2](result)
+        return True
+
+
+class Mailbox:
+    """
+    Hands items posted from any thread to callback(items) on the urwid main loop.
+
+    Items posted in quick succession are delivered together in one call.
+    """
+
+    def __init__(self, loop, callback):
+        self.callback = callback
+        self.lock = threading.Lock()
+        self.items = []
+        self.pipe = loop.watch_pipe(self.deliver)
+
+    def post(self, item):
+        with self.lock:
+            self.items.append(item)
+            wake = len(self.items) == 1
+        if wake:
+            os.write(self.pipe, b'.')
+
+    def deliver(self, data):
+        with self.lock:
+            items, self.items = self.items, []
+        if items:
+            self.callback(items)
+        return True
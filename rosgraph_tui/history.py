@@ -0,0 +1,117 @@
+from collections import OrderedDict
+
+
+DEFAULT_MAX_STEPS = 256
+DEFAULT_MAX_VIEWS = 16
+
+
+class Step:
+    """
+    What the user looked at before moving on: mode, choice, filter and focus.
+
+    The Controller restores a step from its cached view if there is one,
+    and otherwise recomputes the lists from the mode, choice and filter.
+    """
+
+    def __init__(self, mode, choice, filter_string, fuzzy, show_tree, expanded, traversal, focus):
+        self.mode = mode
+        self.choice = choice
+        self.filter_string = filter_string
+        self.fuzzy = fuzzy
+        self.show_tree = show_tree
+        self.expanded = expanded
+        # the query, title and origin of the TRAVERSAL mode
+        self.traversal = traversal
+        # the focused column and the focus position in each column
+        self.focus = focus
+
+
+class CachedView:
+    """
+    The computed contents of a step: the entries of its lists, and the choices of each column.
+
+    The entries are only valid for the graph version and topic order they
+    were computed with, the choices only for the same style version.
+    """
+
+    def __init__(self, validity, lists, tree_rows_key, choices, style_version):
+        self.validity = validity
+        self.lists = lists
+        self.tree_rows_key = tree_rows_key
+        self.choices = choices
+        self.style_version = style_version
+
+
+class History:
+    """
+    Back and forward navigation through steps, with the views of the most recently used steps cached.
+
+    The current view is live and only saved as a step when it is left,
+    by visit() for a new view or by back() and forward(). Visiting a new
+    view drops the steps forward of the current one, like a browser. At
+    most max_steps steps and max_views cached views are kept, the oldest
+    steps and the least recently used views are dropped first.
+    """
+
+    def __init__(self, max_steps=DEFAULT_MAX_STEPS, max_views=DEFAULT_MAX_VIEWS):
+        self.max_steps = max_steps
+        self.max_views = max_views
+        self.steps = []
+        # the index of the current view in steps, where its step goes once it is left
+        self.position = 0
+        self.views = OrderedDict()
+
+    def can_go_back(self):
+        return self.position > 0
+
+    def can_go_forward(self):
+        return self.position + 1 < len(self.steps)
+
+    def visit(self, step, view=None):
+        """Save step with its view as the one left for a new view."""
+        for dropped in self.steps[self.position:]:
+            self.views.pop(dropped, None)
+        self.steps[self.position:] = [step]
+        self.store(step, view)
+        self.position += 1
+        if len(self.steps) > self.max_steps:
+            self.views.pop(self.steps.pop(0), None)
+            self.position -= 1
+
+    def back(self, step, view=None):
+        """Save step with its view as the current one and return the step before it, or None if there is none."""
+        if not self.can_go_back():
+            return None
+        self.save(step, view)
+        self.position -= 1
+        return self.steps[self.position]
+
+    def forward(self, step, view=None):
+        """Save step with its view as the current one and return the step after it, or None if there is none."""
+        if not self.can_go_forward():
+            return None
+        self.save(step, view)
+        self.position += 1
+        return self.steps[self.position]
+
+    def save(self, step, view):
+        if self.position < len(self.steps):
+            self.views.pop(self.steps[self.position], None)
+            self.steps[self.position] = step
+        else:
+            self.steps.append(step)
+        self.store(step, view)
+
+    def store(self, step, view):
+        if view is None or self.max_views < 1:
+            return
+        self.views[step] = view
+        if len(self.views) > self.max_views:
+            self.views.popitem(last=False)
+
+    def view(self, step):
+        """The cached view of step, or None if it was dropped or never cached."""
+        view = self.views.pop(step, None)
+        if view is not None:
+            self.views[step] = view
+        return view
@@ -0,0 +1,140 @@
+import re
+import threading
+import time
+import urlparse
+
+import snapshot
+
+
+class Master:
+    def __init__(self, tag, uri):
+        self.tag = tag
+        self.uri = uri
+        self.prefix = '/' + tag
+
+
+def tag_of(uri):
+    """A tag from the host of uri, with everything but letters, digits and underscores replaced."""
+    return re.sub('[^A-Za-z0-9_]', '_', urlparse.urlparse(uri).hostname or uri)
+
+
+def parse_masters(specs):
+    """
+    Turn specs like 'robot1=http://robot1:11311/' or just the URI into Masters.
+
+    Without a tag, a master is tagged by its host, or by its host and port if
+    several masters run on the same host. Raises ValueError for duplicate tags.
+    """
+    pairs = [spec.split('=', 1) if '=' in spec else [None, spec] for spec in specs]
+    hosts = [tag_of(uri) for tag, uri in pairs]
+    masters = []
+    for (tag, uri), host in zip(pairs, hosts):
+        if tag is None:
+            port = urlparse.urlparse(uri).port
+            tag = host if hosts.count(host) == 1 or port is None else '%s_%d' % (host, port)
+        if not re.match('^[A-Za-z0-9_]+$', tag):
+            raise ValueError('invalid master tag %r, use letters, digits and underscores' % tag)
+        if tag in [m.tag for m in masters]:
+            raise ValueError('master tag %s is used twice' % tag)
+        masters.append(Master(tag, uri))
+    return masters
+
+
+def group_of(specs):
+    """A MasterGroup of specs, or None if there is at most one master without a tag, which is asked as it is."""
+    if len(specs) > 1 or specs and '=' in specs[0]:
+        return MasterGroup(parse_masters(specs))
+    return None
+
+
+def tag_state(state, prefix):
+    """Move all names of state into the namespace prefix."""
+    all_nodes, all_topics, all_pubs, all_subs = state
+    return ([prefix + n for n in all_nodes], [[prefix + t, t_type] for t, t_type in all_topics],
+            [[prefix + t, [prefix + n for n in l]] for t, l in all_pubs],
+            [[prefix + t, [prefix + n for n in l]] for t, l in all_subs])
+
+
+def merge_states(states):
+    merged = [], [], [], []
+    for state in states:
+        for names, more in zip(merged, state):
+            names.extend(more)
+    return merged
+
+
+class MasterGroup:
+    """
+    Several ROS masters whose graphs are fetched in parallel and merged into one.
+
+    The names of each master are moved into the namespace of its tag, so
+    '/rosout' of master robot1 becomes '/robot1/rosout', entities of
+    different masters never merge, and '@robot1' filters by master.
+    Each master is fetched on its own thread, which gives up after timeout
+    seconds. errors holds why masters did not answer in time. A master
+    that answered before keeps its last graph in the merge, marked stale,
+    so a missed refresh does not remove and bring back all of its names.
+    """
+
+    def __init__(self, masters):
+        self.masters = masters
+        self.errors = {}
+        # the last graph each master answered with, by tag
+        self.states = {}
+
+    def fetch_state(self, timeout=snapshot.DEFAULT_TIMEOUT):
+        """Return the merged state, raise a MasterError only if no master ever answered."""
+        results = {}
+
+        def fetch(master):
+            # anything raised is the error of this master, a traceback would only garble the screen
+            try:
+                results[master.tag] = tag_state(snapshot.fetch_state(master.uri, timeout), master.prefix)
+            except snapshot.MasterError as error:
+                results[master.tag] = str(error)
+            except Exception as error:
+                results[master.tag] = 'fetching from %s failed: %r' % (master.uri, error)
+
+        threads = []
+        for master in self.masters:
+            thread = threading.Thread(target=fetch, args=(master,), name='master ' + master.tag)
+            # a master that never answers must not keep the process alive
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        deadline = time.time() + timeout
+        for thread in threads:
+            thread.join(max(0, deadline - time.time()))
+
+        states = []
+        errors = {}
+        for master in self.masters:
+            result = results.get(master.tag)
+            if result is None:
+                errors[master.tag] = 'no answer from %s within %gs' % (master.uri, timeout)
+            elif isinstance(result, str):
+                errors[master.tag] = result
+            else:
+                self.states[master.tag] = result
+            if master.tag in self.states:
+                states.append(self.states[master.tag])
+        self.errors = errors
+        if not states:
+            raise snapshot.MasterError('; '.join(errors[m.tag] for m in self.masters))
+        return merge_states(states)
+
+    def status(self):
+        """A footer note naming the masters that did not answer the last fetch, stale ones first."""
+        notes = []
+        for stale, note in ((True, 'stale graph from '), (False, 'no graph from ')):
+            tags = ['@' + m.tag for m in self.masters if m.tag in self.errors and (m.tag in self.states) == stale]
+            if tags:
+                notes.append(note + ', '.join(tags))
+        return '; '.join(notes)
+
+    def resolve(self, name):
+        """The URI of the master name came from and the name on that master."""
+        for master in self.masters:
+            if name.startswith(master.prefix + '/'):
+                return master.uri, name[len(master.prefix):]
+        return None, name
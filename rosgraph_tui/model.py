@@ -1,35 +1,148 @@
+from array import array
 from enum import Enum
+import bisect
+import itertools
+import threading
 
-import rosnode
-import rosgraph
+import namespaces
+import profiling
+import search
+import snapshot
+import topicmonitor
+import traversal
 
 
-ID = '/rosgraph_tui'
+class EntryList(list):
+    """
+    A list whose version counts its changes, so a view can tell whether and where it changed.
+
+    change is (version, edits) of the last change: the version it was made
+    from and its edits (start, stop, items), each of which replaced the
+    entries from start to stop by items, in the order they were made.
+    """
+
+    def __init__(self, items=()):
+        super(EntryList, self).__init__(items)
+        self.version = 0
+        self.change = None
+        # entry -> first position, built on first use after a change
+        self.positions = None
+
+    def replace(self, items):
+        """Replace only the entries between the common head and tail of the entries and items, if they differ."""
+        items = list(items)
+        if items == self:
+            return
+        length = min(len(self), len(items))
+        head = 0
+        while head < length and self[head] == items[head]:
+            head += 1
+        tail = 0
+        while tail < length - head and self[-1 - tail] == items[-1 - tail]:
+            tail += 1
+        self.splice([(head, len(self) - tail, items[head:len(items) - tail])])
+
+    def splice(self, edits):
+        """Make edits (start, stop, items) one after the other, as one change."""
+        for start, stop, items in edits:
+            self[start:stop] = items
+        self.change = (self.version, edits)
+        self.version += 1
+        self.positions = None
+
+    def position(self, entry):
+        """The first position of entry, or None."""
+        if self.positions is None:
+            self.positions = dict(itertools.izip(reversed(self), xrange(len(self) - 1, -1, -1)))
+        return self.positions.get(entry)
+
+    def sort(self, *args, **kwargs):
+        self.replace(sorted(self, *args, **kwargs))
 
 
 class Model:
     ListEntryTypes = Enum('NODE', 'TOPIC')
+    TopicOrders = Enum('NAME', 'RATE', 'BANDWIDTH')
 
-    def __init__(self):
-        self.graph = GraphModel()
+    def __init__(self, state=None):
+        self.input_list = EntryList()
+        self.main_node_list = EntryList()
+        self.main_topic_list = EntryList()
+        self.output_list = EntryList()
+        self.node_info = None
+        self.topic_monitor = None
+        self.topic_order = self.TopicOrders.NAME
+        self.profiler = profiling.NULL_PROFILER
 
-        self.input_list = []
-        self.main_node_list = []
-        self.main_topic_list = []
-        self.output_list = []
+        self.set_graph(GraphModel(state))
 
+    def set_graph(self, graph):
+        self.graph = graph
+        self.graph.node_info = self.node_info
+        self.graph.topic_monitor = self.topic_monitor
+        self.set_input_list([])
+        self.set_output_list([])
         self.set_main_node_list(self.graph.get_nodes())
         self.set_main_topic_list(self.graph.get_topics())
 
+    def set_node_info(self, node_info):
+        self.node_info = node_info
+        self.graph.node_info = node_info
+
+    def set_topic_monitor(self, topic_monitor):
+        self.topic_monitor = topic_monitor
+        self.graph.topic_monitor = topic_monitor
+
+    def set_topic_order(self, topic_order):
+        """Applies to the topic lists set from now on."""
+        self.topic_order = topic_order
+
+    def topic_sort_key(self):
+        """Sort by the topic order, busiest first. Sorting is stable, so equals keep their name order."""
+        if self.topic_order == self.TopicOrders.RATE:
+            return lambda topic: -(topic.rate or 0)
+        elif self.topic_order == self.TopicOrders.BANDWIDTH:
+            return lambda topic: -(topic.bandwidth or 0)
+        return lambda topic: topic.name
+
+    def sort_topic_lists(self, topics=None):
+        """
+        Sort the topic lists again once the measurements of topics, TopicModels, changed, or of all topics.
+
+        The other topics are still in order, so only changed topics out of
+        order with their neighbours move, each to where a bisection puts it.
+        """
+        key = self.topic_sort_key()
+        for list in (self.input_list, self.main_topic_list, self.output_list):
+            if len(list) < 2 or not isinstance(list[0], TopicModel):
+                continue
+            if topics is None:
+                list.sort(key=key)
+                continue
+            positions = sorted(i for i in (list.position(topic) for topic in topics) if i is not None)
+            if all((i == 0 or key(list[i - 1]) <= key(list[i])) and
+                   (i == len(list) - 1 or key(list[i]) <= key(list[i + 1])) for i in positions):
+                continue
+            items = list[:]
+            edits = [(i, i + 1, []) for i in reversed(positions)]
+            for i in reversed(positions):
+                del items[i]
+            for i in positions:
+                position = insort_topic(items, list[i], key)
+                edits.append((position, position, [list[i]]))
+            list.splice(edits)
+
     def set_list(self, list, items, item_type=None):
-        del list[:]
-        if items:
-            if item_type == self.ListEntryTypes.NODE:
-                for item in items:
-                    list.append(NodeModel(item, self.graph))
+        with self.profiler.span('set_list'):
+            if not items:
+                list.replace([])
+            elif item_type == self.ListEntryTypes.NODE:
+                list.replace(self.graph.node_models(items))
             elif item_type == self.ListEntryTypes.TOPIC:
-                for item in items:
-                    list.append(TopicModel(item, self.graph))
+                topics = self.graph.topic_models(items)
+                if self.topic_order != self.TopicOrders.NAME:
+                    topics.sort(key=self.topic_sort_key())
+                list.replace(topics)
             else:
                 raise TypeError("list entry is neither node nor topic: " + str(item_type))
 
@@ -46,64 +159,484 @@ class Model:
         self.set_list(self.main_topic_list, items, self.ListEntryTypes.TOPIC)
 
 
-class NodeModel:
+def insort_topic(topics, topic, key):
+    """Insert topic into topics sorted by key, after those with an equal key and a smaller name, return where."""
+    value = key(topic), topic.name
+    low, high = 0, len(topics)
+    while low < high:
+        middle = (low + high) // 2
+        if value < (key(topics[middle]), topics[middle].name):
+            high = middle
+        else:
+            low = middle + 1
+    topics.insert(low, topic)
+    return low
+
+
+class NodeModel(object):
+    __slots__ = ('name', 'graph')
+
     def __init__(self, name, graph):
         self.name = name
+        self.graph = graph
 
     def info_string(self):
-        return ''
+        node_info = self.graph.node_info
+        if node_info is None:
+            return ''
+        info = node_info.get(self.name)
+        if info is None:
+            return u'probing\u2026' if node_info.is_pending(self.name) else ''
+        return info.summary()
 
 
-class TopicModel:
+class TopicModel(object):
+    __slots__ = ('name', 'graph')
+
     def __init__(self, name, graph):
         self.name = name
-        self.topic_type = graph.topic_type(name)
+        self.graph = graph
+
+    @property
+    def topic_type(self):
+        return self.graph.topic_type(self.name)
+
+    @property
+    def rate(self):
+        """Messages per second as last measured, or None."""
+        monitor = self.graph.topic_monitor
+        return monitor.rate(self.name) if monitor else None
+
+    @property
+    def bandwidth(self):
+        """Bytes per second as last measured, or None."""
+        monitor = self.graph.topic_monitor
+        return monitor.bandwidth(self.name) if monitor else None
+
+    def annotation(self):
+        rate, bandwidth = self.rate, self.bandwidth
+        if rate is None:
+            monitor = self.graph.topic_monitor
+            if monitor and monitor.is_slow(self.name):
+                return 'below ' + topicmonitor.format_rate(monitor.min_rate())
+            return None
+        return topicmonitor.format_rate(rate) + ' ' + topicmonitor.format_bandwidth(bandwidth)
 
     def info_string(self):
-        return 'Type: ' + self.topic_type
+        annotation = self.annotation()
+        return 'Type: ' + self.topic_type + (', ' + annotation if annotation else '')
+
+
+EMPTY_STATE = ([], [], [], [])
+
+
+class GraphDiff:
+    """
+    Difference between two graph states.
+
+    Edges are (topic, node) pairs. A topic whose type changed is both removed and added.
+    """
+
+    def __init__(self, state, added_nodes, removed_nodes, added_topics, removed_topics,
+                 added_pubs, removed_pubs, added_subs, removed_subs):
+        self.state = state
+        self.added_nodes = added_nodes
+        self.removed_nodes = removed_nodes
+        self.added_topics = added_topics
+        self.removed_topics = removed_topics
+        self.added_pubs = added_pubs
+        self.removed_pubs = removed_pubs
+        self.added_subs = added_subs
+        self.removed_subs = removed_subs
+
+    @staticmethod
+    def edges(pubs_or_subs):
+        return set((t, n) for t, l in pubs_or_subs for n in l)
+
+    @staticmethod
+    def topic_types(all_topics):
+        topic_types = {}
+        for t_name, t_type in all_topics:
+            topic_types.setdefault(t_name, t_type)
+        return topic_types
+
+    @classmethod
+    def between(cls, old_state, state):
+        """Compare two states (all_nodes, all_topics, all_pubs, all_subs). Returns None if nothing changed."""
+        if old_state == state:
+            return None
+
+        old_nodes, old_topics, old_pubs, old_subs = old_state
+        all_nodes, all_topics, all_pubs, all_subs = state
+        nodes = set(all_nodes)
+        old_nodes = set(old_nodes)
+        topic_types = cls.topic_types(all_topics)
+        old_topic_types = cls.topic_types(old_topics)
+        pubs = cls.edges(all_pubs)
+        old_pubs = cls.edges(old_pubs)
+        subs = cls.edges(all_subs)
+        old_subs = cls.edges(old_subs)
+
+        diff = cls(state, nodes - old_nodes, old_nodes - nodes,
+                   dict((t, t_type) for t, t_type in topic_types.items() if old_topic_types.get(t) != t_type),
+                   set(t for t, t_type in old_topic_types.items() if topic_types.get(t) != t_type),
+                   pubs - old_pubs, old_pubs - pubs, subs - old_subs, old_subs - subs)
+        if diff.is_empty():
+            return None
+        return diff
+
+    def is_empty(self):
+        return not (self.added_nodes or self.removed_nodes or self.added_topics or self.removed_topics or
+                    self.added_pubs or self.removed_pubs or self.added_subs or self.removed_subs)
+
+
+class Adjacency:
+    """
+    Sorted integer adjacency lists in compressed sparse row (CSR) form.
+
+    Row i holds targets[offsets[i]:offsets[i + 1]]. Rows changed after
+    construction move into an overlay of per-row arrays, so applying a diff
+    does not rebuild the flat arrays until compact() folds the overlay back in.
+    """
+
+    def __init__(self, offsets, targets):
+        self.offsets = offsets
+        self.targets = targets
+        self.patched = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        offsets = array('i', [0])
+        targets = array('i')
+        for row in rows:
+            targets.extend(row)
+            offsets.append(len(targets))
+        return cls(offsets, targets)
+
+    def num_rows(self):
+        return max([len(self.offsets) - 1] + [index + 1 for index in self.patched])
+
+    def row(self, index):
+        row = self.patched.get(index)
+        if row is not None:
+            return row
+        if index + 1 < len(self.offsets):
+            return self.targets[self.offsets[index]:self.offsets[index + 1]]
+        return ()
+
+    def patch(self, index):
+        row = self.patched.get(index)
+        if row is None:
+            row = self.patched[index] = array('i', self.row(index))
+        return row
+
+    def add(self, index, target):
+        row = self.patch(index)
+        position = bisect.bisect_left(row, target)
+        if position == len(row) or row[position] != target:
+            row.insert(position, target)
+
+    def remove(self, index, target):
+        row = self.patch(index)
+        position = bisect.bisect_left(row, target)
+        if position < len(row) and row[position] == target:
+            del row[position]
+
+    def compact(self):
+        compacted = Adjacency.from_rows(self.row(index) for index in range(self.num_rows()))
+        self.offsets, self.targets, self.patched = compacted.offsets, compacted.targets, {}
+
+    def transposed(self, num_rows):
+        rows = [array('i') for _ in range(num_rows)]
+        for index in range(len(self.offsets) - 1):
+            for target in self.targets[self.offsets[index]:self.offsets[index + 1]]:
+                rows[target].append(index)
+        return Adjacency.from_rows(rows)
 
 
 class GraphModel:
-    def __init__(self):
-        self.all_nodes = rosnode.get_node_names()
+    """
+    The ROS graph with all names interned to integer ids.
 
-        master = rosgraph.Master(ID)
-        try:
-            state = master.getSystemState()
-            self.all_topics = master.getPublishedTopics('/')
-        except socket.error:
-            raise ROSNodeIOException("Unable to communicate with master!")
-        self.all_pubs = state[0]
-        self.all_subs = state[1]
+    Node, topic and type names are stored once, in id order. Initially the
+    ids follow the sorted names. Edges are kept as sorted id lists in CSR
+    adjacency for both directions. The lookups only cost the size of their
+    answer. Entity models are created once per name and then reused.
+    """
 
-    def get_nodes(self, filter_string=''):
-        return [item for item in sorted(self.all_nodes) if filter_string in item]
+    def __init__(self, state=None):
+        # guards the indexes, since filtering runs on a background worker
+        self.lock = threading.RLock()
+        # the live node info and topic monitor of the Model, if any
+        self.node_info = None
+        self.topic_monitor = None
 
-    def get_topics(self, filter_string=''):
-        return [item for item in sorted(t for t, l in self.all_topics) if filter_string in item]
+        if state is None:
+            state = snapshot.fetch_state()
+        if isinstance(state, snapshot.GraphTables):
+            self.set_tables(state)
+        else:
+            self.set_state(*state)
 
-    def get_publishers(self, topic_name):
-        matches = [l for t, l in self.all_pubs if topic_name==t]
-        if matches:
-            return sorted(*matches)
+    def set_state(self, all_nodes, all_topics, all_pubs, all_subs):
+        topic_types = GraphDiff.topic_types(all_topics)
+        edges = all_pubs + all_subs
+
+        self.node_names = sorted(set(all_nodes).union(*[l for t, l in edges]))
+        self.node_ids = dict((n, i) for i, n in enumerate(self.node_names))
+        self.topic_names = sorted(set(topic_types).union(t for t, l in edges))
+        self.topic_ids = dict((t, i) for i, t in enumerate(self.topic_names))
+        self.type_names = sorted(set(topic_types.values()))
+        self.type_ids = dict((t_type, i) for i, t_type in enumerate(self.type_names))
+        self.topic_type_ids = array('i', [self.type_ids[topic_types[t]] if t in topic_types else -1
+                                          for t in self.topic_names])
+        # while names are only appended in sorted order, rows of ids are rows of sorted names
+        self.node_ids_sorted = True
+        self.topic_ids_sorted = True
+
+        self.publishers = self.adjacency(all_pubs)
+        self.subscribers = self.adjacency(all_subs)
+        self.build_tables(sorted(all_nodes), sorted(topic_types))
+
+    def set_tables(self, tables):
+        """Take the sorted names and the id tables of a snapshot.GraphTables as they are."""
+        self.node_names = tables.nodes
+        self.node_ids = dict(itertools.izip(self.node_names, itertools.count()))
+        self.topic_names = tables.topics
+        self.topic_ids = dict(itertools.izip(self.topic_names, itertools.count()))
+        self.type_names = tables.types
+        self.type_ids = dict(itertools.izip(self.type_names, itertools.count()))
+        self.topic_type_ids = tables.topic_type_ids
+        self.node_ids_sorted = True
+        self.topic_ids_sorted = True
+
+        self.publishers = Adjacency(*tables.publishers)
+        self.subscribers = Adjacency(*tables.subscribers)
+        typed = (type_id >= 0 for type_id in self.topic_type_ids)
+        self.build_tables(list(self.node_names), list(itertools.compress(self.topic_names, typed)))
+
+    def build_tables(self, nodes, topics):
+        """Build everything else from the names, ids and edges, given the sorted listed nodes and typed topics."""
+        self.publications = self.publishers.transposed(len(self.node_names))
+        self.subscriptions = self.subscribers.transposed(len(self.node_names))
+
+        self.node_model_cache = {}
+        self.topic_model_cache = {}
+        self.build_index(nodes, topics)
+        # the sorted names of the topics of every type, by type id
+        self.topics_by_type = {}
+        for t in self.sorted_topics:
+            self.topics_by_type.setdefault(self.topic_type_ids[self.topic_ids[t]], []).append(t)
+
+        # counts the changes to the graph, so traversals know when their cache is outdated
+        self.version = 0
+        self.traversal = traversal.Traversal(self)
+
+    def adjacency(self, pubs_or_subs):
+        rows = [set() for _ in self.topic_names]
+        for t, l in pubs_or_subs:
+            rows[self.topic_ids[t]].update(self.node_ids[n] for n in l)
+        return Adjacency.from_rows(sorted(row) for row in rows)
+
+    def build_index(self, nodes, topics):
+        """
+        Build the filter indexes over the sorted node and topic names.
+        """
+        self.sorted_nodes = nodes
+        self.sorted_topics = topics
+        self.node_filter = search.FilterCache(self.sorted_nodes)
+        self.topic_filter = search.FilterCache(self.sorted_topics)
+        self.node_fuzzy_index = None
+        self.topic_fuzzy_index = None
+        self.namespace_tree = None
+
+    def node_id(self, n):
+        i = self.node_ids.get(n)
+        if i is None:
+            i = self.node_ids[n] = len(self.node_names)
+            if self.node_names and n < self.node_names[-1]:
+                self.node_ids_sorted = False
+            self.node_names.append(n)
+        return i
+
+    def topic_id(self, t):
+        i = self.topic_ids.get(t)
+        if i is None:
+            i = self.topic_ids[t] = len(self.topic_names)
+            if self.topic_names and t < self.topic_names[-1]:
+                self.topic_ids_sorted = False
+            self.topic_names.append(t)
+            self.topic_type_ids.append(-1)
+        return i
+
+    def type_id(self, t_type):
+        i = self.type_ids.get(t_type)
+        if i is None:
+            i = self.type_ids[t_type] = len(self.type_names)
+            self.type_names.append(t_type)
+        return i
+
+    def build_fuzzy_index(self):
+        if self.node_fuzzy_index is None:
+            self.node_fuzzy_index = search.FuzzyIndex(self.sorted_nodes)
+            self.topic_fuzzy_index = search.FuzzyIndex(self.sorted_topics)
+
+    def build_namespace_tree(self):
+        """The namespaces.NamespaceTree of the graph, which apply_diff() keeps up to date once built."""
+        with self.lock:
+            if self.namespace_tree is None:
+                self.namespace_tree = namespaces.NamespaceTree(self)
+            return self.namespace_tree
+
+    def apply_diff(self, diff):
+        """Patch the indexes in place, so only the changed entries cost anything."""
+        with self.lock:
+            self.version += 1
+            for n in diff.removed_nodes:
+                self.node_model_cache.pop(n, None)
+                self.node_filter.remove(n)
+                if self.node_fuzzy_index:
+                    self.node_fuzzy_index.remove(n)
+            for n in diff.added_nodes:
+                self.node_id(n)
+                self.node_filter.insert(n)
+                if self.node_fuzzy_index:
+                    self.node_fuzzy_index.insert(n)
+
+            for t in diff.removed_topics:
+                self.topic_model_cache.pop(t, None)
+                type_id = self.topic_type_ids[self.topic_ids[t]]
+                if type_id >= 0:
+                    search.remove_sorted(self.topics_by_type[type_id], t)
+                self.topic_type_ids[self.topic_ids[t]] = -1
+                self.topic_filter.remove(t)
+                if self.topic_fuzzy_index:
+                    self.topic_fuzzy_index.remove(t)
+            for t, t_type in diff.added_topics.items():
+                self.topic_type_ids[self.topic_id(t)] = self.type_id(t_type)
+                bisect.insort(self.topics_by_type.setdefault(self.type_id(t_type), []), t)
+                self.topic_filter.insert(t)
+                if self.topic_fuzzy_index:
+                    self.topic_fuzzy_index.insert(t)
+
+            for by_topic, by_node, removed, added in ((self.publishers, self.publications,
+                                                       diff.removed_pubs, diff.added_pubs),
+                                                      (self.subscribers, self.subscriptions,
+                                                       diff.removed_subs, diff.added_subs)):
+                for t, n in removed:
+                    by_topic.remove(self.topic_ids[t], self.node_ids[n])
+                    by_node.remove(self.node_ids[n], self.topic_ids[t])
+                for t, n in added:
+                    t_id, n_id = self.topic_id(t), self.node_id(n)
+                    by_topic.add(t_id, n_id)
+                    by_node.add(n_id, t_id)
+
+            for adjacency in (self.publishers, self.subscribers, self.publications, self.subscriptions):
+                if len(adjacency.patched) > len(adjacency.offsets) / 4:
+                    adjacency.compact()
+            if self.namespace_tree:
+                self.namespace_tree.apply_diff(diff)
+
+    def get_nodes(self, filter_string='', fuzzy=False):
+        with self.lock:
+            return self.search(self.node_filter, 'node_fuzzy_index', self.get_nodes_of_types, filter_string, fuzzy)
+
+    def get_topics(self, filter_string='', fuzzy=False):
+        with self.lock:
+            return self.search(self.topic_filter, 'topic_fuzzy_index', self.get_topics_of_types, filter_string,
+                               fuzzy)
+
+    def search(self, filter_cache, fuzzy_index, of_types, filter_string, fuzzy):
+        """
+        Filter by the first word of filter_string through the caches, then by its other words and '@master' terms.
+
+        With ':type' terms, the names of those types are filtered instead, by substring only.
+        """
+        if ' ' in filter_string or '@' in filter_string or ':' in filter_string:
+            words, masters, types = search.parse_filter(filter_string)
         else:
+            words, masters, types = [filter_string] if filter_string else [], [], []
+        if types:
+            return search.restrict(of_types(self.match_types(types)), words, masters)
+        if fuzzy and words:
+            self.build_fuzzy_index()
+            return search.restrict(getattr(self, fuzzy_index).search(words[0]), words[1:], masters, False)
+        return search.restrict(filter_cache.filter(words[0] if words else ''), words[1:], masters)
+
+    @staticmethod
+    def lookup(names, ids_sorted, adjacency, index):
+        if index is None:
             return []
+        result = [names[i] for i in adjacency.row(index)]
+        if not ids_sorted:
+            result.sort()
+        return result
+
+    def get_publishers(self, topic_name):
+        return self.lookup(self.node_names, self.node_ids_sorted, self.publishers, self.topic_ids.get(topic_name))
 
     def get_subscribers(self, topic_name):
-        matches = [l for t, l in self.all_subs if topic_name == t]
-        if matches:
-            return sorted(*matches)
-        else:
-            return []
+        return self.lookup(self.node_names, self.node_ids_sorted, self.subscribers, self.topic_ids.get(topic_name))
 
     def get_publications(self, node_name):
-        return sorted([t for t, l in self.all_pubs if node_name in l])
+        return self.lookup(self.topic_names, self.topic_ids_sorted, self.publications, self.node_ids.get(node_name))
 
     def get_subscriptions(self, node_name):
-        return sorted([t for t, l in self.all_subs if node_name in l])
+        return self.lookup(self.topic_names, self.topic_ids_sorted, self.subscriptions, self.node_ids.get(node_name))
 
     def topic_type(self, t):
-        matches = [t_type for t_name, t_type in self.all_topics if t_name == t]
-        if matches:
-            return matches[0]
-        return 'unknown type'
+        i = self.topic_ids.get(t)
+        if i is None or self.topic_type_ids[i] < 0:
+            return 'unknown type'
+        return self.type_names[self.topic_type_ids[i]]
+
+    def get_topics_of_type(self, topic_type):
+        """The sorted names of all topics of topic_type."""
+        type_id = self.type_ids.get(topic_type)
+        with self.lock:
+            return list(self.topics_by_type.get(type_id, ()))
+
+    def match_types(self, terms):
+        """The ids of the types whose names contain one of terms."""
+        return [i for i, t_type in enumerate(self.type_names) if any(term in t_type for term in terms)]
+
+    def get_topics_of_types(self, type_ids):
+        """The sorted names of the topics of the types type_ids, which must not be modified."""
+        lists = [self.topics_by_type[i] for i in type_ids if self.topics_by_type.get(i)]
+        if len(lists) == 1:
+            return lists[0]
+        return sorted(t for l in lists for t in l)
+
+    def get_nodes_of_types(self, type_ids):
+        """The sorted names of the nodes publishing or subscribing to a topic of the types type_ids."""
+        ids = set()
+        for t in self.get_topics_of_types(type_ids):
+            i = self.topic_ids[t]
+            ids.update(self.publishers.row(i))
+            ids.update(self.subscribers.row(i))
+        return sorted(self.node_names[i] for i in ids)
+
+    def type_counts(self, topics=None):
+        """
+        The (type, number of topics) of topics, or of all topics, the most frequent type first.
+
+        Without topics, the counts are the lengths of the type index.
+        """
+        with self.lock:
+            if topics is None:
+                counts = dict((i, len(l)) for i, l in self.topics_by_type.items() if l)
+            else:
+                counts = {}
+                for t in topics:
+                    i = self.topic_type_ids[self.topic_ids[t]]
+                    counts[i] = counts.get(i, 0) + 1
+            counts = [(self.type_names[i] if i >= 0 else 'unknown type', count) for i, count in counts.items()]
+        return sorted(counts, key=lambda item: (-item[1], item[0]))
+
+    def node_models(self, names):
+        cache = self.node_model_cache
+        return [cache[n] if n in cache else cache.setdefault(n, NodeModel(n, self)) for n in names]
+
+    def topic_models(self, names):
+        cache = self.topic_model_cache
+        return [cache[t] if t in cache else cache.setdefault(t, TopicModel(t, self)) for t in names]
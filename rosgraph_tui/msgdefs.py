@@ -0,0 +1,87 @@
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+import threading
+
+
+DEFAULT_MAX_DEFINITIONS = 64
+
+
+class DefinitionError(Exception):
+    pass
+
+
+def load_definition(topic_type):
+    """
+    Return the full text of the message definition of topic_type, with the definitions of the types it uses.
+
+    Only the Python message module of the package of topic_type gets imported.
+    """
+    try:
+        import roslib.message
+    except ImportError:
+        raise DefinitionError('message definitions need roslib')
+    try:
+        message_class = roslib.message.get_message_class(topic_type)
+    except (ImportError, ValueError) as error:
+        raise DefinitionError('cannot load %s: %s' % (topic_type, error))
+    if message_class is None:
+        raise DefinitionError('no message definition for ' + topic_type)
+    return message_class._full_text
+
+
+class DefinitionCache:
+    """
+    Loads message definitions on first use on a background thread and keeps the latest ones in a bounded LRU.
+
+    get() never blocks: it returns None and queues the load of a definition
+    that is not cached yet. Once loaded, notify(topic_type) is called on the
+    loading thread. Without notify, get() loads right away instead.
+    """
+
+    def __init__(self, notify=None, load=load_definition, max_definitions=DEFAULT_MAX_DEFINITIONS):
+        self.notify = notify
+        self.load = load
+        self.max_definitions = max_definitions
+        self.lock = threading.Lock()
+        self.definitions = OrderedDict()
+        self.pending = set()
+        self.pool = ThreadPool(1) if notify else None
+
+    def get(self, topic_type):
+        """The definition of topic_type, or an error message if it cannot be loaded, or None while loading."""
+        with self.lock:
+            definition = self.definitions.pop(topic_type, None)
+            if definition is not None:
+                self.definitions[topic_type] = definition
+                return definition
+            if topic_type in self.pending:
+                return None
+            self.pending.add(topic_type)
+        if self.pool is None:
+            return self.store(topic_type)
+        self.pool.apply_async(self.store, (topic_type,))
+        return None
+
+    def is_pending(self, topic_type):
+        return topic_type in self.pending
+
+    def store(self, topic_type):
+        """Load and cache the definition of topic_type. Whatever goes wrong is cached as its error message."""
+        try:
+            definition = self.load(topic_type)
+        except DefinitionError as error:
+            definition = str(error)
+        except Exception as error:
+            definition = 'cannot load %s: %s' % (topic_type, str(error) or error.__class__.__name__)
+        with self.lock:
+            self.definitions[topic_type] = definition
+            if len(self.definitions) > self.max_definitions:
+                self.definitions.popitem(last=False)
+            self.pending.discard(topic_type)
+        if self.notify:
+            self.notify(topic_type)
+        return definition
+
+    def close(self):
+        if self.pool:
+            self.pool.terminate()
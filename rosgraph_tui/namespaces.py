@@ -0,0 +1,190 @@
+import bisect
+
+import search
+
+
+NAMESPACE = 'S'
+NODE = 'N'
+TOPIC = 'T'
+
+
+class Namespace(object):
+    """
+    A namespace with the nodes and topics right in it, its child namespaces and the totals of its subtree.
+
+    publishers and subscribers count the connections of the topics in the subtree.
+    """
+
+    __slots__ = ('path', 'children', 'nodes', 'topics', 'node_count', 'topic_count', 'publishers', 'subscribers')
+
+    def __init__(self, path):
+        self.path = path
+        self.children = {}
+        self.nodes = []
+        self.topics = []
+        self.node_count = 0
+        self.topic_count = 0
+        self.publishers = 0
+        self.subscribers = 0
+
+    def counts(self):
+        return self.node_count, self.topic_count, self.publishers, self.subscribers
+
+
+def prefix_range(names, prefix):
+    """The start and end of the names starting with prefix in sorted names."""
+    return bisect.bisect_left(names, prefix), bisect.bisect_left(names, search.prefix_end(prefix))
+
+
+def contains(names, name):
+    """Whether sorted names contain name."""
+    i = bisect.bisect_left(names, name)
+    return i < len(names) and names[i] == name
+
+
+class NamespaceTree:
+    """
+    A trie over the namespaces of all node and topic names of a GraphModel, with the totals of every subtree.
+
+    The graph builds it once and patches it with every GraphDiff. rows()
+    only descends into expanded namespaces. With a filter, it takes the
+    sorted names the filter matched, in which the names of a subtree form
+    one range, so counting the matches of a namespace takes two bisections.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.root = Namespace('')
+        # the connections of every topic in the tree, which a patch takes off the totals again
+        self.topic_publishers = {}
+        self.topic_subscribers = {}
+        with graph.lock:
+            for n in graph.sorted_nodes:
+                self.add(n, NODE, 1, append=True)
+            for t in graph.sorted_topics:
+                self.add_topic(t, append=True)
+
+    def add_topic(self, t, append=False):
+        i = self.graph.topic_ids[t]
+        self.topic_publishers[t] = len(self.graph.publishers.row(i))
+        self.topic_subscribers[t] = len(self.graph.subscribers.row(i))
+        self.add(t, TOPIC, 1, self.topic_publishers[t], self.topic_subscribers[t], append)
+
+    def remove_topic(self, t):
+        self.add(t, TOPIC, -1, -self.topic_publishers.pop(t), -self.topic_subscribers.pop(t))
+
+    def add(self, name, kind, count, publishers=0, subscribers=0, append=False):
+        """
+        Add count, 1 or -1, of name to the totals of its namespaces, and add or remove it in its own.
+
+        Sorted names are appended, others inserted in order. Namespaces left empty are removed.
+        """
+        chain = [self.root]
+        segments = name.split('/')[1:-1]
+        for depth, segment in enumerate(segments, 1):
+            child = chain[-1].children.get(segment)
+            if child is None:
+                child = chain[-1].children[segment] = Namespace('/' + '/'.join(segments[:depth]))
+            chain.append(child)
+        for namespace in chain:
+            if kind == NODE:
+                namespace.node_count += count
+            else:
+                namespace.topic_count += count
+                namespace.publishers += publishers
+                namespace.subscribers += subscribers
+        names = chain[-1].nodes if kind == NODE else chain[-1].topics
+        if count < 0:
+            search.remove_sorted(names, name)
+            for depth in range(len(chain) - 1, 0, -1):
+                if chain[depth].node_count or chain[depth].topic_count:
+                    break
+                del chain[depth - 1].children[segments[depth - 1]]
+        elif append:
+            names.append(name)
+        else:
+            bisect.insort(names, name)
+
+    def apply_diff(self, diff):
+        """Patch the tree once its graph applied diff, by the nodes and topics that came, went or changed."""
+        graph = self.graph
+        for n in diff.removed_nodes:
+            self.add(n, NODE, -1)
+        for n in diff.added_nodes:
+            self.add(n, NODE, 1)
+        topics = set(diff.removed_topics)
+        topics.update(diff.added_topics)
+        for edges in (diff.added_pubs, diff.removed_pubs, diff.added_subs, diff.removed_subs):
+            topics.update(t for t, n in edges)
+        for t in topics:
+            if t in self.topic_publishers:
+                self.remove_topic(t)
+            if contains(graph.sorted_topics, t):
+                self.add_topic(t)
+
+    def counts(self, namespace, nodes=None, topics=None):
+        """
+        The (nodes, topics, publishers, subscribers) in the subtree of namespace.
+
+        With nodes and topics, only those are counted. They must be sorted.
+        """
+        if nodes is None:
+            return namespace.counts()
+        prefix = namespace.path + '/'
+        start, end = prefix_range(nodes, prefix)
+        node_count = end - start
+        start, end = prefix_range(topics, prefix)
+        if end - start == namespace.topic_count:
+            return node_count, namespace.topic_count, namespace.publishers, namespace.subscribers
+        names = topics[start:end]
+        return (node_count, len(names), sum(self.topic_publishers.get(t, 0) for t in names),
+                sum(self.topic_subscribers.get(t, 0) for t in names))
+
+    def rows(self, expanded, nodes=None, topics=None):
+        """
+        The rows of the root and the expanded namespaces, as (depth, kind, name, counts).
+
+        Namespaces come first with the counts of their matches, then the
+        matching nodes and topics, which have no counts. expanded is a set
+        of paths. With nodes and topics, the sorted names a filter matched,
+        only namespaces with a match and only matching names are listed.
+        """
+        with self.graph.lock:
+            rows = []
+            self.add_rows(rows, self.root, 0, expanded, nodes, topics)
+            return rows
+
+    def add_rows(self, rows, namespace, depth, expanded, nodes, topics):
+        """
+        Append the rows of namespace at depth to rows.
+
+        A namespace with fewer matches than children or names finds the
+        children and names to list from its range of matches instead.
+        """
+        children = namespace.children
+        if nodes is None:
+            segments = sorted(children)
+            ranges = None
+        else:
+            prefix = namespace.path + '/'
+            ranges = [matches[start:end] for matches in (nodes, topics) for start, end in
+                      [prefix_range(matches, prefix)]]
+            if len(ranges[0]) + len(ranges[1]) < len(children):
+                segments = sorted(set(name[len(prefix):name.index('/', len(prefix))] for names in ranges
+                                      for name in names if name.find('/', len(prefix)) >= 0))
+            else:
+                segments = sorted(children)
+        for segment in segments:
+            child = children[segment]
+            counts = self.counts(child, nodes, topics)
+            if counts[0] or counts[1]:
+                rows.append((depth, NAMESPACE, child.path, counts))
+                if child.path in expanded:
+                    self.add_rows(rows, child, depth + 1, expanded, nodes, topics)
+        for kind, names, matches, index in ((NODE, namespace.nodes, nodes, 0), (TOPIC, namespace.topics, topics, 1)):
+            if matches is None:
+                rows.extend((depth, kind, name, None) for name in names)
+            elif len(ranges[index]) < len(names):
+                rows.extend((depth, kind, name, None) for name in ranges[index] if name.find('/', len(prefix)) < 0)
+            else:
+                rows.extend((depth, kind, name, None) for name in names if contains(matches, name))
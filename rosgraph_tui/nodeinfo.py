@@ -0,0 +1,128 @@
+from multiprocessing.pool import ThreadPool
+import httplib
+import socket
+import threading
+import time
+import xml.parsers.expat
+import xmlrpclib
+
+import snapshot
+
+
+DEFAULT_TTL = 10.0
+DEFAULT_WORKERS = 8
+
+
+class Connection:
+    def __init__(self, destination, direction, transport, topic, connected):
+        self.destination = destination
+        self.direction = direction
+        self.transport = transport
+        self.topic = topic
+        self.connected = connected
+
+
+class NodeInfo:
+    """What a node reports about itself through its slave API, or why it did not answer."""
+
+    def __init__(self, uri=None, pid=None, connections=(), error=None):
+        self.uri = uri
+        self.pid = pid
+        self.connections = connections
+        self.error = error
+
+    def is_responsive(self):
+        return self.error is None
+
+    def summary(self):
+        if self.error is not None:
+            return 'unresponsive: ' + self.error
+        connected = [c for c in self.connections if c.connected]
+        transports = sorted(set(c.transport for c in connected))
+        return 'pid %s, %d/%d connected%s' % (self.pid, len(connected), len(self.connections),
+                                               ' (' + ', '.join(transports) + ')' if transports else '')
+
+
+def probe(master_uri, name, timeout):
+    """
+    Look up the XML-RPC URI of the node at the master and ask the node for its pid and connections.
+
+    Every call times out after timeout seconds, failures are reported in the returned NodeInfo.
+    """
+    try:
+        if master_uri is None:
+            master_uri = snapshot.default_master_uri()
+        master = snapshot.master_proxy(master_uri, timeout)
+        uri = snapshot.unwrap('lookupNode', master.lookupNode(snapshot.ID, name))
+        node = snapshot.master_proxy(uri, timeout)
+        pid = snapshot.unwrap('getPid', node.getPid(snapshot.ID))
+        bus_info = snapshot.unwrap('getBusInfo', node.getBusInfo(snapshot.ID))
+        connections = [Connection(*info[1:6]) for info in bus_info]
+    except (socket.error, httplib.HTTPException, xmlrpclib.Error, snapshot.MasterError) as error:
+        return NodeInfo(error=str(error) or error.__class__.__name__)
+    except (TypeError, ValueError, xml.parsers.expat.ExpatError) as error:
+        return NodeInfo(error='malformed answer: %s' % error)
+    return NodeInfo(uri, pid, connections)
+
+
+class NodeInfoCache:
+    """
+    Probes nodes on a bounded thread pool and keeps their answers for ttl seconds.
+
+    request() never blocks: it queues probes for the names without a fresh
+    answer, at most max_pending at a time. Each answer is passed to
+    notify(name, restyle) on a pool thread, where restyle tells whether
+    the node changed between responsive and unresponsive.
+    With resolve, a node is looked up at the master URI and under the name
+    returned by resolve(name) instead of at master_uri.
+    """
+
+    def __init__(self, notify, master_uri=None, timeout=snapshot.DEFAULT_TIMEOUT, ttl=DEFAULT_TTL,
+                 workers=DEFAULT_WORKERS, max_pending=256, resolve=None):
+        self.notify = notify
+        self.master_uri = master_uri
+        self.resolve = resolve
+        self.timeout = timeout
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.infos = {}
+        self.pending = set()
+        self.pool = ThreadPool(workers)
+
+    def get(self, name):
+        """Return the latest NodeInfo of name, even if expired, or None if there is none yet."""
+        entry = self.infos.get(name)
+        return entry[0] if entry else None
+
+    def is_pending(self, name):
+        return name in self.pending
+
+    def request(self, names):
+        now = time.time()
+        with self.lock:
+            names = [n for n in names if n not in self.pending and (n not in self.infos or self.infos[n][1] <= now)]
+            names = names[:max(0, self.max_pending - len(self.pending))]
+            self.pending.update(names)
+        for name in names:
+            self.pool.apply_async(self.probe, (name,))
+
+    def probe(self, name):
+        """Runs on the pool. Whatever goes wrong, an answer is stored, so name never stays pending."""
+        try:
+            master_uri, name_at_master = self.resolve(name) if self.resolve else (self.master_uri, name)
+            info = probe(master_uri, name_at_master, self.timeout)
+        except Exception as error:
+            info = NodeInfo(error='probe failed: %s' % (str(error) or error.__class__.__name__))
+        self.store(name, info)
+
+    def store(self, name, info):
+        with self.lock:
+            previous = self.get(name)
+            self.infos[name] = (info, time.time() + self.ttl)
+            self.pending.discard(name)
+        restyle = (previous is None or previous.is_responsive()) != info.is_responsive()
+        self.notify(name, restyle)
+
+    def close(self):
+        self.pool.terminate()
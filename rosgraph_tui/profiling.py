@@ -0,0 +1,202 @@
+from collections import deque
+import json
+import os
+import threading
+import timeit
+
+import urwid
+
+
+timer = timeit.default_timer
+
+DEFAULT_TRACE_FILE = 'rosgraph_tui_trace.json'
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100.0))]
+
+
+class NullSpan:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class NullProfiler:
+    """Stands in for Profiler while profiling is off, so an instrumented stage costs one call and no timing."""
+
+    enabled = False
+
+    def span(self, name):
+        return NULL_SPAN
+
+    def wrap(self, name, function):
+        return function
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class Span:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = timer()
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, self.start, timer() - self.start)
+
+
+class Profiler:
+    """
+    Times the stages of the UI on every thread and keeps their latency samples per stage.
+
+    The stages run on the main loop are grouped into frames: a frame starts
+    with an input event, or with the first stage after the previous frame,
+    and ends when the screen got drawn. Stages nest, so the breakdown of a
+    frame counts the time of inner stages in the outer ones, too.
+    Events and samples are bounded, the oldest are dropped first.
+    """
+
+    enabled = True
+
+    def __init__(self, max_events=100000, max_samples=10000):
+        self.main_thread = threading.current_thread()
+        self.epoch = timer()
+        self.max_samples = max_samples
+        self.events = deque(maxlen=max_events)
+        self.samples = {}
+        self.frame_label = None
+        self.frame_detail = None
+        self.frame_start = None
+        self.frame_stages = []
+        # (label, seconds, [(stage, seconds)]) of the last complete frame
+        self.last_frame = None
+
+    def span(self, name):
+        return Span(self, name)
+
+    def wrap(self, name, function):
+        def timed(*args, **kwargs):
+            with self.span(name):
+                return function(*args, **kwargs)
+        return timed
+
+    def record(self, name, start, duration):
+        self.add_event(name, start, duration)
+        if threading.current_thread() is self.main_thread:
+            if self.frame_start is None:
+                self.frame_start = start
+            self.frame_stages.append((name, duration))
+
+    def add_event(self, name, start, duration, detail=None):
+        thread = threading.current_thread()
+        self.events.append((name, start, duration, thread.ident, thread.name, detail))
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples.setdefault(name, deque(maxlen=self.max_samples))
+        samples.append(duration)
+
+    def begin_frame(self, label, detail=None):
+        self.frame_label = label
+        self.frame_detail = detail
+        self.frame_start = timer()
+        self.frame_stages = []
+
+    def is_in_frame(self):
+        return self.frame_start is not None
+
+    def end_frame(self):
+        if self.frame_start is None:
+            return
+        label, detail, start, stages = self.frame_label or 'update', self.frame_detail, self.frame_start, \
+            self.frame_stages
+        self.frame_label = self.frame_detail = self.frame_start = None
+        self.frame_stages = []
+
+        duration = timer() - start
+        self.add_event(label, start, duration, detail)
+        totals = {}
+        for name, seconds in stages:
+            totals[name] = totals.get(name, 0) + seconds
+        self.last_frame = (label, duration, sorted(totals.items(), key=lambda item: -item[1]))
+
+    def percentiles(self, name):
+        """The 50th, 95th and 99th percentile of the durations of name in seconds, or None without samples."""
+        samples = list(self.samples.get(name, ()))
+        if not samples:
+            return None
+        return percentile(samples, 50), percentile(samples, 95), percentile(samples, 99)
+
+    def summary(self):
+        lines = ['%-16s %8s %10s %10s %10s' % ('stage', 'count', 'p50', 'p95', 'p99')]
+        for name in sorted(self.samples):
+            lines.append('%-16s %8d %8.2fms %8.2fms %8.2fms' % (
+                (name, len(self.samples[name])) + tuple(p * 1e3 for p in self.percentiles(name))))
+        return '\n'.join(lines)
+
+    def frame_summary(self):
+        """The breakdown of the last frame and the input latency percentiles, as lines of text."""
+        if self.last_frame is None:
+            return ['no frame yet']
+        label, duration, stages = self.last_frame
+        lines = ['last %s frame: %.2fms' % (label, duration * 1e3)]
+        lines.extend('  %-14s %8.2fms' % (name, seconds * 1e3) for name, seconds in stages)
+        latency = self.percentiles('input')
+        if latency:
+            lines.append('input p50/p95/p99: %.1f/%.1f/%.1fms' % tuple(p * 1e3 for p in latency))
+        return lines
+
+    def write_trace(self, path):
+        """Write all events in the Chrome trace event format, to be opened with chrome://tracing or Perfetto."""
+        pid = os.getpid()
+        trace = []
+        threads = {}
+        for name, start, duration, thread_id, thread_name, detail in list(self.events):
+            threads[thread_id] = thread_name
+            event = {'name': name, 'ph': 'X', 'pid': pid, 'tid': thread_id,
+                     'ts': (start - self.epoch) * 1e6, 'dur': duration * 1e6}
+            if detail:
+                event['args'] = {'input': detail}
+            trace.append(event)
+        for thread_id, thread_name in threads.items():
+            trace.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread_id,
+                          'args': {'name': thread_name}})
+        with open(path, 'w') as trace_file:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, trace_file)
+
+
+class ProfiledMainLoop(urwid.MainLoop):
+    """
+    A MainLoop that starts a profiler frame for every input and ends it once the screen is drawn.
+
+    on_frame() is called after each frame, a draw afterwards is not profiled.
+    """
+
+    def __init__(self, profiler, *args, **kwargs):
+        self.profiler = profiler
+        self.on_frame = None
+        super(ProfiledMainLoop, self).__init__(*args, **kwargs)
+
+    def process_input(self, keys):
+        self.profiler.begin_frame('input', ' '.join(str(key) for key in keys))
+        return super(ProfiledMainLoop, self).process_input(keys)
+
+    def draw_screen(self):
+        if not self.profiler.is_in_frame():
+            return super(ProfiledMainLoop, self).draw_screen()
+        with self.profiler.span('render'):
+            super(ProfiledMainLoop, self).draw_screen()
+        self.profiler.end_frame()
+        if self.on_frame:
+            self.on_frame()
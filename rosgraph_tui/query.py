@@ -0,0 +1,181 @@
+import argparse
+import json
+import signal
+import sys
+
+import masters
+import model
+import snapshot
+import traversal
+
+
+COMMANDS = {
+    'nodes': 'the nodes whose names contain FILTER, all of them without FILTER',
+    'topics': 'the topics whose names contain FILTER, all of them without FILTER',
+    'publishers': 'the nodes publishing topic NAME',
+    'subscribers': 'the nodes subscribed to topic NAME',
+    'publications': 'the topics node NAME publishes',
+    'subscriptions': 'the topics node NAME subscribes to',
+    'type': 'the topics of message type NAME',
+    'types': 'the message types of the topics whose names contain FILTER, with their number of topics',
+    'downstream': 'everything node or topic NAME feeds, with the number of hops',
+    'upstream': 'everything feeding node or topic NAME, with the number of hops',
+}
+
+
+class QueryError(Exception):
+    pass
+
+
+def entity(graph, name):
+    if name in graph.node_ids:
+        return traversal.NODE, name
+    elif name in graph.topic_ids:
+        return traversal.TOPIC, name
+    raise QueryError('no node or topic named ' + name)
+
+
+def check_name(graph, command, name):
+    """Raise QueryError unless the graph knows name as what command asks about."""
+    if command in ('publishers', 'subscribers'):
+        ids, kind = graph.topic_ids, 'topic'
+    elif command in ('publications', 'subscriptions'):
+        ids, kind = graph.node_ids, 'node'
+    else:
+        ids, kind = graph.type_ids, 'message type'
+    if name not in ids:
+        raise QueryError('no %s named %s' % (kind, name))
+
+
+def answer(graph, query, fuzzy=False):
+    """
+    Return an iterator over the results of query, a command with its argument like 'publishers /rosout'.
+
+    Every result is a dict with a name. Node and topic lists are the ones GraphModel
+    keeps anyway, so results are only turned into dicts one at a time.
+    """
+    words = query.split(None, 1)
+    if not words or words[0] not in COMMANDS:
+        raise QueryError('unknown query: %r, use one of %s' % (query, ', '.join(sorted(COMMANDS))))
+    command, argument = words[0], words[1].strip() if len(words) > 1 else ''
+    if not argument and command not in ('nodes', 'topics', 'types'):
+        raise QueryError(command + ' needs a name')
+    if command in ('publishers', 'subscribers', 'publications', 'subscriptions', 'type'):
+        check_name(graph, command, argument)
+
+    if command == 'nodes':
+        names = graph.get_nodes(argument, fuzzy)
+    elif command == 'topics':
+        names = graph.get_topics(argument, fuzzy)
+    elif command == 'publishers':
+        names = graph.get_publishers(argument)
+    elif command == 'subscribers':
+        names = graph.get_subscribers(argument)
+    elif command == 'publications':
+        names = graph.get_publications(argument)
+    elif command == 'subscriptions':
+        names = graph.get_subscriptions(argument)
+    elif command == 'type':
+        names = graph.get_topics_of_type(argument)
+    elif command == 'types':
+        counts = graph.type_counts(graph.get_topics(argument, fuzzy) if argument else None)
+        return ({'name': topic_type, 'count': count} for topic_type, count in counts)
+    else:
+        direction = traversal.DOWNSTREAM if command == 'downstream' else traversal.UPSTREAM
+        levels = graph.traversal.neighborhood(entity(graph, argument), direction)
+        return ({'name': name, 'kind': 'node' if kind == traversal.NODE else 'topic', 'hops': hops}
+                for hops, (kind, names) in enumerate(levels, 1) for name in names)
+
+    if command in ('topics', 'publications', 'subscriptions', 'type'):
+        return ({'name': t, 'type': graph.topic_type(t)} for t in names)
+    return ({'name': n} for n in names)
+
+
+def write_answer(out, query, results, as_json, batch):
+    """Write the results of query as they come, prefixed with the query in batch mode."""
+    prefix = query + '\t' if batch else ''
+    for result in results:
+        if as_json:
+            if batch:
+                result['query'] = query
+            out.write(json.dumps(result, sort_keys=True) + '\n')
+        else:
+            out.write(prefix + result['name'] + ('\t%d' % result['count'] if 'count' in result else '') + '\n')
+    out.flush()
+
+
+def write_error(out, query, error, as_json):
+    if as_json:
+        out.write(json.dumps({'query': query, 'error': str(error)}, sort_keys=True) + '\n')
+        out.flush()
+    else:
+        sys.stderr.write('rosgraph_tui query: %s\n' % error)
+
+
+def read_queries(batch_file):
+    """Read line by line, so queries piped in by another process are answered right away."""
+    for line in iter(batch_file.readline, ''):
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        prog='rosgraph_tui query', formatter_class=argparse.RawDescriptionHelpFormatter,
+        description='Answer questions about the ROS graph without the TUI, one result per line.',
+        epilog='queries:\n' + '\n'.join('  %-28s %s' % (command + (' [FILTER]' if command in ('nodes', 'topics', 'types')
+                                                                    else ' NAME'), description)
+                                        for command, description in sorted(COMMANDS.items())))
+    parser.add_argument('query', nargs='*', help='the query, e.g. publishers /rosout')
+    parser.add_argument('--json', action='store_true',
+                        help='write newline-delimited JSON objects instead of plain names')
+    parser.add_argument('--batch', type=argparse.FileType('r'), metavar='FILE',
+                        help="answer the queries in FILE, one per line, '-' for stdin, all from the same graph")
+    parser.add_argument('--fuzzy', action='store_true', help='rank nodes and topics by fuzzy search')
+    parser.add_argument('--timeout', type=float, default=snapshot.DEFAULT_TIMEOUT, metavar='SECONDS',
+                        help='give up on the ROS master after SECONDS (default: %(default)s)')
+    parser.add_argument('--master', action='append', default=[], metavar='[TAG=]URI',
+                        help='ask the ROS master at URI; given several times, query the merged graph of all '
+                             'masters, with the names of each master in the namespace /TAG')
+    parser.add_argument('--snapshot', metavar='FILE',
+                        help='query the graph saved in FILE instead of asking the ROS master')
+
+    options = parser.parse_args(args)
+    if bool(options.query) == bool(options.batch):
+        parser.error('give either a query or --batch')
+    try:
+        options.master_group = masters.group_of(options.master)
+    except ValueError as error:
+        parser.error(str(error))
+    return options
+
+
+def main(args, out=sys.stdout):
+    """Answer the queries given by args and return the exit status, 1 if any query failed."""
+    options = parse_args(args)
+    # end quietly when a reader like head has seen enough
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+    try:
+        if options.snapshot:
+            state = snapshot.load_state(options.snapshot)
+        elif options.master_group:
+            state = options.master_group.fetch_state(options.timeout)
+        else:
+            state = snapshot.fetch_state(options.master[0] if options.master else None, options.timeout)
+    except (snapshot.MasterError, snapshot.SnapshotFileError) as error:
+        sys.exit(str(error))
+    if options.master_group:
+        for tag, error in sorted(options.master_group.errors.items()):
+            sys.stderr.write('rosgraph_tui query: skipping @%s: %s\n' % (tag, error))
+    graph = model.GraphModel(state)
+
+    queries = read_queries(options.batch) if options.batch else [' '.join(options.query)]
+    status = 0
+    for query in queries:
+        try:
+            write_answer(out, query, answer(graph, query, options.fuzzy), options.json, options.batch is not None)
+        except QueryError as error:
+            write_error(out, query, error, options.json)
+            status = 1
+    return status
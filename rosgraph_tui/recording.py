@@ -0,0 +1,277 @@
+import argparse
+import bisect
+import json
+import mmap
+import struct
+import sys
+import time
+import zlib
+
+import masters
+import model
+import snapshot
+
+
+DEFAULT_KEYFRAME_INTERVAL = 50
+
+# Recordings start with a header, followed by records of a kind, a time
+# and a zlib compressed JSON payload. A keyframe holds the whole graph
+# state like GraphModel takes it, a delta the changes since the previous
+# record as lists of names and [topic, node] edges by kind of change. The first record
+# is a keyframe, then every keyframe_interval-th one.
+RECORDING_MAGIC = b'RGTL'
+RECORDING_VERSION = 1
+RECORDING_HEADER = struct.Struct('<4sI')
+RECORD = struct.Struct('<cdI')
+KEYFRAME = b'K'
+DELTA = b'D'
+
+
+class GraphState:
+    """A graph state as sets, so two of them are compared and patched without rebuilding any list."""
+
+    def __init__(self, nodes=(), topics=(), pubs=(), subs=()):
+        self.nodes = set(nodes)
+        # topic name -> type
+        self.topics = dict(topics)
+        # (topic, node) pairs
+        self.pubs = set(pubs)
+        self.subs = set(subs)
+
+    @classmethod
+    def from_state(cls, state):
+        all_nodes, all_topics, all_pubs, all_subs = state
+        return cls(all_nodes, model.GraphDiff.topic_types(all_topics).items(), model.GraphDiff.edges(all_pubs),
+                   model.GraphDiff.edges(all_subs))
+
+    def to_state(self):
+        """The tuple (all_nodes, all_topics, all_pubs, all_subs) GraphModel takes."""
+        edges = []
+        for pairs in (self.pubs, self.subs):
+            nodes_by_topic = {}
+            for t, n in pairs:
+                nodes_by_topic.setdefault(t, []).append(n)
+            edges.append([[t, sorted(l)] for t, l in sorted(nodes_by_topic.items())])
+        return sorted(self.nodes), [[t, t_type] for t, t_type in sorted(self.topics.items())], edges[0], edges[1]
+
+    def copy(self):
+        return GraphState(self.nodes, self.topics.items(), self.pubs, self.subs)
+
+    def delta(self, other):
+        """The changes from this state to other as a JSON-friendly dict, or None if there are none."""
+        changed_topics = [t for t, t_type in other.topics.items() if self.topics.get(t) != t_type]
+        delta = {'+n': sorted(other.nodes - self.nodes), '-n': sorted(self.nodes - other.nodes),
+                 '+t': [[t, other.topics[t]] for t in sorted(changed_topics)],
+                 '-t': sorted(t for t in self.topics if t not in other.topics),
+                 '+p': sorted(other.pubs - self.pubs), '-p': sorted(self.pubs - other.pubs),
+                 '+s': sorted(other.subs - self.subs), '-s': sorted(self.subs - other.subs)}
+        delta = dict((key, value) for key, value in delta.items() if value)
+        return delta or None
+
+    def apply(self, delta):
+        self.nodes.difference_update(delta.get('-n', ()))
+        self.nodes.update(delta.get('+n', ()))
+        for t in delta.get('-t', ()):
+            del self.topics[t]
+        self.topics.update(delta.get('+t', ()))
+        for edges, sign in ((self.pubs, 'p'), (self.subs, 's')):
+            edges.difference_update(tuple(edge) for edge in delta.get('-' + sign, ()))
+            edges.update(tuple(edge) for edge in delta.get('+' + sign, ()))
+
+    def diff(self, other):
+        """The GraphDiff from this state to other, without its state, or None if there is none."""
+        added_topics = dict((t, t_type) for t, t_type in other.topics.items() if self.topics.get(t) != t_type)
+        removed_topics = set(t for t, t_type in self.topics.items() if other.topics.get(t) != t_type)
+        diff = model.GraphDiff(None, other.nodes - self.nodes, self.nodes - other.nodes, added_topics,
+                               removed_topics, other.pubs - self.pubs, self.pubs - other.pubs,
+                               other.subs - self.subs, self.subs - other.subs)
+        return None if diff.is_empty() else diff
+
+
+def encode(payload):
+    return zlib.compress(json.dumps(payload, separators=(',', ':')))
+
+
+def decode(data):
+    return json.loads(zlib.decompress(data))
+
+
+class Recorder:
+    """
+    Appends the changes of the graph to a recording.
+
+    record() stores nothing if the graph did not change, a keyframe for the
+    first and every keyframe_interval-th change, and a delta otherwise. Each
+    record is flushed, so a recording cut short by a crash keeps all but the last.
+    """
+
+    def __init__(self, path, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL):
+        self.file = open(path, 'wb')
+        self.file.write(RECORDING_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION))
+        self.keyframe_interval = keyframe_interval
+        self.graph_state = None
+        self.count = 0
+
+    def record(self, state, timestamp=None):
+        """Record state, returns the GraphDiff since the previous state or None if nothing changed."""
+        graph_state = GraphState.from_state(state)
+        diff = (self.graph_state or GraphState()).diff(graph_state)
+        if diff is None and self.graph_state is not None:
+            return None
+        if self.count % self.keyframe_interval == 0:
+            self.write(KEYFRAME, timestamp, graph_state.to_state())
+        else:
+            self.write(DELTA, timestamp, self.graph_state.delta(graph_state))
+        self.graph_state = graph_state
+        self.count += 1
+        return diff
+
+    def write(self, kind, timestamp, payload):
+        data = encode(payload)
+        self.file.write(RECORD.pack(kind, time.time() if timestamp is None else timestamp, len(data)))
+        self.file.write(data)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class RecordingReader:
+    """
+    Reads a recording written by Recorder.
+
+    Opening only reads the record headers. state_at() decodes the nearest
+    keyframe at or before the record and applies the deltas after it, or
+    continues from the record it was asked for last if that is closer.
+    """
+
+    def __init__(self, path):
+        try:
+            with open(path, 'rb') as f:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, ValueError, mmap.error) as error:
+            raise snapshot.SnapshotFileError("Unable to read recording %s: %s" % (path, error))
+        if len(self.data) < RECORDING_HEADER.size or \
+                RECORDING_HEADER.unpack_from(self.data) != (RECORDING_MAGIC, RECORDING_VERSION):
+            raise snapshot.SnapshotFileError("%s is not a rosgraph_tui recording of version %d" % (
+                path, RECORDING_VERSION))
+
+        # per record its kind, time and payload position; a record cut off at the end is left out
+        self.kinds = []
+        self.times = []
+        self.payloads = []
+        self.keyframes = []
+        position = RECORDING_HEADER.size
+        while position + RECORD.size <= len(self.data):
+            kind, timestamp, length = RECORD.unpack_from(self.data, position)
+            position += RECORD.size
+            if position + length > len(self.data):
+                break
+            if kind == KEYFRAME:
+                self.keyframes.append(len(self.kinds))
+            self.kinds.append(kind)
+            self.times.append(timestamp)
+            self.payloads.append((position, length))
+            position += length
+        if not self.keyframes or self.keyframes[0] != 0:
+            raise snapshot.SnapshotFileError("%s holds no graph" % path)
+
+        self.index = None
+        self.graph_state = None
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def payload(self, index):
+        position, length = self.payloads[index]
+        return decode(self.data[position:position + length])
+
+    def state_at(self, index):
+        """The GraphState after record index, which must not be modified and changes with the next call."""
+        keyframe = self.keyframes[bisect.bisect_right(self.keyframes, index) - 1]
+        if self.index is None or not keyframe <= self.index <= index:
+            self.graph_state = GraphState.from_state(self.payload(keyframe))
+            self.index = keyframe
+        for i in range(self.index + 1, index + 1):
+            self.graph_state.apply(self.payload(i))
+        self.index = index
+        return self.graph_state
+
+    def index_at(self, timestamp):
+        """The last record at or before timestamp, or the first one."""
+        return max(0, bisect.bisect_right(self.times, timestamp) - 1)
+
+    def close(self):
+        self.data.close()
+
+
+def summarize(diff, max_names=3):
+    """A short description of diff, naming the nodes and topics that appeared or disappeared."""
+    parts = []
+    for sign, names, what in (('+', diff.added_nodes, 'node'), ('-', diff.removed_nodes, 'node'),
+                              ('+', [t for t in diff.added_topics if t not in diff.removed_topics], 'topic'),
+                              ('-', [t for t in diff.removed_topics if t not in diff.added_topics], 'topic')):
+        if len(names) > max_names:
+            parts.append('%s%d %ss' % (sign, len(names), what))
+        else:
+            parts.extend(sign + name for name in sorted(names))
+    for sign, edges, what in (('+', diff.added_pubs, 'pub'), ('-', diff.removed_pubs, 'pub'),
+                              ('+', diff.added_subs, 'sub'), ('-', diff.removed_subs, 'sub')):
+        if edges:
+            parts.append('%s%d %s%s' % (sign, len(edges), what, 's' if len(edges) > 1 else ''))
+    return ' '.join(parts)
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        prog='rosgraph_tui record',
+        description='Poll the ROS master and record how the graph changes, for rosgraph_tui --replay FILE.')
+    parser.add_argument('file', metavar='FILE', help='the recording to write, an existing one is replaced')
+    parser.add_argument('--interval', type=float, default=1.0, metavar='SECONDS',
+                        help='poll the ROS master every SECONDS (default: %(default)s)')
+    parser.add_argument('--keyframe-interval', type=int, default=DEFAULT_KEYFRAME_INTERVAL, metavar='COUNT',
+                        help='store the whole graph every COUNT changes, which bounds the work of a seek '
+                             '(default: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=snapshot.DEFAULT_TIMEOUT, metavar='SECONDS',
+                        help='give up on the ROS master after SECONDS (default: %(default)s)')
+    parser.add_argument('--master', action='append', default=[], metavar='[TAG=]URI',
+                        help='ask the ROS master at URI; given several times, record the merged graph of all '
+                             'masters, with the names of each master in the namespace /TAG')
+
+    options = parser.parse_args(args)
+    if options.interval <= 0 or options.keyframe_interval < 1:
+        parser.error('--interval and --keyframe-interval must be positive')
+    try:
+        options.master_group = masters.group_of(options.master)
+    except ValueError as error:
+        parser.error(str(error))
+    return options
+
+
+def main(args, out=sys.stdout):
+    """Record until interrupted, writing a line per change to out. Unreachable masters are skipped, not recorded."""
+    options = parse_args(args)
+    recorder = Recorder(options.file, options.keyframe_interval)
+    try:
+        while True:
+            start = time.time()
+            try:
+                if options.master_group:
+                    state = options.master_group.fetch_state(options.timeout)
+                else:
+                    state = snapshot.fetch_state(options.master[0] if options.master else None, options.timeout)
+            except snapshot.MasterError as error:
+                sys.stderr.write('rosgraph_tui record: %s\n' % error)
+            else:
+                diff = recorder.record(state, start)
+                if diff is not None:
+                    out.write('%s  %s\n' % (time.strftime('%H:%M:%S', time.localtime(start)),
+                                            summarize(diff) if recorder.count > 1 else
+                                            '%d nodes, %d topics' % (len(state[0]), len(state[1]))))
+                    out.flush()
+            time.sleep(max(0, start + options.interval - time.time()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.close()
+    return 0
@@ -0,0 +1,200 @@
+from collections import OrderedDict
+import bisect
+import heapq
+
+
+def remove_sorted(names, name):
+    position = bisect.bisect_left(names, name)
+    if position < len(names) and names[position] == name:
+        del names[position]
+
+
+def parse_filter(filter_string):
+    """
+    Split filter_string at spaces into the words names must contain, the tags of its '@master' terms and its ':type' terms.
+
+    A tag matches the masters whose tag starts with it, so '@' alone matches
+    all of them. A type term matches the message types containing it.
+    """
+    words = []
+    masters = []
+    types = []
+    for term in filter_string.split(' '):
+        if term.startswith('@'):
+            masters.append(term[1:])
+        elif term.startswith(':'):
+            types.append(term[1:])
+        elif term:
+            words.append(term)
+    return words, masters, types
+
+
+def prefix_end(prefix):
+    """The smallest string after all strings starting with prefix."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def restrict(names, words, masters, is_sorted=True):
+    """
+    The names containing all words and, with masters, in the namespace of one of them.
+
+    Names of a master form one range of sorted names, found by bisection.
+    The names are returned as they are without any restriction.
+    """
+    if masters:
+        prefixes = ['/' + m for m in masters]
+        if is_sorted:
+            ranges = sorted((bisect.bisect_left(names, p), bisect.bisect_left(names, prefix_end(p)))
+                            for p in prefixes)
+            result = []
+            end = 0
+            for start, stop in ranges:
+                result.extend(names[max(start, end):stop])
+                end = max(end, stop)
+            names = result
+        else:
+            names = [n for n in names if any(n.startswith(p) for p in prefixes)]
+    if words:
+        names = [n for n in names if all(w in n for w in words)]
+    return names
+
+
+class FilterCache:
+    """
+    Substring filter over a sorted list of names.
+
+    Typing one more character can only shrink the result, so a new filter
+    string narrows the result of its longest cached prefix instead of
+    scanning all names again. Earlier results are kept in a bounded LRU,
+    which makes backspace a dictionary lookup.
+    The returned lists are shared and must not be modified, use insert() and
+    remove() to patch the names and all cached results in place.
+    """
+
+    def __init__(self, names, max_results=64):
+        self.names = names
+        self.max_results = max_results
+        self.results = OrderedDict()
+
+    def filter(self, filter_string=''):
+        if not filter_string:
+            return self.names
+
+        result = self.results.pop(filter_string, None)
+        if result is None:
+            result = [name for name in self.narrowest_base(filter_string) if filter_string in name]
+            if len(self.results) >= self.max_results:
+                self.results.popitem(last=False)
+        self.results[filter_string] = result
+        return result
+
+    def narrowest_base(self, filter_string):
+        for end in range(len(filter_string) - 1, 0, -1):
+            result = self.results.get(filter_string[:end])
+            if result is not None:
+                return result
+        return self.names
+
+    def insert(self, name):
+        bisect.insort(self.names, name)
+        for filter_string, result in self.results.items():
+            if filter_string in name:
+                bisect.insort(result, name)
+
+    def remove(self, name):
+        remove_sorted(self.names, name)
+        for filter_string, result in self.results.items():
+            if filter_string in name:
+                remove_sorted(result, name)
+
+
+class FuzzyIndex:
+    """
+    Ranked, case-insensitive fuzzy search over a list of names, backed by a trigram inverted index.
+
+    Names containing the query rank first, shortest first. They come from an
+    incremental FilterCache over the lowercase names. If there are fewer of
+    them than the limit, the rest is filled with names sharing enough
+    trigrams with the query. Those candidates come from the posting lists of
+    the rarest query trigrams only, and the best ones are kept in a bounded heap.
+    """
+
+    N = 3
+
+    def __init__(self, names, limit=1000, min_similarity=0.5):
+        self.names = list(names)
+        self.keys = [name.lower() for name in names]
+        self.positions = dict((name, position) for position, name in enumerate(self.names))
+        self.limit = limit
+        self.min_similarity = min_similarity
+
+        self.names_by_key = {}
+        for key, name in zip(self.keys, self.names):
+            self.names_by_key.setdefault(key, []).append(name)
+        self.substring_filter = FilterCache(sorted(self.names_by_key))
+
+        self.postings = {}
+        for position, key in enumerate(self.keys):
+            self.add_postings(position, key)
+
+    def add_postings(self, position, key):
+        for gram in set(self.ngrams(key)):
+            self.postings.setdefault(gram, []).append(position)
+
+    def insert(self, name):
+        """Index a new name. Removed names leave a hole in their posting lists instead of being searched for."""
+        key = name.lower()
+        position = len(self.names)
+        self.names.append(name)
+        self.keys.append(key)
+        self.positions[name] = position
+        if key not in self.names_by_key:
+            self.substring_filter.insert(key)
+        self.names_by_key.setdefault(key, []).append(name)
+        self.add_postings(position, key)
+
+    def remove(self, name):
+        position = self.positions.pop(name)
+        key = self.keys[position]
+        self.keys[position] = None
+        self.names_by_key[key].remove(name)
+        if not self.names_by_key[key]:
+            del self.names_by_key[key]
+            self.substring_filter.remove(key)
+
+    @classmethod
+    def ngrams(cls, key):
+        return [key[i:i + cls.N] for i in range(len(key) - cls.N + 1)]
+
+    def search(self, query):
+        query = query.lower()
+
+        exact = heapq.nsmallest(self.limit, self.substring_filter.filter(query), key=len)
+        result = [name for key in exact for name in self.names_by_key[key]]
+        if len(exact) < self.limit:
+            result += self.search_similar(query, self.limit - len(exact))
+        return result
+
+    def search_similar(self, query, limit):
+        grams = list(set(self.ngrams(query)))
+        if not grams:
+            return []
+
+        # a name sharing at least min_shared trigrams with the query appears
+        # in at least one of the len(grams) - min_shared + 1 rarest posting lists
+        min_shared = max(1, int(len(grams) * self.min_similarity + 0.5))
+        grams.sort(key=lambda gram: len(self.postings.get(gram, ())))
+        candidates = set()
+        for gram in grams[:len(grams) - min_shared + 1]:
+            candidates.update(self.postings.get(gram, ()))
+
+        scored = []
+        for position in candidates:
+            key = self.keys[position]
+            if key is None or query in key:
+                continue
+            shared = len([gram for gram in grams if gram in key])
+            if shared >= min_shared:
+                scored.append((float(shared) / len(grams) + 1.0 / (len(key) + 1), position))
+
+        return [self.names[position] for score, position in heapq.nlargest(limit, scored)]
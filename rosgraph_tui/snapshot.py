@@ -0,0 +1,292 @@
+from array import array
+import httplib
+import itertools
+import mmap
+import operator
+import struct
+import sys
+import threading
+import xmlrpclib
+
+
+ID = '/rosgraph_tui'
+
+DEFAULT_TIMEOUT = 5.0
+
+
+class MasterError(Exception):
+    pass
+
+
+class SnapshotFileError(Exception):
+    pass
+
+
+class TimeoutTransport(xmlrpclib.Transport):
+    def __init__(self, timeout):
+        xmlrpclib.Transport.__init__(self)
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        connection = xmlrpclib.Transport.make_connection(self, host)
+        connection.timeout = self.timeout
+        return connection
+
+
+def default_master_uri():
+    import rosgraph
+    return rosgraph.get_master_uri()
+
+
+def master_proxy(master_uri, timeout):
+    return xmlrpclib.ServerProxy(master_uri, transport=TimeoutTransport(timeout))
+
+
+def unwrap(method, response):
+    code, message, value = response
+    if code != 1:
+        raise MasterError("%s failed: %s" % (method, message))
+    return value
+
+
+def node_names(system_state):
+    """Collect the node names like rosnode.get_node_names(), but without asking the master again."""
+    names = set()
+    for pubs_subs_or_srvs in system_state:
+        for name, l in pubs_subs_or_srvs:
+            names.update(l)
+    return sorted(names)
+
+
+MASTER_CALLS = [('getSystemState', (ID,)), ('getPublishedTopics', (ID, '/'))]
+
+
+def fetch_multicall(master_uri, timeout):
+    multicall = xmlrpclib.MultiCall(master_proxy(master_uri, timeout))
+    for method, args in MASTER_CALLS:
+        getattr(multicall, method)(*args)
+    return [unwrap(method, response) for (method, args), response in zip(MASTER_CALLS, multicall())]
+
+
+def fetch_concurrently(master_uri, timeout):
+    results = [None] * len(MASTER_CALLS)
+
+    def call(index, method, args):
+        try:
+            results[index] = unwrap(method, getattr(master_proxy(master_uri, timeout), method)(*args)), None
+        except Exception as error:
+            results[index] = None, error
+
+    threads = [threading.Thread(target=call, args=(index, method, args))
+               for index, (method, args) in enumerate(MASTER_CALLS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for value, error in results:
+        if error is not None:
+            raise error
+    return [value for value, error in results]
+
+
+def fetch_state(master_uri=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Fetch the graph from the ROS master.
+
+    All master calls go out in a single system.multicall round trip. Masters
+    without multicall support get them concurrently instead. Every call
+    times out after timeout seconds, and any failure raises a MasterError.
+    Returns the tuple (all_nodes, all_topics, all_pubs, all_subs) expected by GraphModel.
+    """
+    if master_uri is None:
+        master_uri = default_master_uri()
+
+    try:
+        try:
+            system_state, all_topics = fetch_multicall(master_uri, timeout)
+        except xmlrpclib.Fault:
+            system_state, all_topics = fetch_concurrently(master_uri, timeout)
+    except (IOError, ValueError, httplib.HTTPException, xmlrpclib.Error) as error:
+        # IOError covers socket errors and master URIs without http:// or https://
+        raise MasterError("Unable to communicate with master %s: %s" % (master_uri, error))
+
+    return node_names(system_state), all_topics, system_state[0], system_state[1]
+
+
+# Snapshot files start with a header, followed by the node, topic and type
+# name tables, the type id of every topic (-1 if unknown) and the CSR
+# adjacency of publishers and subscribers: per topic an offset into a flat
+# array of node ids. Name tables are newline separated UTF-8, all integers
+# are little-endian.
+SNAPSHOT_MAGIC = b'RGTS'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<4sI')
+COUNT = struct.Struct('<I')
+
+
+def write_names(f, names):
+    data = '\n'.join(names).encode('utf-8')
+    f.write(COUNT.pack(len(names)))
+    f.write(COUNT.pack(len(data)))
+    f.write(data)
+
+
+def write_ints(f, ints):
+    ints = array('i', ints)
+    if sys.byteorder != 'little':
+        ints.byteswap()
+    f.write(COUNT.pack(len(ints)))
+    f.write(ints.tostring())
+
+
+def adjacency(edges, topics, node_ids):
+    nodes_by_topic = {}
+    for t, l in edges:
+        nodes_by_topic.setdefault(t, set()).update(l)
+
+    offsets = [0]
+    targets = []
+    for t in topics:
+        targets.extend(sorted(node_ids[n] for n in nodes_by_topic.get(t, ())))
+        offsets.append(len(targets))
+    return offsets, targets
+
+
+def save_state(path, state):
+    """Write the state (all_nodes, all_topics, all_pubs, all_subs) to a snapshot file."""
+    all_nodes, all_topics, all_pubs, all_subs = state
+
+    topic_types = {}
+    for t, t_type in all_topics:
+        topic_types.setdefault(t, t_type)
+    edges = all_pubs + all_subs
+    nodes = sorted(set(all_nodes).union(*[l for t, l in edges]))
+    topics = sorted(set(topic_types).union(t for t, l in edges))
+    types = sorted(set(topic_types.values()))
+
+    node_ids = dict((n, i) for i, n in enumerate(nodes))
+    type_ids = dict((t_type, i) for i, t_type in enumerate(types))
+
+    with open(path, 'wb') as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION))
+        write_names(f, nodes)
+        write_names(f, topics)
+        write_names(f, types)
+        write_ints(f, [type_ids[topic_types[t]] if t in topic_types else -1 for t in topics])
+        for offsets, targets in (adjacency(all_pubs, topics, node_ids), adjacency(all_subs, topics, node_ids)):
+            write_ints(f, offsets)
+            write_ints(f, targets)
+
+
+class GraphTables:
+    """
+    The tables of a snapshot file, which GraphModel takes as they are.
+
+    Names are sorted, so their index is their id. publishers and subscribers
+    are the (offsets, targets) arrays of the sorted node ids of every topic.
+    topic_type_ids holds -1 for topics without a type.
+    """
+
+    def __init__(self, nodes, topics, types, topic_type_ids, publishers, subscribers):
+        self.nodes = nodes
+        self.topics = topics
+        self.types = types
+        self.topic_type_ids = topic_type_ids
+        self.publishers = publishers
+        self.subscribers = subscribers
+
+
+def state_size(state):
+    """The number of nodes and of topics in state, a tuple (all_nodes, all_topics, all_pubs, all_subs) or GraphTables."""
+    if isinstance(state, GraphTables):
+        return len(state.nodes), len(state.topics)
+    return len(state[0]), len(state[1])
+
+
+class SnapshotReader:
+    def __init__(self, data):
+        self.data = data
+        self.position = 0
+
+    def read(self, size):
+        if self.position + size > len(self.data):
+            raise SnapshotFileError("snapshot file is truncated")
+        chunk = self.data[self.position:self.position + size]
+        self.position += size
+        return chunk
+
+    def read_count(self):
+        return COUNT.unpack(self.read(COUNT.size))[0]
+
+    def read_names(self):
+        count = self.read_count()
+        data = self.read(self.read_count())
+        names = data.split('\n') if count else []
+        if len(names) != count:
+            raise SnapshotFileError("snapshot file is corrupt: %d names declared, %d found" % (count, len(names)))
+        return names
+
+    def read_ints(self):
+        ints = array('i')
+        ints.fromstring(self.read(self.read_count() * ints.itemsize))
+        if sys.byteorder != 'little':
+            ints.byteswap()
+        return ints
+
+
+def check_tables(path, nodes, topics, types, type_ids, pubs, subs):
+    """Raise SnapshotFileError unless every id and offset in the tables points into the table it refers to."""
+    def check(condition, what):
+        if not condition:
+            raise SnapshotFileError("%s is corrupt: %s" % (path, what))
+
+    def ascending(ints):
+        return all(itertools.imap(operator.lt, ints, itertools.islice(ints, 1, None)))
+
+    for names, what in ((nodes, 'node'), (topics, 'topic'), (types, 'type')):
+        check(ascending(names), 'the %s names are not sorted and unique' % what)
+    check(len(type_ids) == len(topics), 'the number of topic types does not match the number of topics')
+    check(not type_ids or (min(type_ids) >= -1 and max(type_ids) < len(types)), 'a topic type id is out of range')
+    for offsets, targets in (pubs, subs):
+        check(len(offsets) == len(topics) + 1 and offsets[0] == 0 and offsets[-1] == len(targets),
+              'the edge offsets do not match the topics and edges')
+        check(all(itertools.imap(operator.le, offsets, itertools.islice(offsets, 1, None))),
+              'the edge offsets are not ascending')
+        check(not targets or (min(targets) >= 0 and max(targets) < len(nodes)), 'a node id is out of range')
+        # a row may only start below where the row before it ended
+        descents = itertools.compress(itertools.count(1),
+                                      itertools.imap(operator.ge, targets, itertools.islice(targets, 1, None)))
+        check(set(descents).issubset(offsets), 'the node ids of a topic are not sorted and unique')
+
+
+def load_state(path):
+    """
+    Read a snapshot file written by save_state().
+
+    The file is memory mapped and its integer tables are copied into arrays
+    in one go. Only names become Python objects. Returns the GraphTables,
+    which GraphModel takes without interning the names again.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (IOError, ValueError, mmap.error) as error:
+        raise SnapshotFileError("Unable to read snapshot %s: %s" % (path, error))
+
+    try:
+        reader = SnapshotReader(data)
+        magic, version = SNAPSHOT_HEADER.unpack(reader.read(SNAPSHOT_HEADER.size))
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise SnapshotFileError("%s is not a rosgraph_tui snapshot of version %d" % (path, SNAPSHOT_VERSION))
+
+        nodes = reader.read_names()
+        topics = reader.read_names()
+        types = reader.read_names()
+        type_ids = reader.read_ints()
+        pubs = reader.read_ints(), reader.read_ints()
+        subs = reader.read_ints(), reader.read_ints()
+    finally:
+        data.close()
+    check_tables(path, nodes, topics, types, type_ids, pubs, subs)
+    return GraphTables(nodes, topics, types, type_ids, pubs, subs)
@@ -0,0 +1,236 @@
+from collections import deque
+import threading
+import time
+
+
+DEFAULT_MAX_SUBSCRIPTIONS = 16
+DEFAULT_DWELL = 2.0
+DEFAULT_WINDOW = 100
+
+
+def rospy_subscribe(topic, callback):
+    """
+    Subscribe to topic with rospy.AnyMsg, so messages stay serialized and only their size is passed to callback.
+
+    Returns the subscriber, whose unregister() ends the subscription.
+    """
+    import rospy
+    if not rospy.core.is_initialized():
+        rospy.init_node('rosgraph_tui', anonymous=True, disable_signals=True)
+    return rospy.Subscriber(topic, rospy.AnyMsg, lambda message: callback(len(message._buff)))
+
+
+def format_rate(rate):
+    return '%.1fHz' % rate
+
+
+def format_bandwidth(bandwidth):
+    for unit in ('B/s', 'KB/s', 'MB/s'):
+        if bandwidth < 1000:
+            return '%.1f%s' % (bandwidth, unit)
+        bandwidth /= 1000.0
+    return '%.1fGB/s' % bandwidth
+
+
+class TopicStats:
+    """
+    Arrival times and sizes of the last window messages of a topic.
+
+    started is when the topic was last subscribed. slow is set once it got
+    fewer than two messages in a whole dwell, which are too few for a rate.
+    """
+
+    def __init__(self, window, started):
+        self.samples = deque(maxlen=window)
+        self.total_size = 0
+        self.last = (None, None)
+        self.started = started
+        self.slow = False
+
+    def restart(self, started):
+        """Start over, but report the last rate and bandwidth until there are new ones."""
+        if self.measured_rate() is not None:
+            self.last = (self.measured_rate(), self.measured_bandwidth())
+            self.slow = False
+        self.samples.clear()
+        self.total_size = 0
+        self.started = started
+
+    def mark_slow(self):
+        """Drop the last rate and bandwidth, the topic got too few messages since."""
+        self.last = (None, None)
+        self.slow = True
+
+    def add(self, stamp, size):
+        if len(self.samples) == self.samples.maxlen:
+            self.total_size -= self.samples[0][1]
+        self.samples.append((stamp, size))
+        self.total_size += size
+
+    def span(self):
+        return self.samples[-1][0] - self.samples[0][0] if len(self.samples) > 1 else 0
+
+    def measured_rate(self):
+        span = self.span()
+        return (len(self.samples) - 1) / span if span > 0 else None
+
+    def measured_bandwidth(self):
+        span = self.span()
+        return (self.total_size - self.samples[0][1]) / span if span > 0 else None
+
+    def rate(self):
+        """Messages per second between the first and last sample, or None if never measured."""
+        rate = self.measured_rate()
+        return self.last[0] if rate is None else rate
+
+    def bandwidth(self):
+        """Bytes per second between the first and last sample, or None if never measured."""
+        bandwidth = self.measured_bandwidth()
+        return self.last[1] if bandwidth is None else bandwidth
+
+    def is_slow(self):
+        return self.slow and self.rate() is None
+
+
+class TopicMonitor:
+    """
+    Samples message rate and bandwidth with at most max_subscriptions subscriptions at once.
+
+    The watched topics, e.g. those in view, are always subscribed. The
+    remaining subscriptions rotate through all other topics, dwell seconds
+    each, on a thread of their own. A topic keeps its last measurement
+    while it is not subscribed. subscribe(topic, callback) must return an
+    object with unregister() and call callback(size) for every message.
+    notify(topics) is called on the monitor thread after every rotation,
+    with the set of topics that got messages or turned out slow since the
+    last call.
+
+    A rate takes two messages while the topic is subscribed, so rotating
+    topics slower than min_rate(), 2 / dwell messages per second, get no
+    rate. Once such a topic was subscribed for a whole dwell, is_slow()
+    tells so.
+    """
+
+    def __init__(self, notify, subscribe=rospy_subscribe, max_subscriptions=DEFAULT_MAX_SUBSCRIPTIONS,
+                 dwell=DEFAULT_DWELL, window=DEFAULT_WINDOW):
+        self.notify = notify
+        self.subscribe = subscribe
+        self.max_subscriptions = max_subscriptions
+        self.dwell = dwell
+        self.window = window
+        self.condition = threading.Condition()
+        self.topics = []
+        self.watched = []
+        self.cursor = 0
+        self.stats = {}
+        # the topics that got messages since the last notify()
+        self.measured = set()
+        self.subscriptions = {}
+        self.running = True
+
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def set_topics(self, topics):
+        with self.condition:
+            self.topics = topics
+
+    def watch(self, topics):
+        """Keep topics subscribed from now on, as far as max_subscriptions allows."""
+        with self.condition:
+            if topics != self.watched:
+                self.watched = topics
+                self.condition.notify()
+
+    def rate(self, topic):
+        stats = self.stats.get(topic)
+        if stats is None:
+            return None
+        with self.condition:
+            return stats.rate()
+
+    def bandwidth(self, topic):
+        stats = self.stats.get(topic)
+        if stats is None:
+            return None
+        with self.condition:
+            return stats.bandwidth()
+
+    def min_rate(self):
+        """The slowest rate a topic can be measured at."""
+        return 2.0 / self.dwell
+
+    def is_slow(self, topic):
+        """Whether topic has no rate because it is slower than min_rate()."""
+        stats = self.stats.get(topic)
+        if stats is None:
+            return False
+        with self.condition:
+            return stats.is_slow()
+
+    def record(self, topic, size):
+        """Runs on the threads of the subscriptions."""
+        with self.condition:
+            stats = self.stats.get(topic)
+            if stats is not None:
+                stats.add(time.time(), size)
+                self.measured.add(topic)
+
+    def run(self):
+        while True:
+            with self.condition:
+                running = self.running
+                self.find_slow(time.time())
+                wanted = self.next_topics() if running else set()
+            self.resubscribe(wanted)
+            if not running:
+                return
+            with self.condition:
+                measured, self.measured = self.measured, set()
+            self.notify(measured)
+            with self.condition:
+                if self.running:
+                    self.condition.wait(self.dwell)
+
+    def find_slow(self, now):
+        """Mark the subscribed topics without a rate after a whole dwell as slow."""
+        for topic in self.subscriptions:
+            stats = self.stats[topic]
+            if not stats.slow and stats.measured_rate() is None and now - stats.started >= self.dwell:
+                stats.mark_slow()
+                self.measured.add(topic)
+
+    def next_topics(self):
+        known = set(self.topics)
+        wanted = [t for t in self.watched if t in known][:self.max_subscriptions]
+        rotating = self.max_subscriptions - len(wanted)
+        if rotating >= len(self.topics):
+            return set(self.topics)
+
+        wanted = set(wanted)
+        for _ in range(len(self.topics)):
+            if len(wanted) == self.max_subscriptions:
+                break
+            self.cursor %= len(self.topics)
+            wanted.add(self.topics[self.cursor])
+            self.cursor += 1
+        return wanted
+
+    def resubscribe(self, wanted):
+        for topic in set(self.subscriptions) - wanted:
+            self.subscriptions.pop(topic).unregister()
+        for topic in wanted - set(self.subscriptions):
+            with self.condition:
+                if topic in self.stats:
+                    self.stats[topic].restart(time.time())
+                else:
+                    self.stats[topic] = TopicStats(self.window, time.time())
+            self.subscriptions[topic] = self.subscribe(topic, lambda size, topic=topic: self.record(topic, size))
+
+    def close(self):
+        """Stop rotating and end all subscriptions."""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
@@ -0,0 +1,124 @@
+from collections import OrderedDict
+
+
+NODE = 'N'
+TOPIC = 'T'
+
+DOWNSTREAM = 'downstream'
+UPSTREAM = 'upstream'
+
+
+class Traversal:
+    """
+    Breadth-first queries over the integer adjacency of a GraphModel.
+
+    Entities are (kind, name) pairs with kind NODE or TOPIC. Data flows from
+    publishing nodes to topics and from topics to subscribing nodes, so one
+    hop from a node reaches topics and two hops reach nodes again. Results
+    are cached until the graph changes.
+    """
+
+    def __init__(self, graph, max_results=64):
+        self.graph = graph
+        self.max_results = max_results
+        self.version = graph.version
+        self.results = OrderedDict()
+
+    def cached(self, key, query):
+        if self.version != self.graph.version:
+            self.version = self.graph.version
+            self.results.clear()
+        if key in self.results:
+            result = self.results.pop(key)
+        else:
+            result = query()
+            if len(self.results) >= self.max_results:
+                self.results.popitem(last=False)
+        self.results[key] = result
+        return result
+
+    def entity_id(self, entity):
+        kind, name = entity
+        return (self.graph.node_ids if kind == NODE else self.graph.topic_ids).get(name)
+
+    def adjacency(self, kind, direction):
+        graph = self.graph
+        if kind == NODE:
+            return graph.publications if direction == DOWNSTREAM else graph.subscriptions
+        return graph.subscribers if direction == DOWNSTREAM else graph.publishers
+
+    def names(self, kind, ids):
+        """The sorted names of ids."""
+        graph = self.graph
+        if kind == NODE:
+            names, ids_sorted = graph.node_names, graph.node_ids_sorted
+        else:
+            names, ids_sorted = graph.topic_names, graph.topic_ids_sorted
+        if ids_sorted:
+            return [names[i] for i in sorted(ids)]
+        return sorted(names[i] for i in ids)
+
+    def bfs(self, entity, direction, hops=None, target=None):
+        """
+        Visit the entities reachable from entity, one level of hops at a time.
+
+        Returns the levels as (kind, ids) pairs and the parent of every visited
+        (kind, id). The search stops after hops levels or once target is found.
+        """
+        kind, start = entity[0], self.entity_id(entity)
+        if start is None:
+            return [], {}
+        parents = {(kind, start): None}
+        levels = []
+        frontier = [start]
+        while frontier and (hops is None or len(levels) < hops) and (target is None or target not in parents):
+            adjacency = self.adjacency(kind, direction)
+            next_kind = TOPIC if kind == NODE else NODE
+            next_frontier = []
+            for index in frontier:
+                for neighbor in adjacency.row(index):
+                    if (next_kind, neighbor) not in parents:
+                        parents[(next_kind, neighbor)] = (kind, index)
+                        next_frontier.append(neighbor)
+            if not next_frontier:
+                break
+            levels.append((next_kind, next_frontier))
+            kind, frontier = next_kind, next_frontier
+        return levels, parents
+
+    def neighborhood(self, entity, direction, hops=None):
+        """
+        The entities up to hops away from entity in direction, all of them if hops is None.
+
+        Returns one (kind, sorted names) pair per hop distance, starting with one hop.
+        """
+        def query():
+            levels, parents = self.bfs(entity, direction, hops)
+            return [(kind, self.names(kind, ids)) for kind, ids in levels]
+        return self.cached(('neighborhood', entity, direction, hops), query)
+
+    def reachable(self, entity, direction):
+        """The set of all entities that entity transitively feeds or is fed by."""
+        def query():
+            return frozenset((kind, name) for kind, names in self.neighborhood(entity, direction)
+                             for name in names)
+        return self.cached(('reachable', entity, direction), query)
+
+    def shortest_path(self, source, target):
+        """The entities along a shortest path of data flow from source to target, both included, or None."""
+        def query():
+            target_id = self.entity_id(target)
+            if target_id is None:
+                return None
+            target_key = (target[0], target_id)
+            levels, parents = self.bfs(source, DOWNSTREAM, target=target_key)
+            if target_key not in parents:
+                return None
+            path = []
+            key = target_key
+            while key is not None:
+                kind, index = key
+                path.append((kind, self.names(kind, [index])[0]))
+                key = parents[key]
+            return path[::-1]
+        return self.cached(('path', source, target), query)
@@ -1,5 +1,6 @@
 import urwid
 
+import profiling
 import widgets
 
 
@@ -17,10 +18,27 @@ class MainView:
             ('topic', 'dark cyan', 'black'),
             ('chosen_node', 'light gray,bold', 'black'),
             ('chosen_topic', 'dark cyan,bold', 'black'),
+            ('unresponsive_node', 'dark gray', 'black'),
+            ('chosen_unresponsive_node', 'dark gray,bold', 'black'),
+            ('namespace', 'yellow', 'black'),
+            ('annotation', 'brown', 'black'),
+            ('profile', 'white', 'dark blue'),
             ('reversed', 'bold', '')]
 
         self.main_widget = widgets.ListColumn(choices_left, choices_middle, choices_right)
+        # the key each column was last updated with, see update_list()
+        self.list_keys = {}
         self.main_widget_with_attr = urwid.AttrMap(self.main_widget, 'bg')
+        self.profiler = profiling.NULL_PROFILER
+        self.profile_text = urwid.Text('')
+        self.profile_overlay = widgets.PassiveOverlay(
+            urwid.AttrMap(urwid.LineBox(self.profile_text, u'profile'), 'profile'), self.main_widget_with_attr,
+            'right', 44, 'top', 'pack', right=2, top=1)
+        self.definition_text = urwid.Text('')
+        self.definition_box = urwid.LineBox(self.definition_text, u'message')
+        self.definition_overlay = widgets.PassiveOverlay(
+            urwid.AttrMap(self.definition_box, 'profile'), self.main_widget_with_attr,
+            'right', 64, 'top', 'pack', right=2, top=1)
 
     def get_selection(self):
         return self.main_widget.get_selection()
@@ -37,8 +55,79 @@ class MainView:
     def set_footer(self, footer, column):
         self.main_widget.set_footer(footer, column)
 
+    def set_profile(self, lines):
+        self.profile_text.set_text('\n'.join(lines))
+
+    def set_definition(self, title, text):
+        self.definition_box.set_title(title)
+        self.definition_text.set_text(text)
+
     def set_focus(self, column):
         self.main_widget.set_focus(column.index)
 
     def reset_list(self, choices, column):
+        self.list_keys.pop(column, None)
         self.main_widget.reset_list(choices, column)
+
+    def update_list(self, key, build, column):
+        """
+        Reset column to the choices build() returns, unless it was last updated with an equal key.
+
+        Returns whether the choices were rebuilt.
+        """
+        if self.list_keys.get(column) == key:
+            return False
+        with self.profiler.span('build_rows'):
+            choices = build()
+        with self.profiler.span('set_choices'):
+            self.main_widget.reset_list(choices, column)
+        self.list_keys[column] = key
+        return True
+
+    def get_list_key(self, column):
+        """The key column was last updated with, or None."""
+        return self.list_keys.get(column)
+
+    def patch_list(self, key, patches, column):
+        """
+        Bring column up to date with key by patches (start, stop, choices), made one after the other.
+
+        Each replaces the choices from start to stop, so the rows outside
+        the patches are neither built nor compared again.
+        """
+        choices = list(self.main_widget.get_choices(column))
+        head = tail = len(choices)
+        with self.profiler.span('set_choices'):
+            for start, stop, rows in patches:
+                head, tail = min(head, start), min(tail, len(choices) - stop)
+                choices[start:stop] = rows
+            self.main_widget.reset_list(choices, column, change=(head, tail))
+        self.list_keys[column] = key
+
+    def set_list(self, key, choices, column, position=None):
+        """
+        Show choices built for key before, so a later update_list() with an equal key does nothing.
+
+        With position, that position is focused instead of the entry focused before.
+        """
+        self.main_widget.reset_list(choices, column, position)
+        self.list_keys[column] = key
+
+    def get_choices(self, column):
+        """The choices column shows, which restyle_list() changes in place."""
+        return self.main_widget.get_choices(column)
+
+    def get_focus_positions(self):
+        return self.main_widget.get_focus_positions()
+
+    def set_focus_positions(self, focus):
+        self.main_widget.set_focus_positions(focus)
+
+    def restyle_list(self, texts, restyle, column):
+        """Restyle only the entries of column with one of texts by restyle(choice)."""
+        self.main_widget.restyle_list(texts, restyle, column)
+
+    def restyle_rows(self, positions, restyle, column):
+        """Restyle only the entries of column at positions by restyle(choice)."""
+        if positions:
+            self.main_widget.restyle_rows(positions, restyle, column)
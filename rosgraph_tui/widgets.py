@@ -1,12 +1,27 @@
+from collections import OrderedDict
 from enum import Enum
 import urwid
+from urwid.compat import xrange
 
 
 class ListEntry(urwid.Text):
+    """
+    A selectable entry, optionally annotated in the 'annotation' style.
+
+    The name is the entry text without annotation. Only enter activates
+    it, a space is left to the filter.
+    """
+
     _selectable = True
+    _command_map = urwid.command_map.copy()
+    del _command_map[' ']
 
     signals = ["click"]
 
+    def __init__(self, name, annotation=None):
+        self.name = name
+        super(ListEntry, self).__init__([name, ('annotation', '  ' + annotation)] if annotation else name)
+
     def keypress(self, size, key):
         """
         Send 'click' signal on 'activate' command.
@@ -27,41 +42,191 @@ class ListEntry(urwid.Text):
         return True
 
 
+class ChoiceWalker(urwid.ListWalker):
+    """
+    List walker over plain (style, text) or (style, text, annotation) choices.
+
+    Row widgets are only built for the positions urwid actually renders.
+    They are recycled through a bounded cache keyed by the choice, so
+    memory and rebuild time depend on the terminal height, not the list length.
+    """
+
+    def __init__(self, on_click, max_widgets=512):
+        self.on_click = on_click
+        self.max_widgets = max_widgets
+        self.widgets = OrderedDict()
+        self.choices = []
+        self.positions_by_text = None
+        self.focus = 0
+
+    def __len__(self):
+        return len(self.choices)
+
+    def __getitem__(self, position):
+        if position < 0 or position >= len(self.choices):
+            raise IndexError("No widget at position %s" % (position,))
+        return self.widget(self.choices[position])
+
+    def widget(self, choice):
+        widget = self.widgets.pop(choice, None)
+        if widget is None:
+            style, text = choice[:2]
+            button = ListEntry(text, *choice[2:])
+            urwid.connect_signal(button, 'click', self.on_click, text)
+            widget = urwid.AttrMap(button, style, focus_map='reversed')
+            if len(self.widgets) >= self.max_widgets:
+                self.widgets.popitem(last=False)
+        self.widgets[choice] = widget
+        return widget
+
+    def set_choices(self, choices):
+        self.choices = choices
+        self.positions_by_text = None
+        self.focus = max(0, min(self.focus, len(choices) - 1))
+        self._modified()
+
+    def diff(self, choices):
+        """
+        Compare choices with the current ones.
+
+        Returns None if they are equal, else the lengths of their common head
+        and common tail, which never overlap. Only the rows in between changed.
+        """
+        old = self.choices
+        if old == choices:
+            return None
+        length = min(len(old), len(choices))
+        head = 0
+        while head < length and old[head] == choices[head]:
+            head += 1
+        tail = 0
+        while tail < length - head and old[-1 - tail] == choices[-1 - tail]:
+            tail += 1
+        return head, tail
+
+    def restyle(self, texts, restyle):
+        """Replace the choices of texts by restyle(choice) in place, leaving all other rows alone."""
+        for text in texts:
+            position = self.position_of(text)
+            if position is not None:
+                self.choices[position] = restyle(self.choices[position])
+        self._modified()
+
+    def restyle_positions(self, positions, restyle):
+        """Replace the choices at positions by restyle(choice) in place, leaving all other rows alone."""
+        for position in positions:
+            self.choices[position] = restyle(self.choices[position])
+        self._modified()
+
+    def position_of(self, text):
+        """Return the first position of text in the choices or None, using a lazily built name->position map."""
+        if self.positions_by_text is None:
+            self.positions_by_text = {}
+            for position, choice in enumerate(self.choices):
+                self.positions_by_text.setdefault(choice[1], position)
+        return self.positions_by_text.get(text)
+
+    def set_focus(self, position):
+        if not self.choices:
+            # like urwid's SimpleFocusListWalker, accept focus changes while empty
+            self.focus = 0
+            return
+        if position < 0 or position >= len(self.choices):
+            raise IndexError("No widget at position %s" % (position,))
+        self.focus = position
+        self._modified()
+
+    def next_position(self, position):
+        if position >= len(self.choices) - 1:
+            raise IndexError
+        return position + 1
+
+    def prev_position(self, position):
+        if position <= 0:
+            raise IndexError
+        return position - 1
+
+    def positions(self, reverse=False):
+        if reverse:
+            return xrange(len(self.choices) - 1, -1, -1)
+        return xrange(len(self.choices))
+
+
 class List(urwid.ListBox):
-    signals = ["choice"]
+    """
+    Emits 'choice' when an entry is activated, and 'visible' with the first
+    and last rendered position whenever they or the choices change.
+    """
+
+    signals = ["choice", "visible"]
 
     def sizing(self):
         return frozenset([urwid.FIXED])
 
     def __init__(self, choices):
-        self.choices_list = []
+        super(List, self).__init__(ChoiceWalker(self.item_chosen))
+        self.visible = None
         self.set_choices(choices)
 
-    def reset_widget(self):
-        super(List, self).__init__(urwid.SimpleFocusListWalker(self.choices_list))
-
     def set_choices(self, choices):
-        self.choices_list = []
-        for style, text in choices:
-            button = ListEntry(text)
-            urwid.connect_signal(button, 'click', self.item_chosen, text)
-            self.choices_list.append(urwid.AttrMap(button, style, focus_map='reversed'))
-        self.reset_widget()
-
-    def reset_list(self, choices):
-        focus = self.focus
-        if focus:
-            if focus.original_widget.get_text() in choices:
-                focus_position = choices.index(focus.original_widget.get_text())
-            else:
-                focus_position = self.focus_position
-                focus_position = max(0, min(focus_position, len(choices) - 1))
-        else:
-            focus_position = 0
+        # pending focus changes refer to positions in the old choices
+        self.set_focus_pending = None
+        self.set_focus_valign_pending = None
+        self.visible = None
+        self.body.set_choices(choices)
+
+    def render(self, size, focus=False):
+        canvas = super(List, self).render(size, focus)
+        middle, top, bottom = self.calculate_visible(size, focus)
+        if middle is not None:
+            positions = [middle[2]] + [position for widget, position, rows in top[1] + bottom[1]]
+            visible = (min(positions), max(positions))
+            if visible != self.visible:
+                self.visible = visible
+                self._emit('visible', *visible)
+        return canvas
+
+    def reset_list(self, choices, position=None, change=None):
+        """
+        Show choices and keep the focus on the same entry if it is still there.
+
+        Nothing happens if the choices did not change. A focus in the common
+        head or tail of old and new choices moves along without a search.
+        change is their (head, tail) if the caller knows it already. With
+        position, that position is focused instead.
+        """
+        if position is not None:
+            self.set_choices(choices)
+            if position < len(choices):
+                self.focus_position = position
+            return
+        diff = self.body.diff(choices) if change is None else change
+        if diff is None:
+            return
+        head, tail = diff
+        old_length = len(self.body)
+        focus_position = self.body.focus
+        focus_text = self.body.choices[focus_position][1] if old_length else None
 
         self.set_choices(choices)
         if len(choices) > 0:
-            self.focus_position = focus_position
+            if focus_text is None:
+                position = 0
+            elif focus_position < head:
+                position = focus_position
+            elif focus_position >= old_length - tail:
+                position = focus_position + len(choices) - old_length
+            else:
+                position = self.body.position_of(focus_text)
+                if position is None:
+                    position = max(0, min(focus_position, len(choices) - 1))
+            self.focus_position = position
+
+    def restyle(self, texts, restyle):
+        self.body.restyle(texts, restyle)
+
+    def restyle_positions(self, positions, restyle):
+        self.body.restyle_positions(positions, restyle)
 
     def item_chosen(self, button, choice):
         self._emit('choice', button, choice)
@@ -81,7 +246,7 @@ class PaddedListFrame(urwid.Padding):
 
     def get_selection(self):
         if self.original_widget.body.focus:
-            return self.original_widget.body.focus.base_widget.text
+            return self.original_widget.body.focus.base_widget.name
         else:
             return None
 
@@ -91,8 +256,37 @@ class PaddedListFrame(urwid.Padding):
     def set_footer(self, footer):
         self.footer[1].set_text(('footer', footer))
 
-    def reset_list(self, choices):
-        self.list.reset_list(choices)
+    def reset_list(self, choices, position=None, change=None):
+        self.list.reset_list(choices, position, change)
+
+    def restyle_list(self, texts, restyle):
+        self.list.restyle(texts, restyle)
+
+    def restyle_rows(self, positions, restyle):
+        self.list.restyle_positions(positions, restyle)
+
+    def get_choices(self):
+        return self.list.body.choices
+
+    def get_focus_position(self):
+        return self.list.body.focus
+
+    def set_focus_position(self, position):
+        if position < len(self.list.body):
+            self.list.focus_position = position
+
+
+class PassiveOverlay(urwid.Overlay):
+    """An overlay that only shows its top widget, all input goes to the widget below."""
+
+    def selectable(self):
+        return self.bottom_w.selectable()
+
+    def keypress(self, size, key):
+        return self.bottom_w.keypress(size, key)
+
+    def mouse_event(self, size, event, button, col, row, focus):
+        return self.bottom_w.mouse_event(size, event, button, col, row, focus)
 
 
 class ListColumn(urwid.Columns):
@@ -141,10 +335,47 @@ class ListColumn(urwid.Columns):
         elif column == self.Columns.RIGHT:
             self.column_right.set_footer(footer)
 
-    def reset_list(self, choices, column):
+    def reset_list(self, choices, column, position=None, change=None):
+        if column == self.Columns.LEFT:
+            self.column_left.reset_list(choices, position, change)
+        elif column == self.Columns.MIDDLE:
+            self.column_middle.reset_list(choices, position, change)
+        elif column == self.Columns.RIGHT:
+            self.column_right.reset_list(choices, position, change)
+
+    def restyle_list(self, texts, restyle, column):
+        if column == self.Columns.LEFT:
+            self.column_left.restyle_list(texts, restyle)
+        elif column == self.Columns.MIDDLE:
+            self.column_middle.restyle_list(texts, restyle)
+        elif column == self.Columns.RIGHT:
+            self.column_right.restyle_list(texts, restyle)
+
+    def restyle_rows(self, positions, restyle, column):
+        if column == self.Columns.LEFT:
+            self.column_left.restyle_rows(positions, restyle)
+        elif column == self.Columns.MIDDLE:
+            self.column_middle.restyle_rows(positions, restyle)
+        elif column == self.Columns.RIGHT:
+            self.column_right.restyle_rows(positions, restyle)
+
+    def get_choices(self, column):
         if column == self.Columns.LEFT:
-            self.column_left.reset_list(choices)
+            return self.column_left.get_choices()
         elif column == self.Columns.MIDDLE:
-            self.column_middle.reset_list(choices)
+            return self.column_middle.get_choices()
         elif column == self.Columns.RIGHT:
-            self.column_right.reset_list(choices)
+            return self.column_right.get_choices()
+
+    def get_focus_positions(self):
+        """The index of the focused column and the focus position in each column."""
+        return self.focus_position, tuple(column.get_focus_position() for column in self.list_frames())
+
+    def set_focus_positions(self, focus):
+        index, positions = focus
+        for column, position in zip(self.list_frames(), positions):
+            column.set_focus_position(position)
+        self.focus_position = index
+
+    def list_frames(self):
+        return self.column_left, self.column_middle, self.column_right